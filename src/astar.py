@@ -1,37 +1,207 @@
 #!/usr/bin/env python3
 import heapq
+import threading
 import numpy as np
 import time
 
+# Integer move costs for the flat kernel: straight steps cost 10, diagonal
+# steps 14 (~10*sqrt(2)), so fractional cell weights keep 0.1 resolution.
+STEP_COST = 10
+DIAG_COST = 14
+# Extra cost of a change of direction for the "bends" kernel: one cell's worth,
+# so a route only detours when that saves more bends than cells
+BEND_COST = STEP_COST
+
+# Per-thread scratch buffers for the flat kernel, reused across routes so a
+# search never allocates O(grid) state.  Entries are only trusted when their
+# stamp matches the current search generation.
+_scratch = threading.local()
+
+
+def _flat_buffers(n, side="fwd"):
+    # side: independent buffer set per search direction ("fwd" / "bwd")
+    bufs = getattr(_scratch, "bufs", None)
+    if bufs is None:
+        bufs = _scratch.bufs = {}
+    buf = bufs.get(side)
+    if buf is None or len(buf["g"]) < n:
+        buf = {
+            "g":      [0] * n,
+            "parent": [-1] * n,
+            "seen":   [0] * n,
+            "closed": [0] * n,
+            "gen":    0,
+        }
+        bufs[side] = buf
+    buf["gen"] += 1
+    return buf
+
+
+# (height, width) -> (rows, cols): grid coordinates of every padded flat index,
+# so the kernel never needs divmod() to evaluate the heuristic.
+_index_tables = {}
+
+
+def _flat_index_tables(h, w):
+    key = (h, w)
+    if key not in _index_tables:
+        W = w + 2
+        idx = np.arange((h + 2) * W)
+        _index_tables[key] = ((idx // W - 1).tolist(), (idx % W - 1).tolist())
+    return _index_tables[key]
+
+
+class SearchStats:
+    """
+    What a search cost: nodes expanded, heap pushes, wall time and whether
+    it stopped on its expansion budget.  One record can also be shared by
+    several searches (a net, a drag), with max_expansions as their common
+    budget: remaining() is what the next search may still spend.
+    """
+
+    def __init__(self, max_expansions=None):
+        self.max_expansions = max_expansions
+        self.searches = 0
+        self.expanded = 0
+        self.pushes = 0
+        self.elapsed = 0.0
+        self.budget_hit = False
+
+    def remaining(self):
+        """Expansions left under the budget (None when unlimited)."""
+        if self.max_expansions is None:
+            return None
+        return max(0, self.max_expansions - self.expanded)
+
+    def exhausted(self):
+        return self.budget_hit or self.remaining() == 0
+
+    def add(self, other):
+        """Fold another record (one finished search) into this one."""
+        self.searches += other.searches
+        self.expanded += other.expanded
+        self.pushes += other.pushes
+        self.elapsed += other.elapsed
+        self.budget_hit = self.budget_hit or other.budget_hit
+        return self
+
+    def as_dict(self):
+        return {"searches": self.searches, "expanded": self.expanded, "pushes": self.pushes,
+                "elapsed": self.elapsed, "budget_hit": self.budget_hit}
+
+    def __repr__(self):
+        return (f"SearchStats(searches={self.searches}, expanded={self.expanded}, pushes={self.pushes}, "
+                f"elapsed={self.elapsed * 1000:.1f}ms, budget_hit={self.budget_hit})")
+
+
 class AStar:
     # Default timeout is 600 seconds (ensure AStar finds route in 600 seconds max)
-    def __init__(self, grid, timeout=600):
+    # timeout:   wall-clock safety net, only checked every 4096 expansions; use
+    #            max_expansions for budgets that stop at the same point on every machine
+    # kernel:    "classic" (tuple/dict search below), "flat" (astar_flat) or "bends"
+    #            (astar_bends: minimal-bend routes; always used whatever the algorithm)
+    # heuristic: "manhattan" (4-connected moves) or "octile" (8-connected), flat kernel only
+    # weight:    heuristic inflation for the flat kernel (1.0 = shortest paths)
+    # penalty:   optional (axis0, axis1) integer arrays shaped like grid, flat kernel only;
+    #            a move along an axis costs penalty[cur] + penalty[next] extra (congestion)
+    # algorithm: "astar", "jps" (jump point search) or "bidirectional"; the latter two
+    #            always use flat arrays.  JPS needs a uniform-cost 4-connected grid and
+    #            falls back to astar_flat otherwise; its jump tables cost a pass over the
+    #            whole grid, so it only wins where astar would expand much of it.
+    # max_cost:  astar_flat only; never extend a path whose f (STEP_COST units) exceeds it
+    # max_expansions: give up (budget_hit) instead of expanding more nodes than this
+    # bend_cost: extra cost (STEP_COST units) of each change of direction, "bends" kernel only
+    def __init__(self, grid, timeout=600, kernel="classic", heuristic="manhattan", weight=1.0,
+                 penalty=None, algorithm="astar", max_cost=None, max_expansions=None, bend_cost=BEND_COST):
         self.grid = grid
         self.height, self.width = grid.shape
         self.directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
         self.timeout = timeout
+        self.kernel = kernel
+        self.heuristic_name = heuristic
+        self.weight = weight
+        self.penalty = penalty
+        self.algorithm = algorithm
+        self.max_cost = max_cost
+        self.max_expansions = max_expansions
+        self.bend_cost = bend_cost
+        self.expanded = 0       # nodes expanded by the last find_path()
+        self.pushes = 0         # heap pushes by the last find_path()
+        self.budget_hit = False # last find_path() stopped on max_expansions
+        self.stats = None       # SearchStats of the last find_path()
+        self._cell_cost = None
+        self._uniform = False   # every passable cell has zero penalty
+        self._jumps = None      # astar_jps jump tables, built on first use
 
     def heuristic(self, a, b):
         scaling_factor = 1.2  # Increase for more relaxed exploration
         return scaling_factor * np.hypot(b[0] - a[0], b[1] - a[1])
 
+    def find_path(self, start, goal):
+        """
+        Route start -> goal with the selected algorithm/kernel; returns
+        [(r, c), ...] or [].  self.stats holds the search's SearchStats.
+        """
+        return self._measured(self._dispatch, start, goal)
+
+    def _measured(self, search, *args, **kwargs):
+        self.expanded = self.pushes = 0
+        self.budget_hit = False
+        t0 = time.perf_counter()
+        path = search(*args, **kwargs)
+        stats = self.stats = SearchStats(self.max_expansions)
+        stats.searches = 1
+        stats.expanded, stats.pushes, stats.budget_hit = self.expanded, self.pushes, self.budget_hit
+        stats.elapsed = time.perf_counter() - t0
+        return path
+
+    def _expansion_limit(self):
+        return self.max_expansions if self.max_expansions is not None else 1 << 62
+
+    def _out_of_budget(self, pops):
+        self.budget_hit = True
+        self.expanded = pops
+
+    def _dispatch(self, start, goal):
+        if self.kernel == "bends":
+            return self.astar_bends(start, goal)
+        if self.algorithm == "jps":
+            return self.astar_jps(start, goal)
+        if self.algorithm == "bidirectional":
+            return self.astar_bidirectional(start, goal)
+        if self.kernel == "flat":
+            return self.astar_flat(start, goal)
+        came_from, _ = self.astar(start, goal)
+        return self.reconstruct_path(came_from, start, goal)
+
     def astar(self, start, goal):
         frontier = []
         heapq.heappush(frontier, (0, start))
         came_from = {start: None}
         cost_so_far = {start: 0}
         start_time = time.time()
+        limit = self._expansion_limit()
+        self.expanded = 0
+        self.pushes = 1
+        gr, gc = goal
+        if goal != start and 0 <= gr < self.height and 0 <= gc < self.width and self.grid[gr, gc] >= 1:
+            # Blocked goal: fail now instead of exhausting every reachable cell
+            return came_from, cost_so_far
 
         while frontier:
-            if time.time() - start_time > self.timeout:
-                print(f"Timeout reached after {self.timeout} seconds")
-                return {}, {}
-
             _, current = heapq.heappop(frontier)
 
             if current == goal:
                 break
 
+            if self.expanded >= limit:
+                self._out_of_budget(self.expanded)
+                return {}, {}
+            self.expanded += 1
+            if not self.expanded & 0xFFF and time.time() - start_time > self.timeout:
+                print(f"Timeout reached after {self.timeout} seconds")
+                return {}, {}
+
             for dx, dy in self.directions:
                 next_cell = (current[0] + dx, current[1] + dy)
                 if (0 <= next_cell[0] < self.height and
@@ -44,10 +214,591 @@ class AStar:
                             cost_so_far[next_cell] = new_cost
                             priority = new_cost + self.heuristic(goal, next_cell)
                             heapq.heappush(frontier, (priority, next_cell))
+                            self.pushes += 1
                             came_from[next_cell] = current
 
         return came_from, cost_so_far
 
+    ############## FLAT KERNEL ###############
+    def cell_costs(self):
+        """
+        Per-cell entry penalty (cell weight * STEP_COST) as a flat Python list
+        over the grid padded with a one-cell blocked border, so neighbour
+        indices never need bounds checks.  -1 marks a blocked cell.
+        """
+        if self._cell_cost is None:
+            g = np.asarray(self.grid, dtype=float)
+            costs = np.where(g < 1, np.rint(g * STEP_COST), -1).astype(np.int64)
+            self._uniform = not (costs > 0).any()
+            self._cell_cost = np.pad(costs, 1, constant_values=-1).ravel().tolist()
+        return self._cell_cost
+
+    def jump_tables(self):
+        """
+        astar_jps jump tables over the padded flat grid of cell_costs(): for
+        each direction (1, -1, W, -W), the first cell at or beyond each cell
+        where a straight scan that way stops -- a blocked cell, a forced
+        turn, or (axis 0) a cell whose axis-1 scans find a jump point.  The
+        goal is not in them; astar_jps checks it per scan.
+        """
+        if self._jumps is None:
+            blocked = np.pad(np.asarray(self.grid) >= 1, 1, constant_values=True)
+            free = ~blocked
+            H, W = blocked.shape
+            idx = np.arange(H * W).reshape(H, W)
+
+            def open_at(dr, dc):
+                # free[r + dr, c + dc]; wraps only for border cells, which are blocked anyway
+                return np.roll(free, (-dr, -dc), axis=(0, 1))
+
+            def first(stop, axis, forward):
+                if forward:
+                    ahead = np.flip(np.where(stop, idx, H * W), axis)
+                    return np.flip(np.minimum.accumulate(ahead, axis=axis), axis)
+                return np.maximum.accumulate(np.where(stop, idx, -1), axis=axis)
+
+            # A side cell that is open but was closed one step back forces a turn
+            j1 = {d: first(blocked | (open_at(1, 0) & ~open_at(1, -d)) | (open_at(-1, 0) & ~open_at(-1, -d)),
+                           1, d > 0)
+                  for d in (1, -1)}
+            hits = {d: free.ravel()[j] for d, j in j1.items()}
+            side = np.roll(hits[1], -1, axis=1) | np.roll(hits[-1], 1, axis=1)
+            j0 = {d * W: first(blocked | side | (open_at(0, 1) & ~open_at(-d, 1)) | (open_at(0, -1) & ~open_at(-d, -1)),
+                               0, d > 0)
+                  for d in (1, -1)}
+            # Left as arrays: a search reads a few entries per jump point, not the whole table
+            self._jumps = {d: j.ravel() for d, j in (*j1.items(), *j0.items())}
+        return self._jumps
+
+    def move_penalties(self):
+        """Padded flat (axis0, axis1) lists for self.penalty, or (None, None)."""
+        if self.penalty is None:
+            return None, None
+        return tuple(np.pad(np.asarray(p, dtype=np.int64), 1).ravel().tolist() for p in self.penalty)
+
+    def find_path_from_any(self, starts, goal):
+        """
+        Route from whichever of starts reaches goal most cheaply (all start
+        at zero cost), e.g. tapping a net's existing tree; flat or bends kernel.
+        """
+        starts = list(starts)
+        search = self.astar_bends if self.kernel == "bends" else self.astar_flat
+        return self._measured(search, starts[0], goal, sources=starts[1:])
+
+    def astar_flat(self, start, goal, sources=()):
+        """
+        A* over flat cell indices.  Costs, parents and open/closed marks live
+        in preallocated integer lists, heap entries are single packed ints and
+        the heuristic is integer Manhattan (or octile), so the inner loop never
+        touches numpy scalars, tuple keys or the clock on every pop.
+        sources are extra start cells, also at zero cost.
+        Returns the same [(r, c), ...] path as reconstruct_path(), or [].
+
+        Each expansion costs about a quarter of a classic one, but the
+        search is exact: the classic kernel's zero step cost makes it greedy,
+        and on typical routes it expands fewer nodes and finishes first.
+        """
+        h, w = self.height, self.width
+        sr, sc = int(start[0]), int(start[1])
+        gr, gc = int(goal[0]), int(goal[1])
+        if not (0 <= sr < h and 0 <= sc < w and 0 <= gr < h and 0 <= gc < w):
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        W = w + 2                       # padded row stride
+        n = (h + 2) * W
+        pen = self.cell_costs()
+        rows, cols = _flat_index_tables(h, w)
+        if pen[(gr + 1) * W + gc + 1] < 0 and (sr, sc) != (gr, gc):
+            # Blocked goal: fail now instead of exhausting every reachable cell
+            self.expanded = 0
+            print(f"No path found from {start} to {goal}")
+            return []
+        octile = self.heuristic_name == "octile"
+        pen0, pen1 = self.move_penalties()
+        moves = [(1, STEP_COST, pen1), (-1, STEP_COST, pen1), (W, STEP_COST, pen0), (-W, STEP_COST, pen0)]
+        if octile:
+            moves += [(d, DIAG_COST, None) for d in (W + 1, W - 1, 1 - W, -1 - W)]
+        hw = int(round(self.weight * STEP_COST))   # integer heuristic scale per cell
+        buf = _flat_buffers(n)
+        g, parent, seen, closed, gen = buf["g"], buf["parent"], buf["seen"], buf["closed"], buf["gen"]
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        # Packed heap key: (f, h, cell) -> f * HK + h * n + cell, so ties on f
+        # prefer the node closest to the goal.
+        HK = n * (hw * (h + w) + 1)
+        bound = self.max_cost if self.max_cost is not None else 1 << 62
+        s = (sr + 1) * W + sc + 1
+        t = (gr + 1) * W + gc + 1
+        g[s] = 0
+        parent[s] = -1
+        seen[s] = gen
+        frontier = [s]
+        for r, c in sources:
+            if 0 <= r < h and 0 <= c < w:
+                i = (r + 1) * W + c + 1
+                g[i] = 0
+                parent[i] = -1
+                seen[i] = gen
+                dy, dx = abs(r - gr), abs(c - gc)
+                hn = hw * (dx + dy)
+                if octile:
+                    hn -= (2 * hw - hw * DIAG_COST // STEP_COST) * min(dx, dy)
+                frontier.append(hn * HK + hn * n + i)
+        heapq.heapify(frontier)
+        start_time = time.time()
+        limit = self._expansion_limit()
+        pops = stale = 0
+
+        while frontier:
+            cur = heappop(frontier) % n
+            if closed[cur] == gen:
+                stale += 1
+                continue
+            if cur == t:
+                break
+            if pops >= limit:
+                self._out_of_budget(pops)
+                self.pushes = pops + stale + len(frontier) + 1
+                return []
+            closed[cur] = gen
+            pops += 1
+            if not pops & 0xFFF and time.time() - start_time > self.timeout:
+                print(f"Timeout reached after {self.timeout} seconds")
+                self.expanded = pops
+                return []
+
+            gcur = g[cur]
+            for d, step, mp in moves:
+                nxt = cur + d
+                p = pen[nxt]
+                if p < 0 or closed[nxt] == gen:
+                    continue
+                ng = gcur + step + p
+                if mp is not None:
+                    ng += mp[cur] + mp[nxt]
+                if seen[nxt] != gen or ng < g[nxt]:
+                    seen[nxt] = gen
+                    g[nxt] = ng
+                    parent[nxt] = cur
+                    dy = rows[nxt] - gr
+                    dx = cols[nxt] - gc
+                    if dy < 0:
+                        dy = -dy
+                    if dx < 0:
+                        dx = -dx
+                    if octile:
+                        hn = hw * (dx + dy) - (2 * hw - hw * DIAG_COST // STEP_COST) * (dx if dx < dy else dy)
+                    else:
+                        hn = hw * (dx + dy)
+                    if ng + hn > bound:
+                        continue
+                    heappush(frontier, (ng + hn) * HK + hn * n + nxt)
+        else:
+            self.expanded = pops
+            self.pushes = pops + stale
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        self.expanded = pops
+        self.pushes = pops + stale + len(frontier) + 1
+        path = []
+        cur = t
+        while cur != -1:
+            path.append((rows[cur], cols[cur]))
+            cur = parent[cur]
+        path.reverse()
+        return path
+
+    ############## BEND-PENALISED ###############
+    def astar_bends(self, start, goal, sources=()):
+        """
+        A* over (cell, heading) states: a step that changes direction costs
+        bend_cost extra, so of the equally short routes the one with the
+        fewest bends wins instead of a staircase, and each route is as few
+        corner-to-corner segments as possible.  The heuristic adds one bend
+        whenever the goal is not straight ahead.  4-connected; cell weights,
+        penalty, sources and max_cost (which bounds the length, not the
+        bends) work as in astar_flat.
+        """
+        h, w = self.height, self.width
+        sr, sc = int(start[0]), int(start[1])
+        gr, gc = int(goal[0]), int(goal[1])
+        if not (0 <= sr < h and 0 <= sc < w and 0 <= gr < h and 0 <= gc < w):
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        W = w + 2
+        n = (h + 2) * W
+        N = 4 * n                       # state = 4 * cell + heading
+        pen = self.cell_costs()
+        rows, cols = _flat_index_tables(h, w)
+        t = (gr + 1) * W + gc + 1
+        if pen[t] < 0 and (sr, sc) != (gr, gc):
+            self.expanded = 0
+            print(f"No path found from {start} to {goal}")
+            return []
+        pen0, pen1 = self.move_penalties()
+        # Headings 0..3; k ^ 1 is the reverse of k
+        moves = [(1, pen1), (-1, pen1), (W, pen0), (-W, pen0)]
+        hw = int(round(self.weight * STEP_COST))
+        bend = int(self.bend_cost)
+        buf = _flat_buffers(N, "bends")
+        g, parent, seen, closed, gen = buf["g"], buf["parent"], buf["seen"], buf["closed"], buf["gen"]
+        turns = buf.get("turns")
+        if turns is None or len(turns) < len(g):
+            turns = buf["turns"] = [0] * len(g)
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        def heur(i, k):
+            dr, dc = gr - rows[i], gc - cols[i]
+            hn = hw * (abs(dr) + abs(dc))
+            if dr and dc:
+                return hn + bend, hn
+            if dc:
+                return (hn if (k == 0 and dc > 0) or (k == 1 and dc < 0) else hn + bend), hn
+            if dr:
+                return (hn if (k == 2 and dr > 0) or (k == 3 and dr < 0) else hn + bend), hn
+            return hn, hn
+
+        HK = N * (hw * (h + w) + bend + 1)
+        bound = self.max_cost if self.max_cost is not None else 1 << 62
+        frontier = []
+        for r, c in [(sr, sc)] + list(sources):
+            if 0 <= r < h and 0 <= c < w:
+                i = (r + 1) * W + c + 1
+                for k in range(4):
+                    st = 4 * i + k
+                    g[st] = turns[st] = 0
+                    parent[st] = -1
+                    seen[st] = gen
+                    hn = heur(i, k)[0]
+                    frontier.append(hn * HK + hn * N + st)
+        heapq.heapify(frontier)
+        start_time = time.time()
+        limit = self._expansion_limit()
+        pops = stale = 0
+
+        while frontier:
+            st = heappop(frontier) % N
+            if closed[st] == gen:
+                stale += 1
+                continue
+            cur, k = st >> 2, st & 3
+            if cur == t:
+                break
+            if pops >= limit:
+                self._out_of_budget(pops)
+                self.pushes = pops + stale + len(frontier) + 1
+                return []
+            closed[st] = gen
+            pops += 1
+            if not pops & 0xFFF and time.time() - start_time > self.timeout:
+                print(f"Timeout reached after {self.timeout} seconds")
+                self.expanded = pops
+                return []
+
+            gcur, tcur = g[st], turns[st]
+            for k2 in range(4):
+                if k2 == k ^ 1:
+                    continue            # never turn straight back
+                d, mp = moves[k2]
+                nxt = cur + d
+                p = pen[nxt]
+                if p < 0:
+                    continue
+                ns = 4 * nxt + k2
+                if closed[ns] == gen:
+                    continue
+                ng = gcur + STEP_COST + p
+                nt = tcur
+                if k2 != k:
+                    ng += bend
+                    nt += 1
+                if mp is not None:
+                    ng += mp[cur] + mp[nxt]
+                if seen[ns] != gen or ng < g[ns]:
+                    # Dominated: another heading here is a bend cheaper and may still turn this way
+                    cap = ng - bend
+                    base = 4 * nxt
+                    rev = base + (k2 ^ 1)
+                    if ((seen[base] == gen and g[base] <= cap and base != rev) or
+                            (seen[base + 1] == gen and g[base + 1] <= cap and base + 1 != rev) or
+                            (seen[base + 2] == gen and g[base + 2] <= cap and base + 2 != rev) or
+                            (seen[base + 3] == gen and g[base + 3] <= cap and base + 3 != rev)):
+                        continue
+                    hn, hlen = heur(nxt, k2)
+                    if ng - bend * nt + hlen > bound:
+                        continue
+                    seen[ns] = gen
+                    g[ns] = ng
+                    turns[ns] = nt
+                    parent[ns] = st
+                    heappush(frontier, (ng + hn) * HK + hn * N + ns)
+        else:
+            self.expanded = pops
+            self.pushes = pops + stale
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        self.expanded = pops
+        self.pushes = pops + stale + len(frontier) + 1
+        path = []
+        while st != -1:
+            cur = st >> 2
+            path.append((rows[cur], cols[cur]))
+            st = parent[st]
+        path.reverse()
+        return path
+
+    ############## JUMP POINT SEARCH ###############
+    def astar_jps(self, start, goal):
+        """
+        Jump point search for 4-connected uniform-cost grids.  Straight runs
+        are not walked: jump_tables() gives where each one stops, so only
+        jump points (cells with a forced turn, or from which a perpendicular
+        scan reaches one) are expanded, at O(1) per scan.  Axis 1 (stride
+        1) is the scanning axis: a run along axis 0 also stops where an
+        axis-1 scan finds a jump point.  Path cost equals astar_flat's;
+        falls back to it on weighted grids, octile moves or penalties.
+        """
+        pen = self.cell_costs()
+        if not self._uniform or self.penalty is not None or self.heuristic_name == "octile":
+            return self.astar_flat(start, goal)
+
+        h, w = self.height, self.width
+        sr, sc = int(start[0]), int(start[1])
+        gr, gc = int(goal[0]), int(goal[1])
+        self.expanded = 0
+        if not (0 <= sr < h and 0 <= sc < w and 0 <= gr < h and 0 <= gc < w):
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        W = w + 2
+        n = (h + 2) * W
+        rows, cols = _flat_index_tables(h, w)
+        s = (sr + 1) * W + sc + 1
+        t = (gr + 1) * W + gc + 1
+        if s != t and pen[t] < 0:
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        jumps = self.jump_tables()
+
+        def scan1(cur, d):
+            # Run along axis 1 from cur; first forced cell, the goal, or -1
+            stop = int(jumps[d][cur])
+            if rows[cur] == gr and (cur <= t <= stop if d > 0 else stop <= t <= cur):
+                return t
+            return stop if pen[stop] == 0 else -1
+
+        def scan0(cur, d):
+            # Run along axis 0; also stop where an axis-1 scan finds a jump point
+            stop = int(jumps[d][cur])
+            x = t + cols[cur] - gc      # this column's cell on the goal's row
+            if (cur <= x <= stop if d > 0 else stop <= x <= cur) and pen[x] == 0 and \
+               (x == t or scan1(x + 1, 1) == t or scan1(x - 1, -1) == t):
+                return x
+            return stop if pen[stop] == 0 else -1
+
+        hw = STEP_COST
+        buf = _flat_buffers(n)
+        g, parent, seen, closed, gen = buf["g"], buf["parent"], buf["seen"], buf["closed"], buf["gen"]
+        heappush, heappop = heapq.heappush, heapq.heappop
+        HK = n * (hw * (h + w) + 1)
+        g[s] = 0
+        parent[s] = -1
+        seen[s] = gen
+        frontier = [s]
+        start_time = time.time()
+        limit = self._expansion_limit()
+        pops = stale = 0
+
+        while frontier:
+            cur = heappop(frontier) % n
+            if closed[cur] == gen:
+                stale += 1
+                continue
+            if cur == t:
+                break
+            if pops >= limit:
+                self._out_of_budget(pops)
+                self.pushes = pops + stale + len(frontier) + 1
+                return []
+            closed[cur] = gen
+            pops += 1
+            if not pops & 0xFFF and time.time() - start_time > self.timeout:
+                print(f"Timeout reached after {self.timeout} seconds")
+                self.expanded = pops
+                return []
+
+            par = parent[cur]
+            if par == -1:
+                dirs = (1, -1, W, -W)
+            else:
+                diff = cur - par
+                if -W < diff < W:
+                    dirs = (1 if diff > 0 else -1, W, -W)
+                else:
+                    dirs = (W if diff > 0 else -W, 1, -1)
+            r, c, gcur = rows[cur], cols[cur], g[cur]
+            for d in dirs:
+                jp = scan1(cur + d, d) if d == 1 or d == -1 else scan0(cur + d, d)
+                if jp == -1 or closed[jp] == gen:
+                    continue
+                ng = gcur + STEP_COST * (abs(rows[jp] - r) + abs(cols[jp] - c))
+                if seen[jp] != gen or ng < g[jp]:
+                    seen[jp] = gen
+                    g[jp] = ng
+                    parent[jp] = cur
+                    hn = hw * (abs(rows[jp] - gr) + abs(cols[jp] - gc))
+                    heappush(frontier, (ng + hn) * HK + hn * n + jp)
+        else:
+            self.expanded = pops
+            self.pushes = pops + stale
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        self.expanded = pops
+        self.pushes = pops + stale + len(frontier) + 1
+        # Jump points are joined by straight runs; fill in the cells between
+        path = [(rows[t], cols[t])]
+        cur = t
+        while parent[cur] != -1:
+            prev = parent[cur]
+            step = (prev - cur) // max(1, abs(rows[prev] - rows[cur]) + abs(cols[prev] - cols[cur]))
+            while cur != prev:
+                cur += step
+                path.append((rows[cur], cols[cur]))
+        path.reverse()
+        return path
+
+    ############## BIDIRECTIONAL ###############
+    def astar_bidirectional(self, start, goal):
+        """
+        Bidirectional A* over the flat arrays: one search grows from each
+        end (each aimed at the other end), always expanding the smaller
+        frontier.  Every meeting cell offers a candidate cost; the search
+        stops once either frontier's best f reaches the best candidate, so
+        the path cost matches astar_flat's.
+        """
+        h, w = self.height, self.width
+        sr, sc = int(start[0]), int(start[1])
+        gr, gc = int(goal[0]), int(goal[1])
+        self.expanded = 0
+        if not (0 <= sr < h and 0 <= sc < w and 0 <= gr < h and 0 <= gc < w):
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        W = w + 2
+        n = (h + 2) * W
+        pen = self.cell_costs()
+        rows, cols = _flat_index_tables(h, w)
+        s = (sr + 1) * W + sc + 1
+        t = (gr + 1) * W + gc + 1
+        if s == t:
+            return [(sr, sc)]
+        if pen[t] < 0:
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        octile = self.heuristic_name == "octile"
+        pen0, pen1 = self.move_penalties()
+        moves = [(1, STEP_COST, pen1), (-1, STEP_COST, pen1), (W, STEP_COST, pen0), (-W, STEP_COST, pen0)]
+        if octile:
+            moves += [(d, DIAG_COST, None) for d in (W + 1, W - 1, 1 - W, -1 - W)]
+        hw = int(round(self.weight * STEP_COST))
+        diag_save = 2 * hw - hw * DIAG_COST // STEP_COST
+
+        def heur(i, tr, tc):
+            dy = abs(rows[i] - tr)
+            dx = abs(cols[i] - tc)
+            if octile:
+                return hw * (dx + dy) - diag_save * (dx if dx < dy else dy)
+            return hw * (dx + dy)
+
+        fb = _flat_buffers(n, "fwd")
+        bb = _flat_buffers(n, "bwd")
+        heappush, heappop = heapq.heappush, heapq.heappop
+        HK = n * (hw * (h + w) + 1)
+        # side: (g, parent, seen, closed, gen, frontier, target row/col, is_forward)
+        sides = []
+        for buf, root, tr, tc, fwd in ((fb, s, gr, gc, True), (bb, t, sr, sc, False)):
+            buf["g"][root] = 0
+            buf["parent"][root] = -1
+            buf["seen"][root] = buf["gen"]
+            sides.append((buf["g"], buf["parent"], buf["seen"], buf["closed"], buf["gen"], [root], tr, tc, fwd))
+        fwd_side, bwd_side = sides
+        best, meet = None, -1
+        start_time = time.time()
+        limit = self._expansion_limit()
+        pops = stale = 0
+
+        while fwd_side[5] and bwd_side[5]:
+            if best is not None and (fwd_side[5][0] // HK >= best or bwd_side[5][0] // HK >= best):
+                break
+            if pops >= limit:
+                self._out_of_budget(pops)
+                self.pushes = pops + stale + len(fwd_side[5]) + len(bwd_side[5])
+                return []
+            side, other = (fwd_side, bwd_side) if len(fwd_side[5]) <= len(bwd_side[5]) else (bwd_side, fwd_side)
+            g, parent, seen, closed, gen, frontier, tr, tc, forward = side
+            og, oseen, ogen = other[0], other[2], other[4]
+            cur = heappop(frontier) % n
+            if closed[cur] == gen:
+                stale += 1
+                continue
+            closed[cur] = gen
+            pops += 1
+            if not pops & 0xFFF and time.time() - start_time > self.timeout:
+                print(f"Timeout reached after {self.timeout} seconds")
+                self.expanded = pops
+                return []
+            if not forward and cur == s:
+                continue
+
+            gcur = g[cur]
+            for d, step, mp in moves:
+                nxt = cur + d
+                if forward:
+                    p = pen[nxt]
+                    if p < 0 or closed[nxt] == gen:
+                        continue
+                else:
+                    # Backward edge nxt -> cur: nxt must be passable (or the start), cost is entering cur
+                    if (pen[nxt] < 0 and nxt != s) or closed[nxt] == gen:
+                        continue
+                    p = pen[cur]
+                ng = gcur + step + p
+                if mp is not None:
+                    ng += mp[cur] + mp[nxt]
+                if seen[nxt] != gen or ng < g[nxt]:
+                    seen[nxt] = gen
+                    g[nxt] = ng
+                    parent[nxt] = cur
+                    if oseen[nxt] == ogen and (best is None or ng + og[nxt] < best):
+                        best, meet = ng + og[nxt], nxt
+                    hn = heur(nxt, tr, tc)
+                    heappush(frontier, (ng + hn) * HK + hn * n + nxt)
+
+        self.expanded = pops
+        self.pushes = pops + stale + len(fwd_side[5]) + len(bwd_side[5])
+        if meet == -1:
+            print(f"No path found from {start} to {goal}")
+            return []
+
+        path = []
+        cur = meet
+        while cur != -1:
+            path.append((rows[cur], cols[cur]))
+            cur = fwd_side[1][cur]
+        path.reverse()
+        cur = bwd_side[1][meet]
+        while cur != -1:
+            path.append((rows[cur], cols[cur]))
+            cur = bwd_side[1][cur]
+        return path
+
     def reconstruct_path(self, came_from, start, goal):
         if goal not in came_from:
             print(f"No path found from {start} to {goal}")
@@ -77,3 +828,8 @@ if __name__ == "__main__":
     came_from, cost_so_far = astar.astar(start, goal)
     path = astar.reconstruct_path(came_from, start, goal)
     print("Path:", path)
+
+    print("Flat path:", AStar(grid, kernel="flat").find_path(start, goal))
+    for algorithm in ("jps", "bidirectional"):
+        search = AStar(grid, algorithm=algorithm)
+        print(f"{algorithm} path:", search.find_path(start, goal), search.stats)
@@ -4,8 +4,35 @@ import math
 import pprint
 import uuid
 from datetime import datetime
+from fractions import Fraction
+import lod
+from symbol_cache import SYMBOLS
 from wire import Wire
 
+# (block_type, inputs, outputs, width, height, rotation) -> Block._port_offsets()
+_PORT_OFFSETS = {}
+
+_H = Fraction(1, 2)
+
+
+def _rotate(cx, cy, x, y, rotation):
+    """
+    (x, y) turned rotation degrees about (cx, cy), with the float cos/sin
+    arithmetic ports have always used: saved wire endpoints carry its
+    rounding (e.g. 40.00000000000001 at 90 degrees) and are matched to
+    ports by equality, so the result must stay bit-for-bit the same.
+    """
+    angle = math.radians(rotation)
+    dx, dy = x - cx, y - cy
+    return (cx + dx * math.cos(angle) - dy * math.sin(angle),
+            cy + dx * math.sin(angle) + dy * math.cos(angle))
+
+
+def _column(kx, n):
+    """Coefficients of n ports down column kx, centred on successive block heights."""
+    return [(kx, Fraction(2 * i + 1, 2)) for i in range(n)]
+
+
 class Block:
     def __init__(self, x, y, width, height, text, block_type, grid_size, parent_window=None):
         self.id = f"block_{str(uuid.uuid4().int)[:10]}"  # Generate a unique 10-digit ID
@@ -39,6 +66,7 @@ class Block:
         self.output_wires = [[] for _ in self.output_points]  # List to store wire IDs for output points
         self.parent_window = parent_window  # Add the parent_window attribute
         self.custom_data = None  # populated for CUSTOM RTL blocks
+        self._bbox = None  # (geometry key, box) cached by bbox()
         self.update_points()
         self.init_wires()
 
@@ -161,6 +189,115 @@ class Block:
         "CNT_4BIT_UD":   (4, 5),
     }
 
+    # Port layout per block type: (input names, output names, input
+    # coefficients, output coefficients).  A port at (kx, ky) sits
+    # int(kx * width), int(ky * height) px from the top-left corner before
+    # the block is rotated about its centre.  Box-style types (_BOX_PORTS)
+    # and CUSTOM blocks get their coefficients from _port_coefficients().
+    _PORTS = {
+        "NOT":           (["IN1"], ["OUT1"], [(_H, 0)], [(_H, 1)]),
+        "BUF":           (["IN1"], ["OUT1"], [(_H, 0)], [(_H, 1)]),
+        **{t: (["IN1", "IN2"], ["OUT1"], [(0, 0), (1, 0)], [(_H, 1)])
+           for t in ("AND", "NAND", "OR", "NOR", "XOR", "XNOR")},
+        "JKFF":          (["J", "CLK", "K", "PRE", "CLR"], ["Q", "Q'"],
+                          [(0, 0), (1, 0), (2, 0), (0, 1), (2, 1)], [(0, 2), (2, 2)]),
+        "SRFF":          (["S", "CLK", "R", "PRE", "CLR"], ["Q", "Q'"],
+                          [(0, 0), (1, 0), (2, 0), (0, 1), (2, 1)], [(0, 2), (2, 2)]),
+        "DFF_PIPELINE":  (["D", "CLK", "N_RST"], ["Q"], [(0, 0), (2, 0), (0, 1)], [(1, 2)]),
+        "DFF":           (["D", "CLK", "PRE", "CLR"], ["Q", "Q'"],
+                          [(0, 0), (1, 0), (0, 1), (2, 1)], [(0, 2), (2, 2)]),
+        "TFF":           (["T", "CLK", "PRE", "CLR"], ["Q", "Q'"],
+                          [(0, 0), (1, 0), (0, 1), (2, 1)], [(0, 2), (2, 2)]),
+        "MUX_2X1":       (["I0", "I1", "S0", "EN"], ["O0"],
+                          _column(0, 2) + [(1, 2), (2, 2)], [(2, 1)]),
+        "MUX_4X1":       (["I0", "I1", "I2", "I3", "S0", "S1", "EN"], ["O0"],
+                          _column(0, 4) + [(1, 4), (2, 4), (3, 4)], [(3, 2)]),
+        "MUX_8X1":       (["I0", "I1", "I2", "I3", "I4", "I5", "I6", "I7", "S0", "S1", "S2", "EN"], ["O0"],
+                          _column(0, 8) + [(1, 8), (2, 8), (3, 8), (4, 8)], [(5, 4)]),
+        "TRISTATEBUF_2": (["I0", "I1", "EN"], ["O0", "O1"], _column(0, 2) + [(1, 2)], _column(2, 2)),
+        "TRISTATEBUF_4": (["I0", "I1", "I2", "I3", "EN"], ["O0", "O1", "O2", "O3"],
+                          _column(0, 4) + [(1, 4)], _column(3, 4)),
+        "TRISTATEBUF_8": (["I0", "I1", "I2", "I3", "I4", "I5", "I6", "I7", "EN"],
+                          ["O0", "O1", "O2", "O3", "O4", "O5", "O6", "O7"],
+                          _column(0, 8) + [(1, 8)], _column(5, 8)),
+        **{t: (["SI", "CI", "A", "B"], ["CO", "SO"], [(0, 0), (2, 0), (0, 1), (2, 1)], [(0, 2), (2, 2)])
+           for t in ("FA", "FA_GC", "FA_WC")},
+        "HA":            (["A", "B"], ["CO", "SO"], [(0, 0), (2, 0)], [(0, 2), (2, 2)]),
+        # 3-input gates
+        **{t: (["IN1", "IN2", "IN3"], ["OUT1"], [(0, 0), (_H, 0), (1, 0)], [(_H, 1)])
+           for t in ("AND3", "OR3", "NAND3", "NOR3", "XOR3")},
+        # 4-input gates
+        **{t: (["IN1", "IN2", "IN3", "IN4"], ["OUT1"],
+               [(0, 0), (Fraction(1, 3), 0), (Fraction(2, 3), 0), (1, 0)], [(_H, 1)])
+           for t in ("AND4", "OR4", "NAND4", "NOR4")},
+        # latches
+        "DLATCH":        (["D", "EN"], ["Q", "Q'"], [(0, 0), (2, 0)], [(0, 2), (2, 2)]),
+        "SRLATCH":       (["S", "R"], ["Q", "Q'"], [(0, 0), (2, 0)], [(0, 2), (2, 2)]),
+    }
+
+    # (input names, output names) of the box-style blocks: decoder, encoder,
+    # demux, arithmetic, sequential
+    _BOX_PORTS = {
+        "DEC_2TO4":    (["A","B","EN"],
+                        ["Y0","Y1","Y2","Y3"]),
+        "DEC_3TO8":    (["A","B","C","EN"],
+                        ["Y0","Y1","Y2","Y3","Y4","Y5","Y6","Y7"]),
+        "ENC_4TO2":    (["I0","I1","I2","I3"],
+                        ["Y0","Y1","VALID"]),
+        "DEMUX_1TO4":  (["I","S0","S1","EN"],
+                        ["O0","O1","O2","O3"]),
+        "DEMUX_1TO8":  (["I","S0","S1","S2","EN"],
+                        ["O0","O1","O2","O3","O4","O5","O6","O7"]),
+        "RCA_4BIT":    (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
+                        ["S0","S1","S2","S3","COUT"]),
+        "COMP_4BIT":   (["A0","A1","A2","A3","B0","B1","B2","B3"],
+                        ["ALB","AEB","AGB"]),
+        "CLA4":        (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
+                        ["S0","S1","S2","S3","COUT"]),
+        "CARRY_SEL4":  (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
+                        ["S0","S1","S2","S3","COUT"]),
+        "KS4":         (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
+                        ["S0","S1","S2","S3","COUT"]),
+        "BK4":         (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
+                        ["S0","S1","S2","S3","COUT"]),
+        "CSA":         (["A","B","C"],
+                        ["SO","CO"]),
+        "WALLACE3_4":  (["A0","A1","A2","A3","B0","B1","B2","B3","C0","C1","C2","C3"],
+                        ["P0","P1","P2","P3","P4","P5"]),
+        "MOD_ADD4":    (["A0","A1","A2","A3","B0","B1","B2","B3","M0","M1","M2","M3"],
+                        ["R0","R1","R2","R3"]),
+        "ARRAY_MULT4": (["A0","A1","A2","A3","B0","B1","B2","B3"],
+                        ["P0","P1","P2","P3","P4","P5","P6","P7"]),
+        "BOOTH_MULT4": (["A0","A1","A2","A3","B0","B1","B2","B3"],
+                        ["P0","P1","P2","P3","P4","P5","P6","P7"]),
+        "SQ4":         (["A0","A1","A2","A3"],
+                        ["P0","P1","P2","P3","P4","P5","P6","P7"]),
+        "REST_DIV4":   (["N0","N1","N2","N3","D0","D1","D2","D3"],
+                        ["Q0","Q1","Q2","Q3","R0","R1","R2","R3"]),
+        "NONREST_DIV4":(["N0","N1","N2","N3","D0","D1","D2","D3"],
+                        ["Q0","Q1","Q2","Q3","R0","R1","R2","R3"]),
+        "SRT_DIV4":    (["N0","N1","N2","N3","D0","D1","D2","D3"],
+                        ["Q0","Q1","Q2","Q3","R0","R1","R2","R3"]),
+        "GF_ADD4":     (["A0","A1","A2","A3","B0","B1","B2","B3"],
+                        ["R0","R1","R2","R3"]),
+        "GF_MUL4":     (["A0","A1","A2","A3","B0","B1","B2","B3"],
+                        ["R0","R1","R2","R3"]),
+        "BOOTH4_MULT4":(["A0","A1","A2","A3","B0","B1","B2","B3"],
+                        ["P0","P1","P2","P3","P4","P5","P6","P7"]),
+        "DADDA4":      (["A0","A1","A2","A3","B0","B1","B2","B3","C0","C1","C2","C3"],
+                        ["P0","P1","P2","P3","P4","P5"]),
+        "BSR4":        (["A0","A1","A2","A3","AMT0","AMT1"],
+                        ["R0","R1","R2","R3"]),
+        "MOD_MUL4":    (["A0","A1","A2","A3","B0","B1","B2","B3","M0","M1","M2","M3"],
+                        ["R0","R1","R2","R3"]),
+        "SHREG_4BIT":  (["SIN","CLK","RST"],
+                        ["Q0","Q1","Q2","Q3"]),
+        "CNT_4BIT":    (["CLK","RST","EN"],
+                        ["Q0","Q1","Q2","Q3","TC"]),
+        "CNT_4BIT_UD": (["CLK","RST","EN","DIR"],
+                        ["Q0","Q1","Q2","Q3","TC"]),
+    }
+
     def init_wires(self):
         if self.block_type == "CUSTOM":
             cd = self.custom_data or {}
@@ -174,269 +311,102 @@ class Block:
     def set_selected(self, selected):
         self.selected = selected
 
-    def update_points(self):
-        if self.block_type == "NOT":
-            self.input_points = [self.rotate_point(int(self.x + self.width/2), int(self.y))]
-            self.output_points = [self.rotate_point(int(self.x + self.width/2), int(self.y + self.height))]
-            self.input_names = ["IN1"]
-            self.output_names = ["OUT1"]
-        elif self.block_type in ["AND", "NAND", "OR", "NOR", "XOR", "XNOR"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y)), self.rotate_point(int(self.x + self.width), int(self.y))]
-            self.output_points = [self.rotate_point(int(self.x + self.width/2), int(self.y + self.height))]
-            self.input_names = ["IN1", "IN2"]
-            self.output_names = ["OUT1"]
-        elif self.block_type in ["JKFF", "SRFF"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y)), self.rotate_point(int(self.x + self.width), int(self.y)), self.rotate_point(int(self.x + self.width*2), int(self.y)), \
-                                 self.rotate_point(int(self.x), int(self.y + self.height)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height))] 
-            self.output_points = [self.rotate_point(int(self.x), int(self.y + self.height*2)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height*2))]
-            if self.block_type in ["JKFF"]:
-               self.input_names = ["J","CLK","K", "PRE", "CLR"]
-               self.output_names = ["Q","Q'"]
-            elif self.block_type in ["SRFF"]:
-               self.input_names = ["S","CLK","R", "PRE", "CLR"]
-               self.output_names = ["Q","Q'"]
-        elif self.block_type in ["DFF_PIPELINE"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y)), self.rotate_point(int(self.x + self.width*2), int(self.y)), \
-                                 self.rotate_point(int(self.x), int(self.y + self.height))] 
-            self.output_points = [self.rotate_point(int(self.x + self.width), int(self.y + self.height*2))]
-            self.input_names = ["D","CLK", "N_RST"]
-            self.output_names = ["Q"]
-        elif self.block_type in ["DFF", "TFF"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y)), self.rotate_point(int(self.x + self.width), int(self.y)), \
-                                 self.rotate_point(int(self.x), int(self.y + self.height)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height))] 
-            self.output_points = [self.rotate_point(int(self.x), int(self.y + self.height*2)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height*2))]
-            if self.block_type in ["DFF"]:
-               self.input_names = ["D","CLK", "PRE", "CLR"]
-               self.output_names = ["Q","Q'"]
-            elif self.block_type in ["TFF"]:
-               self.input_names = ["T","CLK", "PRE", "CLR"]
-               self.output_names = ["Q","Q'"]
-        elif self.block_type in ["MUX_2X1"]:
-            #print("MUX_2x1")
-            self.input_points = [self.rotate_point(int(self.x), int(self.y + self.height/2)), self.rotate_point(int(self.x), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x + 1*self.width), int(self.y + 2*self.height)), self.rotate_point(int(self.x + 2*self.width), int(self.y + 2*self.height))]
-            self.output_points = [self.rotate_point(int(self.x + self.width*(1+1)), int(self.y + self.height))]
-            self.input_names = ["I0","I1","S0","EN"]
-            self.output_names = ["O0"]
-        elif self.block_type in ["MUX_4X1"]:
-            #print("MUX_4x1")
-            self.input_points = [self.rotate_point(int(self.x), int(self.y + self.height/2)), self.rotate_point(int(self.x), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x), int(self.y + 5*self.height/2)), self.rotate_point(int(self.x), int(self.y + 7*self.height/2)), self.rotate_point(int(self.x + 1*self.width), int(self.y + 4*self.height)), self.rotate_point(int(self.x + 2*self.width), int(self.y + 4*self.height)), self.rotate_point(int(self.x + 3*self.width), int(self.y + 4*self.height)) ]
-            self.output_points = [self.rotate_point(int(self.x + self.width*(2+1)), int(self.y + 2*self.height))]
-            self.input_names = ["I0","I1","I2","I3","S0","S1","EN"]
-            self.output_names = ["O0"]
-        elif self.block_type in ["MUX_8X1"]:
-            #print("MUX_8x1")
-            self.input_points = [self.rotate_point(int(self.x), int(self.y + self.height/2)), self.rotate_point(int(self.x), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x), int(self.y + 5*self.height/2)), self.rotate_point(int(self.x), int(self.y + 7*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 9*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 11*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 13*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 15*self.height/2)), self.rotate_point(int(self.x + 1*self.width), int(self.y + 8*self.height)), self.rotate_point(int(self.x + 2*self.width), int(self.y + 8*self.height)), self.rotate_point(int(self.x + 3*self.width), int(self.y + 8*self.height)), self.rotate_point(int(self.x + 4*self.width), int(self.y + 8*self.height))]
-            self.output_points = [self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 4*self.height))]
-            self.input_names = ["I0","I1","I2","I3","I4","I5","I6","I7","S0","S1","S2","EN"]
-            self.output_names = ["O0"]
-        elif self.block_type in ["TRISTATEBUF_2"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y + self.height/2)), self.rotate_point(int(self.x), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x + 1*self.width), int(self.y + 2*self.height))]
-            self.output_points = [self.rotate_point(int(self.x + self.width*(1+1)), int(self.y + self.height/2)), self.rotate_point(int(self.x + self.width*(1+1)), int(self.y + 3*self.height/2))]
-            self.input_names = ["I0","I1","EN"]
-            self.output_names = ["O0","O1"]
-        elif self.block_type in ["TRISTATEBUF_4"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y + self.height/2)), self.rotate_point(int(self.x), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x), int(self.y + 5*self.height/2)), self.rotate_point(int(self.x), int(self.y + 7*self.height/2)), self.rotate_point(int(self.x + 1*self.width), int(self.y + 8*self.height/2))]
-            self.output_points = [self.rotate_point(int(self.x + self.width*(2+1)), int(self.y + self.height/2)), self.rotate_point(int(self.x + self.width*(2+1)), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x + self.width*(2+1)), int(self.y + 5*self.height/2)), self.rotate_point(int(self.x + self.width*(2+1)), int(self.y + 7*self.height/2))]
-            self.input_names = ["I0","I1","I2","I3","EN"]
-            self.output_names = ["O0","O1","O2","O3"]
-        elif self.block_type in ["TRISTATEBUF_8"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y + self.height/2)), self.rotate_point(int(self.x), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x), int(self.y + 5*self.height/2)), self.rotate_point(int(self.x), int(self.y + 7*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 9*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 11*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 13*self.height/2)),  self.rotate_point(int(self.x), int(self.y + 15*self.height/2)), self.rotate_point(int(self.x + 1*self.width), int(self.y + 8*self.height))]
-            self.output_points = [self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + self.height/2)), self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 3*self.height/2)), self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 5*self.height/2)), self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 7*self.height/2)),  self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 9*self.height/2)),  self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 11*self.height/2)),  self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 13*self.height/2)),  self.rotate_point(int(self.x + self.width*(2+3)), int(self.y + 15*self.height/2))]
-            self.input_names = ["I0","I1","I2","I3","I4","I5","I6","I7","EN"]
-            self.output_names = ["O0","O1","O2","O3","O4","O5","O6","O7"]
-        elif self.block_type in ["FA","FA_GC", "FA_WC"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y)), self.rotate_point(int(self.x + self.width*2), int(self.y)), \
-                                 self.rotate_point(int(self.x), int(self.y + self.height)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height))] 
-            self.output_points = [self.rotate_point(int(self.x), int(self.y + self.height*2)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height*2))]
-            self.input_names = ["SI","CI", "A", "B"]
-            self.output_names = ["CO","SO"]
-        elif self.block_type in ["HA"]:
-            self.input_points = [self.rotate_point(int(self.x), int(self.y)), self.rotate_point(int(self.x + self.width*2), int(self.y))]
-            self.output_points = [self.rotate_point(int(self.x), int(self.y + self.height*2)), self.rotate_point(int(self.x + self.width*2), int(self.y + self.height*2))]
-            self.input_names = ["A", "B"]
-            self.output_names = ["CO","SO"]
-        # ── 3-input gates ────────────────────────────────────────────────────
-        elif self.block_type in ["AND3", "OR3", "NAND3", "NOR3", "XOR3"]:
-            self.input_points = [
-                self.rotate_point(int(self.x),                int(self.y)),
-                self.rotate_point(int(self.x + self.width/2), int(self.y)),
-                self.rotate_point(int(self.x + self.width),   int(self.y)),
-            ]
-            self.output_points = [
-                self.rotate_point(int(self.x + self.width/2), int(self.y + self.height)),
-            ]
-            self.input_names  = ["IN1", "IN2", "IN3"]
-            self.output_names = ["OUT1"]
-        # ── 4-input gates ────────────────────────────────────────────────────
-        elif self.block_type in ["AND4", "OR4", "NAND4", "NOR4"]:
-            self.input_points = [
-                self.rotate_point(int(self.x),                  int(self.y)),
-                self.rotate_point(int(self.x + self.width/3),   int(self.y)),
-                self.rotate_point(int(self.x + 2*self.width/3), int(self.y)),
-                self.rotate_point(int(self.x + self.width),     int(self.y)),
-            ]
-            self.output_points = [
-                self.rotate_point(int(self.x + self.width/2), int(self.y + self.height)),
-            ]
-            self.input_names  = ["IN1", "IN2", "IN3", "IN4"]
-            self.output_names = ["OUT1"]
-        # ── buffer ───────────────────────────────────────────────────────────
-        elif self.block_type == "BUF":
-            self.input_points  = [self.rotate_point(int(self.x + self.width/2), int(self.y))]
-            self.output_points = [self.rotate_point(int(self.x + self.width/2), int(self.y + self.height))]
-            self.input_names   = ["IN1"]
-            self.output_names  = ["OUT1"]
-        # ── latches ──────────────────────────────────────────────────────────
-        elif self.block_type == "DLATCH":
-            self.input_points = [
-                self.rotate_point(int(self.x),               int(self.y)),
-                self.rotate_point(int(self.x + self.width*2), int(self.y)),
-            ]
-            self.output_points = [
-                self.rotate_point(int(self.x),               int(self.y + self.height*2)),
-                self.rotate_point(int(self.x + self.width*2), int(self.y + self.height*2)),
-            ]
-            self.input_names  = ["D", "EN"]
-            self.output_names = ["Q", "Q'"]
-        elif self.block_type == "SRLATCH":
-            self.input_points = [
-                self.rotate_point(int(self.x),               int(self.y)),
-                self.rotate_point(int(self.x + self.width*2), int(self.y)),
-            ]
-            self.output_points = [
-                self.rotate_point(int(self.x),               int(self.y + self.height*2)),
-                self.rotate_point(int(self.x + self.width*2), int(self.y + self.height*2)),
-            ]
-            self.input_names  = ["S", "R"]
-            self.output_names = ["Q", "Q'"]
-        # ── box-style blocks: decoder, encoder, demux, arithmetic, sequential
-        elif self.block_type in ["DEC_2TO4", "DEC_3TO8", "ENC_4TO2",
-                                  "DEMUX_1TO4", "DEMUX_1TO8",
-                                  "RCA_4BIT", "COMP_4BIT",
-                                  "CLA4", "CARRY_SEL4", "KS4", "BK4",
-                                  "CSA", "WALLACE3_4", "MOD_ADD4",
-                                  "ARRAY_MULT4", "BOOTH_MULT4", "SQ4",
-                                  "REST_DIV4", "NONREST_DIV4", "SRT_DIV4",
-                                  "GF_ADD4", "GF_MUL4", "BOOTH4_MULT4",
-                                  "DADDA4", "BSR4", "MOD_MUL4",
-                                  "SHREG_4BIT", "CNT_4BIT", "CNT_4BIT_UD"]:
-            _BOX_PORTS = {
-                "DEC_2TO4":    (["A","B","EN"],
-                                ["Y0","Y1","Y2","Y3"]),
-                "DEC_3TO8":    (["A","B","C","EN"],
-                                ["Y0","Y1","Y2","Y3","Y4","Y5","Y6","Y7"]),
-                "ENC_4TO2":    (["I0","I1","I2","I3"],
-                                ["Y0","Y1","VALID"]),
-                "DEMUX_1TO4":  (["I","S0","S1","EN"],
-                                ["O0","O1","O2","O3"]),
-                "DEMUX_1TO8":  (["I","S0","S1","S2","EN"],
-                                ["O0","O1","O2","O3","O4","O5","O6","O7"]),
-                "RCA_4BIT":    (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
-                                ["S0","S1","S2","S3","COUT"]),
-                "COMP_4BIT":   (["A0","A1","A2","A3","B0","B1","B2","B3"],
-                                ["ALB","AEB","AGB"]),
-                "CLA4":        (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
-                                ["S0","S1","S2","S3","COUT"]),
-                "CARRY_SEL4":  (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
-                                ["S0","S1","S2","S3","COUT"]),
-                "KS4":         (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
-                                ["S0","S1","S2","S3","COUT"]),
-                "BK4":         (["A0","A1","A2","A3","B0","B1","B2","B3","CIN"],
-                                ["S0","S1","S2","S3","COUT"]),
-                "CSA":         (["A","B","C"],
-                                ["SO","CO"]),
-                "WALLACE3_4":  (["A0","A1","A2","A3","B0","B1","B2","B3","C0","C1","C2","C3"],
-                                ["P0","P1","P2","P3","P4","P5"]),
-                "MOD_ADD4":    (["A0","A1","A2","A3","B0","B1","B2","B3","M0","M1","M2","M3"],
-                                ["R0","R1","R2","R3"]),
-                "ARRAY_MULT4": (["A0","A1","A2","A3","B0","B1","B2","B3"],
-                                ["P0","P1","P2","P3","P4","P5","P6","P7"]),
-                "BOOTH_MULT4": (["A0","A1","A2","A3","B0","B1","B2","B3"],
-                                ["P0","P1","P2","P3","P4","P5","P6","P7"]),
-                "SQ4":         (["A0","A1","A2","A3"],
-                                ["P0","P1","P2","P3","P4","P5","P6","P7"]),
-                "REST_DIV4":   (["N0","N1","N2","N3","D0","D1","D2","D3"],
-                                ["Q0","Q1","Q2","Q3","R0","R1","R2","R3"]),
-                "NONREST_DIV4":(["N0","N1","N2","N3","D0","D1","D2","D3"],
-                                ["Q0","Q1","Q2","Q3","R0","R1","R2","R3"]),
-                "SRT_DIV4":    (["N0","N1","N2","N3","D0","D1","D2","D3"],
-                                ["Q0","Q1","Q2","Q3","R0","R1","R2","R3"]),
-                "GF_ADD4":     (["A0","A1","A2","A3","B0","B1","B2","B3"],
-                                ["R0","R1","R2","R3"]),
-                "GF_MUL4":     (["A0","A1","A2","A3","B0","B1","B2","B3"],
-                                ["R0","R1","R2","R3"]),
-                "BOOTH4_MULT4":(["A0","A1","A2","A3","B0","B1","B2","B3"],
-                                ["P0","P1","P2","P3","P4","P5","P6","P7"]),
-                "DADDA4":      (["A0","A1","A2","A3","B0","B1","B2","B3","C0","C1","C2","C3"],
-                                ["P0","P1","P2","P3","P4","P5"]),
-                "BSR4":        (["A0","A1","A2","A3","AMT0","AMT1"],
-                                ["R0","R1","R2","R3"]),
-                "MOD_MUL4":    (["A0","A1","A2","A3","B0","B1","B2","B3","M0","M1","M2","M3"],
-                                ["R0","R1","R2","R3"]),
-                "SHREG_4BIT":  (["SIN","CLK","RST"],
-                                ["Q0","Q1","Q2","Q3"]),
-                "CNT_4BIT":    (["CLK","RST","EN"],
-                                ["Q0","Q1","Q2","Q3","TC"]),
-                "CNT_4BIT_UD": (["CLK","RST","EN","DIR"],
-                                ["Q0","Q1","Q2","Q3","TC"]),
-            }
-            in_names, out_names = _BOX_PORTS[self.block_type]
-            n_in, n_out = len(in_names), len(out_names)
-            n = max(n_in, n_out)
-            total_h = n * self.height
-            box_w   = self.width * 2
-            self.input_points = [
-                self.rotate_point(int(self.x),
-                                  int(self.y + total_h * (i + 0.5) / n_in))
-                for i in range(n_in)
-            ]
-            self.output_points = [
-                self.rotate_point(int(self.x + box_w),
-                                  int(self.y + total_h * (i + 0.5) / n_out))
-                for i in range(n_out)
-            ]
-            self.input_names  = list(in_names)
-            self.output_names = list(out_names)
-        elif self.block_type == "CUSTOM":
+    def _port_names(self):
+        """(input names, output names) of the block type, or None for an unknown type."""
+        if self.block_type == "CUSTOM":
             cd = self.custom_data or {}
-            in_names  = cd.get("input_names",  [])
-            out_names = cd.get("output_names", [])
-            n_in  = len(in_names)
-            n_out = len(out_names)
-            self.input_points = []
-            for i in range(n_in):
-                t = (i + 1) / (n_in + 1)
-                self.input_points.append(
-                    self.rotate_point(int(self.x), int(self.y + t * self.height)))
-            self.output_points = []
-            for i in range(n_out):
-                t = (i + 1) / (n_out + 1)
-                self.output_points.append(
-                    self.rotate_point(int(self.x + self.width), int(self.y + t * self.height)))
-            self.input_names  = list(in_names)
-            self.output_names = list(out_names)
-
-        # Initialize connections for new points
-        #self.input_connections = {point: None for point in self.input_points}
-        #self.output_connections = {point: None for point in self.output_points}
-
-        # Print all points in input and output connections
-        #print(f"Input Points: {self.input_points}")
-        #print(f"Output Points: {self.output_points}")
-        #print(f"Input Connections: {self.input_connections}")
-        #print(f"Output Connections: {self.output_connections}")
+            return cd.get("input_names", []), cd.get("output_names", [])
+        ports = self._PORTS.get(self.block_type) or self._BOX_PORTS.get(self.block_type)
+        return ports and ports[:2]
+
+    def _port_coefficients(self, n_in, n_out):
+        """(input, output) port coefficients, as in _PORTS, of this block's type."""
+        if self.block_type in self._PORTS:
+            return self._PORTS[self.block_type][2:]
+        if self.block_type == "CUSTOM":
+            return ([(0, Fraction(i + 1, n_in + 1)) for i in range(n_in)],
+                    [(1, Fraction(i + 1, n_out + 1)) for i in range(n_out)])
+        # Box-style: inputs down the left edge, outputs down the right edge of a
+        # 2-wide box, each spread evenly over max(n_in, n_out) block heights
+        n = max(n_in, n_out)
+        return ([(0, Fraction(n * (2 * i + 1), 2 * n_in)) for i in range(n_in)],
+                [(2, Fraction(n * (2 * i + 1), 2 * n_out)) for i in range(n_out)])
+
+    def _port_offsets(self, n_in, n_out):
+        """
+        Port offsets for this block's type, size and rotation: (input, output)
+        offsets from the top-left corner before rounding and rotation, then
+        (input, output) offsets of the final points for an unrotated block
+        whose corner is on a whole pixel (None when rotated: rotate_point()'s
+        rounding depends on where the block is, so it is redone per port).
+        """
+        w, h, rotation = self.width, self.height, self.rotation
+        raw, placed = [], []
+        for coeffs in self._port_coefficients(n_in, n_out):
+            raw.append([(float(kx * w), float(ky * h)) for kx, ky in coeffs])
+            placed.append([_rotate(w / 2, h / 2, int(kx * w), int(ky * h), rotation) for kx, ky in coeffs])
+        if rotation:
+            placed = [None, None]
+        return raw[0], raw[1], placed[0], placed[1]
+
+    def update_points(self):
+        names = self._port_names()
+        if names is None:
+            return
+        in_names, out_names = names
+        key = (self.block_type, len(in_names), len(out_names), self.width, self.height, self.rotation)
+        offsets = _PORT_OFFSETS.get(key)
+        if offsets is None:
+            offsets = _PORT_OFFSETS[key] = self._port_offsets(len(in_names), len(out_names))
+        x, y = self.x, self.y
+        if offsets[2] is not None and x >= 0 and y >= 0 and x == int(x) and y == int(y):
+            # Unrotated on a whole pixel: the rounding is already in the offsets
+            self.input_points = [(x + dx, y + dy) for dx, dy in offsets[2]]
+            self.output_points = [(x + dx, y + dy) for dx, dy in offsets[3]]
+        else:
+            # Rotated, or mid-drag (fractional corner): round each port, then rotate it
+            self.input_points = [self.rotate_point(int(x + dx), int(y + dy)) for dx, dy in offsets[0]]
+            self.output_points = [self.rotate_point(int(x + dx), int(y + dy)) for dx, dy in offsets[1]]
+        self.input_names = list(in_names)
+        self.output_names = list(out_names)
 
     def rotate_point(self, x, y):
         # Rotate the point around the center of the block
-        cx, cy = self.x + self.width / 2, self.y + self.height / 2
-        #cx, cy = self.x + self.width, self.y + self.height
-        angle = math.radians(self.rotation)
-        dx, dy = x - cx, y - cy
-        new_x = cx + dx * math.cos(angle) - dy * math.sin(angle)
-        new_y = cy + dx * math.sin(angle) + dy * math.cos(angle)
-        return (new_x, new_y)
-
-    def draw(self, cr):
+        return _rotate(self.x + self.width / 2, self.y + self.height / 2, x, y, self.rotation)
+
+    def symbol_key(self):
+        """Everything draw() depends on besides (x, y); SYMBOLS keys its images on it."""
+        x, y = self.x, self.y
+        return ("block", self.block_type, self.width, self.height, self.rotation,
+                tuple(self.border_color), tuple(self.fill_color), tuple(self.text_color),
+                self.selected, self.text, (self.custom_data or {}).get("entity_name"),
+                tuple((px - x, py - y) for px, py in self.input_points + self.output_points),
+                tuple(self.input_names), tuple(self.output_names))
+
+    def draw(self, cr, detail=lod.FULL):
+        if detail >= lod.OUTLINE:
+            self.draw_outline(cr)
+        elif self.x == int(self.x) and self.y == int(self.y):
+            SYMBOLS.paint(cr, self.symbol_key(), (self.x, self.y), self._draw_symbol)
+        else:
+            self._draw_symbol(cr)   # mid-drag: a fractional corner is not worth an image
+
+    def draw_outline(self, cr):
+        """Zoomed-out stand-in: the rotated body as one filled rectangle, without text or dots."""
+        rw, rh = self._render_size()
+        cr.save()
+        cr.translate(self.x + self.width / 2, self.y + self.height / 2)
+        cr.rotate(math.radians(self.rotation))
+        cr.translate(-self.width / 2, -self.height / 2)
+        cr.rectangle(0, 0, rw, rh)
+        cr.set_source_rgb(*((1, 1, 0) if self.selected else self.fill_color))
+        cr.fill_preserve()
+        cr.set_source_rgb(*self.border_color)
+        cr.set_line_width(1)
+        cr.stroke()
+        cr.restore()
+
+    def _draw_symbol(self, cr):
         cr.save()
         cr.translate(self.x + self.width / 2, self.y + self.height / 2)
         cr.rotate(math.radians(self.rotation))
@@ -1381,6 +1351,27 @@ class Block:
             return self.width * 2, self.height * _BOX_H[bt]
         return self.width, self.height
 
+    def bbox(self):
+        """
+        Canvas-px (x0, y0, x1, y1) that draw() can paint into: the rotated
+        body, which holds the connection dots, plus a margin for the port
+        and title text (about 6 px per character at these font sizes).
+        Cached until the block moves, resizes, rotates or is renamed.
+        """
+        key = (self.x, self.y, self.width, self.height, self.rotation, self.block_type, self.text,
+               id(self.custom_data))
+        if self._bbox is not None and self._bbox[0] == key:
+            return self._bbox[1]
+        rw, rh = self._render_size()
+        corners = [_rotate(self.width / 2, self.height / 2, x, y, self.rotation)
+                   for x, y in ((0, 0), (rw, 0), (0, rh), (rw, rh))]
+        in_names, out_names = self._port_names() or ([], [])
+        pad = 14 + 6 * max(len(n) for n in [self.text, *in_names, *out_names])
+        box = (self.x + min(x for x, _ in corners) - pad, self.y + min(y for _, y in corners) - pad,
+               self.x + max(x for x, _ in corners) + pad, self.y + max(y for _, y in corners) + pad)
+        self._bbox = (key, box)
+        return box
+
     def contains_point(self, x, y, tolerance=10):
         rw, rh = self._render_size()
         return (self.x - tolerance <= int(x) <= self.x + rw + tolerance and
@@ -1,17 +1,33 @@
 #!/usr/bin/env python3
+import itertools
+import math
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, Gdk
 from blocks import Block
-import numpy as np
+from frame_stats import FrameStats
+from grid_background import GridBackground
+from routing_grid import OccupancyGrid
+from view_index import BoxIndex
+from wire_index import SegmentIndex
 
 class DrawingArea(Gtk.DrawingArea):
     CANVAS_SIZE = 5000
+    # Bounds on the "canvas_size" preference; larger sheets are not supported
+    MIN_CANVAS_SIZE = 1000
+    MAX_CANVAS_SIZE = 100_000
+    # Beyond this many damaged rects, queue_damage() redraws their union instead
+    DAMAGE_RECTS = 32
 
     def __init__(self, parent_window):
         super().__init__()
         self.parent_window = parent_window
-        self.grid = None
+        self.occupancy = None
+        self.wire_index = SegmentIndex()    # wires re-index themselves when their path changes
+        self.background = GridBackground()  # grid dots and axis labels, rendered once per zoom
+        self.view_index = BoxIndex()        # element bounding boxes for culling on_draw to the clip
+        self._selected = set()              # elements selected as of the last queue_damage()
+        self.frame_stats = FrameStats()     # on_draw phase timings, off unless SVCG_FRAME_STATS is set
         self.zoom = 1.0
         self.connect("draw", self.on_draw)
         self.set_events(Gdk.EventMask.BUTTON_PRESS_MASK |
@@ -27,7 +43,9 @@ class DrawingArea(Gtk.DrawingArea):
         self.set_can_focus(True)
 
     def on_draw(self, widget, cr):
-        self.create_grid(self.CANVAS_SIZE, self.CANVAS_SIZE, self.parent_window.grid_size)
+        self.frame_stats.begin()
+        self.sync_grid()
+        self.frame_stats.mark("grid")
         cr.scale(self.zoom, self.zoom)
         self.parent_window.on_draw(widget, cr)
 
@@ -43,23 +61,80 @@ class DrawingArea(Gtk.DrawingArea):
             return True
         return False
 
+    @property
+    def grid(self):
+        """Current routing occupancy array (cells > 0 are blocked)."""
+        return self.occupancy.grid if self.occupancy is not None else None
+
     def create_grid(self, width, height, grid_size):
-        self.grid = np.zeros((height // grid_size, width // grid_size), dtype=int)
-        for block in self.parent_window.blocks:
-            self.mark_block_on_grid(block, grid_size)
-        for pin in self.parent_window.pins:
-            self.mark_pin_on_grid(pin, grid_size)
-        #print(f"Grid created: {self.grid}")
+        """Rebuild the occupancy grid from scratch (e.g. after a grid-size change)."""
+        self.occupancy = OccupancyGrid(width, height, grid_size)
+        self.occupancy.sync(self.parent_window.blocks, self.parent_window.pins)
+
+    def sync_grid(self):
+        """Patch the occupancy grid for blocks/pins added, moved or deleted since the last sync."""
+        gs = self.parent_window.grid_size
+        if self.occupancy is None or self.occupancy.grid_size != gs:
+            self.create_grid(self.CANVAS_SIZE, self.CANVAS_SIZE, gs)
+        else:
+            self.occupancy.sync(self.parent_window.blocks, self.parent_window.pins)
+        return self.occupancy
+
+    def routing_snapshot(self):
+        """(version, grid) of the up-to-date occupancy grid, safe to route against."""
+        return self.sync_grid().snapshot()
+
+    def routing_labels(self):
+        """Free-cell component labels matching routing_snapshot()'s grid."""
+        return self.sync_grid().components()
+
+    def routing_hierarchy(self):
+        """Cluster graph (routing_hpa.ClusterGraph) matching routing_snapshot()'s grid."""
+        return self.sync_grid().hierarchy()
+
+    def visible_elements(self, x0, y0, x1, y1):
+        """Blocks, pins and wires (in that drawing order) whose bounding box meets the canvas rect."""
+        pw = self.parent_window
+        self.view_index.sync(itertools.chain(pw.blocks, pw.pins, pw.wires))
+        return self.view_index.query(x0, y0, x1, y1)
+
+    def queue_damage(self, *rects):
+        """
+        Queue a redraw of only what changed: the old and new boxes of the
+        blocks, pins and wires that moved, appeared, vanished or changed
+        selection since the index was last synced, plus any extra canvas-px
+        rects (x0, y0, x1, y1).  Returns the number of rects queued; 0 means
+        nothing needed redrawing.
+        """
+        pw = self.parent_window
+        elements = list(itertools.chain(pw.blocks, pw.pins, pw.wires))
+        damage = list(rects)
+        self.view_index.sync(elements, damage)
+        selected = {elem for elem in elements if elem.selected}
+        for elem in selected.symmetric_difference(self._selected):
+            box = self.view_index.get(elem)
+            if box is not None:
+                damage.append(box)
+        self._selected = selected
+        if len(damage) > self.DAMAGE_RECTS:
+            damage = [(min(r[0] for r in damage), min(r[1] for r in damage),
+                       max(r[2] for r in damage), max(r[3] for r in damage))]
+        z = self.zoom
+        for x0, y0, x1, y1 in damage:
+            # Widget px, one px wider all round for antialiasing
+            x, y = math.floor(x0 * z) - 1, math.floor(y0 * z) - 1
+            self.queue_draw_area(x, y, math.ceil(x1 * z) + 1 - x, math.ceil(y1 * z) + 1 - y)
+        return len(damage)
+
+    def wire_at(self, x, y):
+        """The wire under canvas point (x, y), first in parent_window.wires order, or None."""
+        return self.wire_index.hit(x, y, self.parent_window.wires)
 
     def mark_block_on_grid(self, block, grid_size):
-        x1, y1 = int(block.x // grid_size), int(block.y // grid_size)
-        x2, y2 = int((block.x + block.width) // grid_size), int((block.y + block.height) // grid_size)
-        self.grid[y1:y2, x1:x2] = 1
+        self.occupancy.update(block)
 
     def mark_pin_on_grid(self, pin, grid_size):
-        x1, y1 = int(pin.x // grid_size), int(pin.y // grid_size)
-        x2, y2 = int((pin.x + pin.width) // grid_size), int((pin.y + pin.height) // grid_size)
-        self.grid[y1:y2, x1:x2] = 1
+        self.occupancy.update(pin)
 
     def on_button_press(self, widget, event):
         self.parent_window.on_button_press(widget, event)
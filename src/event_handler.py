@@ -6,7 +6,9 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk
 from datetime import datetime
+import lod
 from drawing_area import DrawingArea
+from pins import Pin
 from wire import Wire
 
 
@@ -17,40 +19,32 @@ class EventHandlerMixin:
             dark = getattr(self, 'dark_mode', False)
             width, height = DrawingArea.CANVAS_SIZE, DrawingArea.CANVAS_SIZE
 
-            # Canvas background
-            if dark:
-                cr.set_source_rgb(0.12, 0.12, 0.12)
-            else:
-                cr.set_source_rgb(1.0, 1.0, 1.0)
-            cr.rectangle(0, 0, width, height)
-            cr.fill()
-
-            # Grid dots
-            cr.set_source_rgb(0, 0.55, 0) if dark else cr.set_source_rgb(0, 1, 0)
-            for x in range(0, width, self.grid_size):
-                for y in range(0, height, self.grid_size):
-                    cr.rectangle(x, y, 2, 2)
-                    cr.fill()
-
-            # Axis labels
-            cr.set_source_rgb(0.75, 0.75, 0.75) if dark else cr.set_source_rgb(0, 0, 0)
-            cr.set_font_size(12)
-            for i, x in enumerate(range(0, width, self.grid_size)):
-                label = self.get_column_label(i)
-                cr.move_to(x + 5, 15)
-                cr.show_text(label)
-
-            for i, y in enumerate(range(0, height, self.grid_size)):
-                label = str(i + 1)
-                cr.move_to(5, y + 15)
-                cr.show_text(label)
-
-            for block in self.blocks:
-                block.draw(cr)
-            for pin in self.pins:
-                pin.draw(cr)
-            for wire in self.wires:
-                wire.draw(cr)
+            stats = self.drawing_area.frame_stats
+
+            # Canvas background, grid dots and axis labels (cached per grid size, zoom and theme)
+            self.drawing_area.background.paint(cr, width, height, self.grid_size, self.drawing_area.zoom,
+                                               dark, self.get_column_label)
+            stats.mark("background")
+
+            # Only what overlaps the exposed area; cairo would discard the rest anyway.
+            # Zoomed out, elements drop text, dots and finally wire detail (lod.tier()).
+            detail = lod.tier(self.drawing_area.zoom)
+            visible = self.drawing_area.visible_elements(*cr.clip_extents())
+            stats.mark("cull")
+            wires = []
+            phase = "blocks"
+            for elem in visible:    # blocks, then pins, then wires
+                if isinstance(elem, Wire):
+                    wires.append(elem)
+                    continue
+                if phase == "blocks" and isinstance(elem, Pin):
+                    stats.mark(phase)
+                    phase = "pins"
+                elem.draw(cr, detail)
+            stats.mark(phase)
+            # Stroke the wires a style at a time
+            Wire.draw_batch(cr, wires, detail)
+            stats.mark("wires")
 
             if self.dragging_wire:
                 cr.set_source_rgb(1, 0, 0)
@@ -59,6 +53,9 @@ class EventHandlerMixin:
                 cr.line_to(self.mouse_x, self.wire_start_point[1])
                 cr.line_to(self.mouse_x, self.mouse_y)
                 cr.stroke()
+            stats.mark("overlays")
+            if stats.end():
+                self.update_status_bar()
 
             self.drawing_area.grab_focus()
         except Exception as e:
@@ -91,7 +88,7 @@ class EventHandlerMixin:
                 self.on_rotate_90(widget)
             elif key == "Escape":
                 self._clear_multi_select()
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_status_bar()
             return True
         except Exception as e:
@@ -145,16 +142,15 @@ class EventHandlerMixin:
                                     clicked = True
                                     break
                         if not clicked:
-                            for wire in self.wires:
-                                if wire.contains_point(cx, cy):
-                                    if wire in self.selected_wires:
-                                        self.selected_wires.remove(wire)
-                                        wire.set_selected(False)
-                                    else:
-                                        self.selected_wires.append(wire)
-                                        wire.set_selected(True)
-                                        self.selected_wire = wire
-                                    break
+                            wire = self.drawing_area.wire_at(cx, cy)
+                            if wire is not None:
+                                if wire in self.selected_wires:
+                                    self.selected_wires.remove(wire)
+                                    wire.set_selected(False)
+                                else:
+                                    self.selected_wires.append(wire)
+                                    wire.set_selected(True)
+                                    self.selected_wire = wire
                         for b in self.selected_blocks:
                             b.start_drag(cx, cy)
                         for p in self.selected_pins:
@@ -189,13 +185,12 @@ class EventHandlerMixin:
                                     pin.set_selected(True)
                                     pin.start_drag(cx, cy)
                                     break
-                            for wire in self.wires:
-                                if wire.contains_point(cx, cy):
-                                    self.selected_wire = wire
-                                    # don't set orange yet — wait for actual drag motion
-                                    self._wire_mid_drag_wire   = wire
-                                    self._wire_mid_drag_origin = (cx, cy)
-                                    break
+                            wire = self.drawing_area.wire_at(cx, cy)
+                            if wire is not None:
+                                self.selected_wire = wire
+                                # don't set orange yet — wait for actual drag motion
+                                self._wire_mid_drag_wire   = wire
+                                self._wire_mid_drag_origin = (cx, cy)
                 elif event.button == 3:
                     for block in self.blocks:
                         if block.contains_point(int(event.x / self.drawing_area.zoom), int(event.y / self.drawing_area.zoom)):
@@ -218,14 +213,13 @@ class EventHandlerMixin:
                             else:
                                 self.context_menu.popup(event)
                             break
-                    for wire in self.wires:
-                        if wire.contains_point(int(event.x / self.drawing_area.zoom), int(event.y / self.drawing_area.zoom)):
-                            self.selected_wire = wire
-                            wire.set_selected(True)
-                            self.wire_context_menu.popup(None, None, None, None, event.button, event.time)
-                            break
+                    wire = self.drawing_area.wire_at(int(event.x / self.drawing_area.zoom), int(event.y / self.drawing_area.zoom))
+                    if wire is not None:
+                        self.selected_wire = wire
+                        wire.set_selected(True)
+                        self.wire_context_menu.popup(None, None, None, None, event.button, event.time)
 
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage(*self._preview_damage())
                 self.update_json()
                 self.push_undo()
                 self.drawing_area.grab_focus()
@@ -258,15 +252,15 @@ class EventHandlerMixin:
                             for idx, input_wires in enumerate(block_dict['input_wires']):
                                 if input_wires is not None and wire.id in input_wires:
                                     if self.convert_to_tuple(wire.start_point) in block.prev_input_connections():
-                                        wire.update_start_point(block_dict['input_points'][idx])
+                                        wire.update_start_point(block_dict['input_points'][idx], background=True)
                                     elif self.convert_to_tuple(wire.end_point) in block.prev_input_connections():
-                                        wire.update_end_point(block_dict['input_points'][idx])
+                                        wire.update_end_point(block_dict['input_points'][idx], background=True)
                             for idx, output_wires in enumerate(block_dict['output_wires']):
                                 if output_wires is not None and wire.id in output_wires:
                                     if self.convert_to_tuple(wire.start_point) in block.prev_output_connections():
-                                        wire.update_start_point(block_dict['output_points'][idx])
+                                        wire.update_start_point(block_dict['output_points'][idx], background=True)
                                     elif self.convert_to_tuple(wire.end_point) in block.prev_output_connections():
-                                        wire.update_end_point(block_dict['output_points'][idx])
+                                        wire.update_end_point(block_dict['output_points'][idx], background=True)
                         block.update_points()
                         break
                 for pin in self.pins:
@@ -276,9 +270,9 @@ class EventHandlerMixin:
                             for idx, wires in enumerate(pin_dict['wires']):
                                 if wires is not None and wire.id in wires:
                                     if self.convert_to_tuple(wire.start_point) in pin.prev_connections():
-                                        wire.update_start_point(pin_dict['connection_points'][idx])
+                                        wire.update_start_point(pin_dict['connection_points'][idx], background=True)
                                     elif self.convert_to_tuple(wire.end_point) in pin.prev_connections():
-                                        wire.update_end_point(pin_dict['connection_points'][idx])
+                                        wire.update_end_point(pin_dict['connection_points'][idx], background=True)
                         pin.update_points()
                         break
                 self.update_json()
@@ -370,7 +364,7 @@ class EventHandlerMixin:
             self._wire_mid_drag_wire   = None
             self._wire_mid_drag_origin = None
 
-            self.drawing_area.queue_draw()
+            self.drawing_area.queue_damage(*self._preview_damage())
             self.update_json()
             self.push_undo()
             self.drawing_area.grab_focus()
@@ -397,13 +391,25 @@ class EventHandlerMixin:
                     wdrag.set_selected(True)   # go orange only once dragging begins
                     wdrag.update_waypoint([self.mouse_x, self.mouse_y])
 
-            self.drawing_area.queue_draw()
-            self.update_json()
+            # Plain hover changes nothing on the canvas: no redraw, no JSON refresh
+            if self.drawing_area.queue_damage(*self._preview_damage()):
+                self.update_json()
             self.drawing_area.grab_focus()
             self.mouse_label.set_markup(f"<span color='green'>Cursor: ({int(self.mouse_x)}, {int(self.mouse_y)})</span>")
         except Exception as e:
             print(f"Error in on_motion_notify: {e}")
 
+    def _preview_damage(self):
+        """Canvas rects of the rubber-band wire as last drawn and as on_draw will draw it now."""
+        old = getattr(self, '_preview_box', None)
+        new = None
+        if self.dragging_wire:
+            sx, sy = self.wire_start_point
+            new = (min(sx, self.mouse_x) - 2, min(sy, self.mouse_y) - 2,
+                   max(sx, self.mouse_x) + 2, max(sy, self.mouse_y) + 2)
+        self._preview_box = new
+        return [box for box in (old, new) if box is not None]
+
     def find_closest_point(self, points, target, tolerance=10):
         for i, point in enumerate(points):
             if abs(point[0] - target[0]) <= tolerance and abs(point[1] - target[1]) <= tolerance:
@@ -417,15 +423,15 @@ class EventHandlerMixin:
                 for idx, input_wires in enumerate(block_dict['input_wires']):
                     if input_wires is not None and wire.id in input_wires:
                         if self.convert_to_tuple(wire.start_point) in block.prev_input_connections():
-                            wire.update_start_point(block_dict['input_points'][idx])
+                            wire.update_start_point(block_dict['input_points'][idx], background=True)
                         elif self.convert_to_tuple(wire.end_point) in block.prev_input_connections():
-                            wire.update_end_point(block_dict['input_points'][idx])
+                            wire.update_end_point(block_dict['input_points'][idx], background=True)
                 for idx, output_wires in enumerate(block_dict['output_wires']):
                     if output_wires is not None and wire.id in output_wires:
                         if self.convert_to_tuple(wire.start_point) in block.prev_output_connections():
-                            wire.update_start_point(block_dict['output_points'][idx])
+                            wire.update_start_point(block_dict['output_points'][idx], background=True)
                         elif self.convert_to_tuple(wire.end_point) in block.prev_output_connections():
-                            wire.update_end_point(block_dict['output_points'][idx])
+                            wire.update_end_point(block_dict['output_points'][idx], background=True)
             block.update_points()
         for pin in self.pins:
             pin_dict = pin.to_dict()
@@ -433,24 +439,45 @@ class EventHandlerMixin:
                 for idx, wires in enumerate(pin_dict['wires']):
                     if wires is not None and wire.id in wires:
                         if self.convert_to_tuple(wire.start_point) in pin.prev_connections():
-                            wire.update_start_point(pin_dict['connection_points'][idx])
+                            wire.update_start_point(pin_dict['connection_points'][idx], background=True)
                         elif self.convert_to_tuple(wire.end_point) in pin.prev_connections():
-                            wire.update_end_point(pin_dict['connection_points'][idx])
+                            wire.update_end_point(pin_dict['connection_points'][idx], background=True)
             pin.update_points()
 
-    def update_wires(self):
+    def update_wires(self, negotiated=False):
         try:
-            for wire in self.wires:
-                wire.path = wire.calculate_path()
-                if not wire.path:
-                    self.delete_wire(wire)
-            self.drawing_area.queue_draw()
+            Wire.route_all(self.wires, self, progress=self.routing_progress, negotiated=negotiated)
+            for wire in [w for w in self.wires if not len(w.corners)]:
+                self.delete_wire(wire)
+            self.update_status_bar()
+            self.drawing_area.queue_damage()
         except Exception as e:
             print(f"Error in update_wires: {e}")
 
+    def on_wire_routed(self, wire):
+        """RouteWorker callback (GTK thread): a background route was applied to wire."""
+        try:
+            if wire in self.wires:
+                self.drawing_area.queue_damage()
+                self.update_json()
+        except Exception as e:
+            print(f"Error in on_wire_routed: {e}")
+
+    def routing_progress(self, done, total):
+        """
+        Progress callback for batch routing: set 'Routing wires n/total' in
+        the status bar.  It must not run the main loop: route_all and the
+        Yosys import are not re-entrant.
+        """
+        try:
+            self.status_bar.set_markup(f"<span color='#555555'>Routing wires {done}/{total}</span>")
+        except Exception as e:
+            print(f"Error in routing_progress: {e}")
+
     def delete_wire(self, wire):
         try:
             self.wires.remove(wire)
+            self.drawing_area.wire_index.remove(wire)
             for block in self.blocks:
                 block_dict = block.to_dict()
                 if wire.start_point in block.input_connections():
@@ -469,7 +496,7 @@ class EventHandlerMixin:
                     self.reset_wire_by_index(wire, pin_dict['wires'])
             self.update_json()
             self.push_undo()
-            self.drawing_area.queue_draw()
+            self.drawing_area.queue_damage()
         except Exception as e:
             print(f"Error in delete_wire: {e}")
 
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+frame_stats.py -- opt-in timing of on_draw, phase by phase
+
+on_draw calls begin(), then mark(phase) as each phase finishes, then
+end().  While enabled (SVCG_FRAME_STATS set in the environment, or
+File > Toggle Frame Timing) every frame's phase times are kept, the
+status bar shows FPS and frame-time percentiles over the last WINDOW
+frames, and write_csv() dumps the per-frame history.  While disabled the
+calls return at once.
+"""
+import csv
+import os
+import time
+from collections import deque
+import numpy as np
+
+ENV_VAR = "SVCG_FRAME_STATS"
+
+# on_draw's phases, in the order they run: "grid" is the routing occupancy
+# sync DrawingArea.on_draw does first, "background" the fill, grid dots and
+# axis labels, "cull" finding the elements in the clip
+PHASES = ("grid", "background", "cull", "blocks", "pins", "wires", "overlays")
+# Frames the percentiles and FPS are taken over
+WINDOW = 120
+# Frames kept for write_csv()
+HISTORY = 10_000
+# Seconds between status-bar refreshes
+REPORT_INTERVAL = 0.5
+
+
+class FrameStats:
+    def __init__(self, enabled=None):
+        self.enabled = bool(os.environ.get(ENV_VAR)) if enabled is None else enabled
+        self.frames = deque(maxlen=HISTORY)     # (start time, total s, {phase: s})
+        self._start = self._last = None
+        self._phases = {}
+        self._reported = 0.0
+
+    def clear(self):
+        self.frames.clear()
+        self._start = None
+
+    def begin(self):
+        if self.enabled:
+            self._start = self._last = time.perf_counter()
+            self._phases = {}
+
+    def mark(self, phase):
+        """Charge the time since the previous mark (or begin()) to phase."""
+        if self.enabled and self._start is not None:
+            now = time.perf_counter()
+            self._phases[phase] = self._phases.get(phase, 0.0) + now - self._last
+            self._last = now
+
+    def end(self):
+        """Close the frame; True when the status bar is due a refresh."""
+        if not self.enabled or self._start is None:
+            return False
+        now = time.perf_counter()
+        self.frames.append((self._start, now - self._start, self._phases))
+        self._start = None
+        if now - self._reported >= REPORT_INTERVAL:
+            self._reported = now
+            return True
+        return False
+
+    def percentile(self, q, phase=None):
+        """q-th percentile, in ms, of the frame time (or one phase's) over the last WINDOW frames."""
+        recent = list(self.frames)[-WINDOW:]
+        if not recent:
+            return 0.0
+        if phase is None:
+            times = [total for _, total, _ in recent]
+        else:
+            times = [phases.get(phase, 0.0) for _, _, phases in recent]
+        return float(np.percentile(times, q)) * 1000
+
+    def fps(self):
+        """Frames per second over the last WINDOW frames."""
+        recent = list(self.frames)[-WINDOW:]
+        if len(recent) < 2:
+            return 0.0
+        span = recent[-1][0] - recent[0][0]
+        return (len(recent) - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        """Status-bar text: FPS, median and 95th-percentile frame time, slowest phase."""
+        if not self.frames:
+            return "Frame timing: no frames yet"
+        slowest = max(PHASES, key=lambda phase: self.percentile(50, phase))
+        return (f"{self.fps():.0f} FPS  frame {self.percentile(50):.1f} ms p50 / "
+                f"{self.percentile(95):.1f} ms p95  ({slowest} {self.percentile(50, slowest):.1f} ms)")
+
+    def write_csv(self, path):
+        """One row per kept frame: start (s, from the first kept frame), total and phase times in ms."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "start_s", "total_ms"] + [f"{phase}_ms" for phase in PHASES])
+            t0 = self.frames[0][0] if self.frames else 0.0
+            for i, (start, total, phases) in enumerate(self.frames):
+                writer.writerow([i, f"{start - t0:.6f}", f"{total * 1000:.3f}"] +
+                                [f"{phases.get(phase, 0.0) * 1000:.3f}" for phase in PHASES])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+grid_background.py -- cached canvas background: fill, grid dots, axis labels
+
+Drawn directly, the background costs one rectangle and fill per grid dot and
+one show_text per axis label on every expose.  GridBackground renders them
+once per (grid_size, zoom, dark_mode) instead: the fill and one dot as a
+one-cell tile that a repeating pattern spreads over the canvas, and the
+labels as two transparent strips along the top and left edges.  A frame
+then fills three rectangles from cached surfaces.  A strip longer than
+cairo allows an image to be (or one that cannot be allocated) is not
+cached: its labels are drawn directly, only where the frame is exposed.
+"""
+import math
+import cairo
+
+LABEL_FONT_SIZE = 12
+# Strip depths in canvas px: column labels sit on baseline 15, row numbers
+# need room for four digits
+TOP_STRIP = 20
+LEFT_STRIP = 40
+# Largest image side cairo accepts, in device px
+MAX_SURFACE_SIDE = 32767
+
+
+class GridBackground:
+    def __init__(self):
+        self.key = None         # (width, height, grid_size, zoom, dark) of the cached surfaces
+        self._layers = []       # [(pattern, (x, y, w, h) canvas rect it fills)]
+
+    def paint(self, cr, width, height, grid_size, zoom, dark, column_label):
+        """
+        Paint the background of a width x height canvas into cr, whose user
+        space is canvas px scaled by zoom.  column_label(i) names column i.
+        """
+        key = (width, height, grid_size, zoom, dark)
+        if key != self.key:
+            self._layers = self._render(width, height, grid_size, zoom, dark, column_label)
+            self.key = key
+        cr.save()
+        for pattern, rect in self._layers:
+            cr.set_source(pattern)
+            cr.rectangle(*rect)
+            cr.fill()
+        if len(self._layers) < 3:
+            self._paint_direct(cr, width, height, grid_size, dark, column_label, dots=not self._layers)
+        cr.restore()
+
+    @staticmethod
+    def _image(fmt, width, height):
+        """A width x height image surface, or None if cairo cannot make one that big."""
+        if not 0 < width <= MAX_SURFACE_SIDE or not 0 < height <= MAX_SURFACE_SIDE:
+            return None
+        try:
+            return cairo.ImageSurface(fmt, width, height)
+        except (cairo.Error, MemoryError):
+            return None
+
+    @staticmethod
+    def _paint_direct(cr, width, height, grid_size, dark, column_label, dots):
+        """
+        What could not be cached, drawn straight into cr within its clip: the
+        labels, and with dots the fill and grid dots as well.
+        """
+        x0, y0, x1, y1 = cr.clip_extents()
+        cols = range(max(0, int(x0 // grid_size) - 1), min(-(-width // grid_size), int(x1 // grid_size) + 1))
+        rows = range(max(0, int(y0 // grid_size) - 1), min(-(-height // grid_size), int(y1 // grid_size) + 1))
+        if dots:
+            cr.set_source_rgb(0.12, 0.12, 0.12) if dark else cr.set_source_rgb(1.0, 1.0, 1.0)
+            cr.rectangle(0, 0, width, height)
+            cr.fill()
+            cr.set_source_rgb(0, 0.55, 0) if dark else cr.set_source_rgb(0, 1, 0)
+            for i in cols:
+                for j in rows:
+                    cr.rectangle(i * grid_size, j * grid_size, 2, 2)
+            cr.fill()
+        cr.set_source_rgb(0.75, 0.75, 0.75) if dark else cr.set_source_rgb(0, 0, 0)
+        cr.set_font_size(LABEL_FONT_SIZE)
+        if y0 < TOP_STRIP:
+            for i in cols:
+                cr.move_to(i * grid_size + 5, 15)
+                cr.show_text(column_label(i))
+        if x0 < LEFT_STRIP:
+            for j in rows:
+                cr.move_to(5, j * grid_size + 15)
+                cr.show_text(str(j + 1))
+
+    @staticmethod
+    def _pattern(surface, scale, extend=cairo.EXTEND_NONE):
+        pattern = cairo.SurfacePattern(surface)
+        pattern.set_matrix(cairo.Matrix(xx=scale, yy=scale))   # canvas px -> surface px
+        pattern.set_extend(extend)
+        pattern.set_filter(cairo.FILTER_GOOD)
+        return pattern
+
+    def _render(self, width, height, grid_size, zoom, dark, column_label):
+        # Whole-number oversampling keeps the tile period exactly grid_size
+        s = max(1, math.ceil(zoom))
+        tile = self._image(cairo.FORMAT_RGB24, grid_size * s, grid_size * s)
+        if tile is None:
+            return []
+        cr = cairo.Context(tile)
+        cr.scale(s, s)
+        cr.set_source_rgb(0.12, 0.12, 0.12) if dark else cr.set_source_rgb(1.0, 1.0, 1.0)
+        cr.paint()
+        cr.set_source_rgb(0, 0.55, 0) if dark else cr.set_source_rgb(0, 1, 0)
+        cr.rectangle(0, 0, 2, 2)
+        cr.fill()
+        layers = [(self._pattern(tile, s, cairo.EXTEND_REPEAT), (0, 0, width, height))]
+
+        # The strips are a single image each, so they can match the zoom exactly
+        top = self._image(cairo.FORMAT_ARGB32, math.ceil(width * zoom), math.ceil(TOP_STRIP * zoom))
+        left = self._image(cairo.FORMAT_ARGB32, math.ceil(LEFT_STRIP * zoom), math.ceil(height * zoom))
+        if top is None or left is None:
+            return layers
+        for surface, labels in ((top, ((x + 5, 15, column_label(i))
+                                       for i, x in enumerate(range(0, width, grid_size)))),
+                                (left, ((5, y + 15, str(i + 1))
+                                        for i, y in enumerate(range(0, height, grid_size))))):
+            cr = cairo.Context(surface)
+            cr.scale(zoom, zoom)
+            cr.set_source_rgb(0.75, 0.75, 0.75) if dark else cr.set_source_rgb(0, 0, 0)
+            cr.set_font_size(LABEL_FONT_SIZE)
+            for x, y, label in labels:
+                cr.move_to(x, y)
+                cr.show_text(label)
+        layers.append((self._pattern(top, zoom), (0, 0, width, TOP_STRIP)))
+        layers.append((self._pattern(left, zoom), (0, 0, LEFT_STRIP, height)))
+        return layers
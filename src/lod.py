@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+lod.py -- level-of-detail tiers for drawing the canvas zoomed out
+
+Below OUTLINE_ZOOM the port labels, names and connection dots are a few
+device px tall and unreadable, so blocks and pins are drawn as plain filled
+outlines and wires without labels or dots.  Below COARSE_ZOOM wires are
+also decimated: corners closer than COARSE_TOLERANCE device px to the last
+kept one are dropped, which flattens stair-step routes into a few strokes.
+"""
+
+# Tiers, in increasing order of simplification
+FULL, OUTLINE, COARSE = 0, 1, 2
+
+OUTLINE_ZOOM = 0.5
+COARSE_ZOOM = 0.3
+# Decimation distance at the COARSE tier, in device px
+COARSE_TOLERANCE = 6
+
+
+def tier(zoom):
+    """Detail tier for drawing at zoom."""
+    if zoom < COARSE_ZOOM:
+        return COARSE
+    if zoom < OUTLINE_ZOOM:
+        return OUTLINE
+    return FULL
+
+
+def decimate(points, tolerance):
+    """
+    Radial-distance simplification of the polyline points [(x, y)]: keep
+    the first and last point and every point at least tolerance from the
+    previously kept one.
+    """
+    if len(points) <= 2:
+        return list(points)
+    kept = [points[0]]
+    px, py = points[0]
+    t2 = tolerance * tolerance
+    for x, y in points[1:-1]:
+        if (x - px) ** 2 + (y - py) ** 2 >= t2:
+            kept.append((x, y))
+            px, py = x, y
+    kept.append(points[-1])
+    return kept
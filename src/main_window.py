@@ -7,6 +7,7 @@ from context_menu import ContextMenu
 from context_menu import PinContextMenu
 from context_menu import WireContextMenu
 from drawing_area import DrawingArea
+from route_worker import RouteWorker
 from menu import MenuBar
 from datetime import datetime
 from pins import Pin
@@ -319,8 +320,12 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
 
         self.scrolled_window = Gtk.ScrolledWindow()
         self.scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        # "canvas_size" in ~/.svcg/config.json; large sheets switch routing to a sparse grid
+        DrawingArea.CANVAS_SIZE = self._load_canvas_size_pref()
         self.drawing_area = DrawingArea(self)
         self.drawing_area.set_size_request(DrawingArea.CANVAS_SIZE, DrawingArea.CANVAS_SIZE)
+        # Reroutes triggered by drags/rotations run here, off the GTK thread
+        self.route_worker = RouteWorker(on_routed=self.on_wire_routed)
         self.scrolled_window.add(self.drawing_area)
         self.box.pack_start(self.scrolled_window, True, True, 0)
 
@@ -402,6 +407,8 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
         parts.append(f"Blocks: {len(self.blocks)}  Pins: {len(self.pins)}  Wires: {len(self.wires)}")
         if self.current_file_path:
             parts.append(os.path.basename(self.current_file_path))
+        if self.drawing_area.frame_stats.enabled:
+            parts.append(self.drawing_area.frame_stats.summary())
         self.status_bar.set_markup(
             "<span color='#555555'>" + " | ".join(parts) + "</span>"
         )
@@ -448,7 +455,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
             new_block = Block(initial_x, initial_y, initial_width, initial_height,
                               f"{block_type} {timestamp}", block_type, self.grid_size, self)
             self.blocks.append(new_block)
-            self.drawing_area.queue_draw()
+            self.drawing_area.queue_damage()
             self.update_json()
         except Exception as e:
             print(f"Error in on_button_clicked: {e}")
@@ -479,14 +486,14 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                     new_pin = Pin(initial_x, initial_y, initial_width, initial_height,
                                   f"{pin_type} {timestamp}", pin_type, self.grid_size, num_pins, self)
                     self.pins.append(new_pin)
-                    self.drawing_area.queue_draw()
+                    self.drawing_area.queue_damage()
                     self.update_json()
                 dialog.destroy()
             else:
                 new_pin = Pin(initial_x, initial_y, initial_width, initial_height,
                               f"{pin_type} {timestamp}", pin_type, self.grid_size, 1, self)
                 self.pins.append(new_pin)
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
         except ValueError as e:
             print(f"ValueError in on_pin_button_clicked: {e}")
@@ -506,7 +513,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 if response == Gtk.ResponseType.OK:
                     color = dialog.get_rgba()
                     target.border_color = (color.red, color.green, color.blue)
-                    self.drawing_area.queue_draw()
+                    self.drawing_area.queue_damage(target.bbox())
                     self.update_json()
                     self.push_undo()
                 dialog.destroy()
@@ -522,7 +529,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 if response == Gtk.ResponseType.OK:
                     color = dialog.get_rgba()
                     target.fill_color = (color.red, color.green, color.blue)
-                    self.drawing_area.queue_draw()
+                    self.drawing_area.queue_damage(target.bbox())
                     self.update_json()
                     self.push_undo()
                 dialog.destroy()
@@ -553,7 +560,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
         response = dialog.run()
         if response == Gtk.ResponseType.OK:
             target.text = entry.get_text()
-            self.drawing_area.queue_draw()
+            self.drawing_area.queue_damage(target.bbox())
             self.update_json()
             self.push_undo()
         dialog.destroy()
@@ -567,7 +574,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 if response == Gtk.ResponseType.OK:
                     color = dialog.get_rgba()
                     target.text_color = (color.red, color.green, color.blue)
-                    self.drawing_area.queue_draw()
+                    self.drawing_area.queue_damage(target.bbox())
                     self.update_json()
                     self.push_undo()
                 dialog.destroy()
@@ -583,7 +590,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
         else:
             return
         self.update_points()
-        self.drawing_area.queue_draw()
+        self.drawing_area.queue_damage()
         self.update_json()
         self.push_undo()
 
@@ -641,7 +648,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 for np_ in new_pins:
                     np_.set_selected(True)
                     self.selected_pins.append(np_)
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
             elif self.selected_block:
                 self.clipboard_block = self.selected_block
@@ -662,7 +669,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                     new_block.update_points()
                     new_block.init_wires()
                 self.blocks.append(new_block)
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
                 self.push_undo()
             elif self.selected_pin:
@@ -680,7 +687,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 new_pin.text_color = self.selected_pin.text_color
                 new_pin.rotation = self.selected_pin.rotation
                 self.pins.append(new_pin)
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
                 self.push_undo()
         except Exception as e:
@@ -701,10 +708,11 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                             wires_to_remove.append(wire)
             for wire in wires_to_remove:
                 self.wires.remove(wire)
+                self.drawing_area.wire_index.remove(wire)
             self.selected_block.clear_wires()
             self.update_json()
             self.push_undo()
-            self.drawing_area.queue_draw()
+            self.drawing_area.queue_damage()
         except Exception as e:
             print(f"Error in delete_block_wire_connections: {e}")
 
@@ -719,10 +727,11 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                             wires_to_remove.append(wire)
             for wire in wires_to_remove:
                 self.wires.remove(wire)
+                self.drawing_area.wire_index.remove(wire)
             self.selected_pin.clear_wires()
             self.update_json()
             self.push_undo()
-            self.drawing_area.queue_draw()
+            self.drawing_area.queue_damage()
         except Exception as e:
             print(f"An error occurred: {e}")
 
@@ -744,21 +753,21 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 self.selected_pins = []
                 self.selected_block = None
                 self.selected_pin = None
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
             elif self.selected_block:
                 self.push_undo()
                 self.delete_block_wire_connections()
                 self.blocks.remove(self.selected_block)
                 self.selected_block = None
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
             elif self.selected_pin:
                 self.push_undo()
                 self.delete_pin_wire_connections()
                 self.pins.remove(self.selected_pin)
                 self.selected_pin = None
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
         except Exception as e:
             print(f"Error in on_delete_block: {e}")
@@ -781,7 +790,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 self.selected_pins = []
                 self.selected_block = None
                 self.selected_pin = None
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
             elif self.selected_block:
                 self.push_undo()
@@ -790,7 +799,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 self.clipboard_pin = None
                 self.blocks.remove(self.selected_block)
                 self.selected_block = None
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
             elif self.selected_pin:
                 self.push_undo()
@@ -799,7 +808,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 self.clipboard_block = None
                 self.pins.remove(self.selected_pin)
                 self.selected_pin = None
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
         except Exception as e:
             print(f"Error in on_cut_block: {e}")
@@ -823,7 +832,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                     new_block.update_points()
                     new_block.init_wires()
                 self.blocks.append(new_block)
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
             elif self.clipboard_pin:
                 self.push_undo()
@@ -838,7 +847,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
                 new_pin.text_color = self.clipboard_pin.text_color
                 new_pin.rotation = self.clipboard_pin.rotation
                 self.pins.append(new_pin)
-                self.drawing_area.queue_draw()
+                self.drawing_area.queue_damage()
                 self.update_json()
         except Exception as e:
             print(f"Error in on_paste_block: {e}")
@@ -863,7 +872,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
         new_block.update_points()
         new_block.init_wires()
         self.blocks.append(new_block)
-        self.drawing_area.queue_draw()
+        self.drawing_area.queue_damage()
         self.update_json()
 
     def on_edit_custom_rtl_block(self, widget):
@@ -885,7 +894,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
         block.height = self.grid_size * max(n_ports + 2, 4)
         block.update_points()
         block.init_wires()
-        self.drawing_area.queue_draw()
+        self.drawing_area.queue_damage(block.bbox())
         self.update_json()
 
     def on_disconnect_pin(self, widget):
@@ -913,6 +922,14 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
         except Exception:
             return False
 
+    def _load_canvas_size_pref(self):
+        try:
+            with open(self._config_path()) as f:
+                size = int(json.load(f).get("canvas_size", DrawingArea.CANVAS_SIZE))
+            return min(DrawingArea.MAX_CANVAS_SIZE, max(DrawingArea.MIN_CANVAS_SIZE, size))
+        except Exception:
+            return DrawingArea.CANVAS_SIZE
+
     def save_config(self):
         try:
             cfg = {}
@@ -940,7 +957,7 @@ class BlocksWindow(ProjectManagerMixin, EventHandlerMixin, VhdlViewerMixin, Comp
             xs += [p.x, p.x + p.width]
             ys += [p.y, p.y + p.height]
         for w in self.wires:
-            for gx, gy in (w.path or []):
+            for gx, gy in w.corners.tolist():   # a polyline's bbox is its corners' bbox
                 xs.append(gx * self.grid_size)
                 ys.append(gy * self.grid_size)
         if not xs:
@@ -61,6 +61,8 @@ class MenuBar:
         file_menu.append(_mi("Export EDIF Netlist… (experimental)", self.on_export_edif))
         file_menu.append(Gtk.SeparatorMenuItem())
         file_menu.append(_mi("Toggle Dark Mode",             self.on_toggle_dark_mode))
+        file_menu.append(_mi("Toggle Frame Timing",          self.on_toggle_frame_stats))
+        file_menu.append(_mi("Save Frame Timings as CSV...", self.on_save_frame_stats))
         file_menu.append(Gtk.SeparatorMenuItem())
         file_menu.append(_mi("Quit",                         self.on_menu_file_quit))
 
@@ -74,6 +76,8 @@ class MenuBar:
         edit_menu.append(_mi("Paste Ctrl+V",   self._noop))
         edit_menu.append(_mi("Cut   Ctrl+X",   self._noop))
         edit_menu.append(_mi("Delete Ctrl+D",  self._noop))
+        edit_menu.append(Gtk.SeparatorMenuItem())
+        edit_menu.append(_mi("Reroute All Wires (Negotiated)", self.on_reroute_negotiated))
         menubar.append(edit_item)
 
         return menubar
@@ -511,15 +515,18 @@ class MenuBar:
         flt.set_name("JSON files (*.json)")
         flt.add_pattern("*.json")
         dialog.add_filter(flt)
+        channels = Gtk.CheckButton(label="Route wires in channels between columns (widens the placement)")
+        dialog.set_extra_widget(channels)
         resp = dialog.run()
         if resp != Gtk.ResponseType.ACCEPT:
             dialog.destroy()
             return
         path = dialog.get_filename()
+        router = "channel" if channels.get_active() else "astar"
         dialog.destroy()
 
         try:
-            n_cells, n_wires, warnings = import_yosys_json(path, mw)
+            n_cells, n_wires, warnings = import_yosys_json(path, mw, router=router)
         except Exception as exc:
             self._show_error("Import failed", str(exc))
             return
@@ -638,6 +645,54 @@ class MenuBar:
         mw.drawing_area.queue_draw()
         mw.save_config()
 
+    def on_toggle_frame_stats(self, widget):
+        """Start or stop timing on_draw; while on, FPS and frame times show in the status bar."""
+        mw = self.main_window
+        stats = mw.drawing_area.frame_stats
+        stats.enabled = not stats.enabled
+        stats.clear()
+        mw.update_status_bar()
+        mw.drawing_area.queue_draw()
+
+    def on_save_frame_stats(self, widget):
+        stats = self.main_window.drawing_area.frame_stats
+        if not stats.frames:
+            self._show_error("No frame timings",
+                             "Turn on File > Toggle Frame Timing (or set SVCG_FRAME_STATS) and draw some frames first.")
+            return
+        dialog = Gtk.FileChooserDialog(
+            title="Save Frame Timings",
+            parent=self.main_window,
+            action=Gtk.FileChooserAction.SAVE,
+        )
+        dialog.add_buttons(
+            Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+            Gtk.STOCK_SAVE,   Gtk.ResponseType.ACCEPT,
+        )
+        dialog.set_do_overwrite_confirmation(True)
+        dialog.set_current_name("frame_timings.csv")
+        flt = Gtk.FileFilter()
+        flt.set_name("CSV files")
+        flt.add_pattern("*.csv")
+        dialog.add_filter(flt)
+        response = dialog.run()
+        if response == Gtk.ResponseType.ACCEPT:
+            file_path = dialog.get_filename()
+            if not file_path.lower().endswith(".csv"):
+                file_path += ".csv"
+            try:
+                stats.write_csv(file_path)
+            except OSError as e:
+                self._show_error("Could not save frame timings", str(e))
+        dialog.destroy()
+
+    def on_reroute_negotiated(self, widget):
+        """Rip up and reroute every wire together so different nets stop overlapping."""
+        mw = self.main_window
+        mw.push_undo()
+        mw.update_wires(negotiated=True)
+        mw.update_json()
+
     def on_menu_file_quit(self, widget):
         Gtk.main_quit()
 
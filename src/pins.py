@@ -4,6 +4,8 @@ import math
 import pprint
 import uuid
 from datetime import datetime
+import lod
+from symbol_cache import SYMBOLS
 from wire import Wire
 
 class Pin:
@@ -31,6 +33,7 @@ class Pin:
         #self.wires = [None] * num_pins  # List to store wire IDs for each connection point
         self.wires = [[] for _ in range(num_pins)]  # List to store wire IDs for each connection point
         self.parent_window = parent_window  # Add the parent_window attribute
+        self._bbox = None  # (geometry key, box) cached by bbox()
         self.update_points()
 
     def get_wires(self):
@@ -82,7 +85,37 @@ class Pin:
         new_y = cy + dx * math.sin(angle) + dy * math.cos(angle)
         return (new_x, new_y)
 
-    def draw(self, cr):
+    def symbol_key(self):
+        """Everything draw() depends on besides (x, y); SYMBOLS keys its images on it."""
+        return ("pin", self.pin_type, self.width, self.height, self.rotation, self.num_pins,
+                tuple(self.border_color), tuple(self.fill_color), tuple(self.text_color),
+                self.selected, self.text)
+
+    def draw(self, cr, detail=lod.FULL):
+        if detail >= lod.OUTLINE:
+            self.draw_outline(cr)
+        elif self.x == int(self.x) and self.y == int(self.y):
+            SYMBOLS.paint(cr, self.symbol_key(), (self.x, self.y), self._draw_symbol)
+        else:
+            self._draw_symbol(cr)   # mid-drag: a fractional corner is not worth an image
+        self.update_points()
+
+    def draw_outline(self, cr):
+        """Zoomed-out stand-in: the rotated pin or bus as one filled rectangle, without text or dots."""
+        w = self.width * self.num_pins if "bus" in self.pin_type.lower() else self.width
+        cr.save()
+        cr.translate(self.x + self.width / 2, self.y + self.height / 2)
+        cr.rotate(math.radians(self.rotation))
+        cr.translate(-self.width / 2, -self.height / 2)
+        cr.rectangle(0, 0, w, self.height)
+        cr.set_source_rgb(*((1, 1, 0) if self.selected else self.fill_color))
+        cr.fill_preserve()
+        cr.set_source_rgb(*self.border_color)
+        cr.set_line_width(1)
+        cr.stroke()
+        cr.restore()
+
+    def _draw_symbol(self, cr):
         cr.save()
         cr.translate(self.x + self.width / 2, self.y + self.height / 2)
         cr.rotate(math.radians(self.rotation))
@@ -123,7 +156,6 @@ class Pin:
         if "input_output_bus" in self.pin_type.lower():
             #self.border_color = (0, 0.4, 0)  # Default border color (green)
             self.draw_bus(cr)
-        self.update_points()
 
         cr.restore()
 
@@ -276,6 +308,28 @@ class Pin:
         cr.arc(self.width / 2, self.height, 4, 0, 2 * math.pi)
         cr.fill()
 
+    def bbox(self):
+        """
+        Canvas-px (x0, y0, x1, y1) that draw() can paint into: the rotated
+        pin or bus outline plus a margin for its name and type text (about
+        6 px per character).  Cached until the pin moves, rotates or changes.
+        """
+        key = (self.x, self.y, self.width, self.height, self.rotation, self.pin_type, self.num_pins, self.text)
+        if self._bbox is not None and self._bbox[0] == key:
+            return self._bbox[1]
+        w = self.width * self.num_pins if "bus" in self.pin_type.lower() else self.width
+        cx, cy = self.width / 2, self.height / 2
+        angle = math.radians(self.rotation)
+        c, s = math.cos(angle), math.sin(angle)
+        xs, ys = [], []
+        for x, y in ((0, 0), (w, 0), (0, self.height), (w, self.height)):
+            xs.append(cx + (x - cx) * c - (y - cy) * s)
+            ys.append(cy + (x - cx) * s + (y - cy) * c)
+        pad = 10 + 6 * max(len(self.text), len(self.pin_type))
+        box = (self.x + min(xs) - pad, self.y + min(ys) - pad, self.x + max(xs) + pad, self.y + max(ys) + pad)
+        self._bbox = (key, box)
+        return box
+
     def contains_point(self, x, y, tolerance = 10):
         if "bus" in self.pin_type.lower():
             # For buses, consider the entire area covered by the connection points
@@ -51,6 +51,7 @@ class ProjectManagerMixin:
                 self.blocks = [Block.from_dict(d, self) for d in data if d.get("block_type")]
                 self.pins   = [Pin.from_dict(d, self)   for d in data if d.get("pin_type")]
                 self.wires  = [Wire.from_dict(d, self)  for d in data if d.get("start_point") is not None]
+                self.drawing_area.wire_index.sync(self.wires)
                 self.drawing_area.queue_draw()
                 self.update_json()
                 self.update_undo_redo_buttons()
@@ -65,6 +66,7 @@ class ProjectManagerMixin:
                 self.blocks = [Block.from_dict(d, self) for d in data if d.get("block_type")]
                 self.pins   = [Pin.from_dict(d, self)   for d in data if d.get("pin_type")]
                 self.wires  = [Wire.from_dict(d, self)  for d in data if d.get("start_point") is not None]
+                self.drawing_area.wire_index.sync(self.wires)
                 self.drawing_area.queue_draw()
                 self.update_json()
                 self.update_undo_redo_buttons()
@@ -114,6 +116,7 @@ class ProjectManagerMixin:
                 self.blocks = [Block.from_dict(d, self) for d in data if d.get("block_type")]
                 self.pins   = [Pin.from_dict(d, self)   for d in data if d.get("pin_type")]
                 self.wires  = [Wire.from_dict(d, self)  for d in data if d.get("start_point") is not None]
+                self.drawing_area.wire_index.sync(self.wires)
                 self.drawing_area.queue_draw()
                 self.current_file_path = file_path
                 self.set_dirty(False)
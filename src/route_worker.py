@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+route_worker.py -- background wire routing off the GTK main loop
+
+GUI handlers submit route jobs here instead of running A* inline.  Every
+job carries a generation number; submitting again for the same wire
+supersedes (cancels) the queued job, and a result whose generation is no
+longer the wire's latest is dropped.  Finished paths are applied on the
+GTK thread through GLib.idle_add; a route that raises is applied as a
+plain Manhattan L instead.
+"""
+import threading
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import GLib
+from astar import SearchStats
+from routing import route_cells, manhattan_cells
+
+
+class RouteWorker:
+    def __init__(self, on_routed=None):
+        # on_routed(wire) runs on the GTK thread after a path is applied
+        self.on_routed = on_routed
+        self._cond = threading.Condition()
+        self._pending = {}      # wire -> (generation, grid, start, end, kernel, max_expansions), newest only
+        self._latest = {}       # wire -> generation whose result may still be applied
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, name="route-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, wire, grid, start, end, kernel="classic", max_expansions=None):
+        """
+        Queue a route for wire on grid (an immutable snapshot), expanding at
+        most max_expansions nodes; returns its generation.
+        """
+        with self._cond:
+            self._generation += 1
+            gen = self._generation
+            self._latest[wire] = gen
+            self._pending[wire] = (gen, grid, start, end, kernel, max_expansions)
+            self._cond.notify()
+        return gen
+
+    def cancel(self, wire):
+        """Drop any queued or in-flight route for wire."""
+        with self._cond:
+            self._pending.pop(wire, None)
+            self._latest.pop(wire, None)
+
+    def busy(self):
+        with self._cond:
+            return bool(self._latest)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                wire, (gen, grid, start, end, kernel, max_expansions) = self._pending.popitem()
+            stats = SearchStats(max_expansions)
+            try:
+                path = route_cells(grid, start, end, kernel, stats=stats)
+            except Exception as e:
+                # Still deliver a path: the wire must leave its preview state
+                print(f"Error in RouteWorker: {e}")
+                path = manhattan_cells(start, end)
+            GLib.idle_add(self._apply, wire, gen, path, stats)
+
+    def _apply(self, wire, gen, path, stats=None):
+        with self._cond:
+            if self._latest.get(wire) != gen:
+                return False            # superseded while routing
+            del self._latest[wire]
+        wire.apply_route(path, stats)
+        if self.on_routed:
+            self.on_routed(wire)
+        return False
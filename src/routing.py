@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+"""
+routing.py -- grid-cell wire routing shared by Wire and the batch router
+
+route_cells() is the single-wire strategy (widening windowed A*, cluster
+graph or full-grid A*, Manhattan fallback).  route_batch() routes many (start, end) pairs against
+one occupancy snapshot, fanning independent chunks out to a process pool.
+route_net() joins one source to many sinks as a Steiner tree of shared
+branches.  route_negotiated() routes them together with PathFinder-style
+rip-up-and-reroute so different nets stop sharing grid tracks.
+patch_endpoint() keeps a still-clear route when only an end moved a little.
+"""
+import os
+import time
+import threading
+import multiprocessing
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from astar import AStar, SearchStats, STEP_COST
+from routing_grid import label_components
+from routing_hpa import CLUSTER_SIZE
+
+# Cells of padding around the endpoints' bounding box for the first A* try
+MARGIN = 25
+# Successively wider windows tried before searching the full grid
+WINDOW_MARGINS = (MARGIN, 2 * MARGIN, 4 * MARGIN)
+# Routes at least this long go to the cluster graph (routing_hpa) as soon as
+# the first window fails, rather than flooding ever wider windows
+HPA_MIN_DIST = 4 * CLUSTER_SIZE
+# Below this many routes the pool start-up costs more than it saves
+PARALLEL_MIN = 64
+# Cap on worker processes; routing is CPU bound and memory grows per worker
+MAX_WORKERS = 8
+# Search used on the full grid when the window search fails: bidirectional
+# stops as soon as either end turns out to be walled in.
+FULL_GRID_ALGORITHM = "bidirectional"
+# Entries kept in the route memo (LRU)
+ROUTE_CACHE_SIZE = 4096
+
+# (start, end, kernel, window shape, region hash) -> path tuple.  Window
+# results are stored relative to the window, so the same local layout
+# (a moved or re-instantiated component) hits even at another position.
+_route_cache = OrderedDict()
+_route_cache_lock = threading.Lock()
+_route_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _region_key(region):
+    return region.shape, hash(region.tobytes())
+
+
+def _cache_get(key):
+    with _route_cache_lock:
+        path = _route_cache.get(key)
+        if path is None:
+            _route_cache_stats["misses"] += 1
+            return None
+        _route_cache.move_to_end(key)
+        _route_cache_stats["hits"] += 1
+        return path
+
+
+def _cache_put(key, path):
+    with _route_cache_lock:
+        _route_cache[key] = tuple(path)
+        _route_cache.move_to_end(key)
+        while len(_route_cache) > ROUTE_CACHE_SIZE:
+            _route_cache.popitem(last=False)
+
+
+def route_cache_info():
+    """Hit/miss counters and current size of the route memo."""
+    with _route_cache_lock:
+        return dict(_route_cache_stats, size=len(_route_cache))
+
+
+def clear_route_cache():
+    with _route_cache_lock:
+        _route_cache.clear()
+        _route_cache_stats.update(hits=0, misses=0)
+
+
+def manhattan_cells(start, end):
+    """L-shaped Manhattan path: horizontal segment then vertical segment."""
+    x1, y1 = start
+    x2, y2 = end
+    path = []
+    # horizontal leg
+    step = 1 if x2 >= x1 else -1
+    for x in range(x1, x2 + step, step):
+        path.append((x, y1))
+    # vertical leg
+    step = 1 if y2 >= y1 else -1
+    for y in range(y1 + step, y2 + step, step):
+        path.append((x2, y))
+    return path
+
+
+def path_corners(cells):
+    """
+    Compress a cell path to its end and bend points as an (n, 2) int32
+    array.  Runs of equal unit steps (straight or diagonal) collapse to
+    their two ends; repeated cells are dropped.
+    """
+    a = np.asarray(cells, dtype=np.int32).reshape(-1, 2)
+    if len(a) > 1:
+        a = a[np.r_[True, (a[1:] != a[:-1]).any(axis=1)]]
+    if len(a) <= 2:
+        return a
+    d = np.diff(a, axis=0)
+    step = np.sign(d)
+    unit = (d == step).all(axis=1)
+    keep = np.ones(len(a), dtype=bool)
+    keep[1:-1] = (step[1:] != step[:-1]).any(axis=1) | ~unit[1:] | ~unit[:-1]
+    return a[keep]
+
+
+def corner_cells(corners):
+    """Expand path_corners() output back to the [(r, c), ...] cell path."""
+    c = np.asarray(corners, dtype=np.int32).reshape(-1, 2)
+    if len(c) < 2:
+        return [tuple(p) for p in c.tolist()]
+    d = np.diff(c, axis=0)
+    ad = np.abs(d)
+    # Straight and 45-degree runs are filled cell by cell; anything else is one jump
+    straight = (ad[:, 0] == 0) | (ad[:, 1] == 0) | (ad[:, 0] == ad[:, 1])
+    n = np.where(straight, ad.max(axis=1), 1)
+    step = np.where(straight[:, None], np.sign(d), d)
+    seg = np.repeat(np.arange(len(d)), n)
+    k = np.arange(len(seg)) - np.repeat(np.cumsum(n) - n, n) + 1
+    cells = np.concatenate((c[:1], c[seg] + k[:, None] * step[seg]))
+    return [tuple(p) for p in cells.tolist()]
+
+
+def _connected(labels, start, end):
+    """
+    False when end cannot be reached from start according to the free-cell
+    component labels; None when the labels cannot tell (endpoint off-grid).
+    A blocked start cell (an endpoint on a pin) leaves through any free
+    4-neighbour, as in A*.
+    """
+    d0, d1 = labels.shape
+    if not (0 <= start[0] < d0 and 0 <= start[1] < d1 and 0 <= end[0] < d0 and 0 <= end[1] < d1):
+        return None
+    goal = labels[end]
+    if not goal:
+        return start == end
+    if labels[start]:
+        return bool(labels[start] == goal)
+    r, c = start
+    return any(0 <= r + dr < d0 and 0 <= c + dc < d1 and labels[r + dr, c + dc] == goal
+               for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)))
+
+
+def _budget(stats):
+    return None if stats is None else stats.remaining()
+
+
+def _spent(stats):
+    return stats is not None and stats.exhausted()
+
+
+def _record(stats, astar):
+    if stats is not None:
+        stats.add(astar.stats)
+
+
+def route_cells(grid, start, end, kernel="flat", labels=None, graph=None, stats=None):
+    """
+    Route grid cell start -> end on grid; always returns a path.  Results
+    are memoised on the endpoints plus the contents of the grid region the
+    search could see, so unchanged neighbourhoods never re-run A*.
+
+    The search runs in windows padded by each of WINDOW_MARGINS in turn,
+    each bounded to detours the window can hold, before the full grid.
+    labels (label_components() of grid) rule out unreachable pairs up front;
+    graph (the grid's routing_hpa.ClusterGraph) plans what the windows miss
+    coarse-to-fine instead of searching the full grid.
+
+    stats (astar.SearchStats) collects every search's expansions and caps
+    them at its max_expansions: once spent, the route falls back to
+    Manhattan, and results cut short by the budget are not memoised.
+    """
+    sc0, sc1 = start = (int(start[0]), int(start[1]))
+    ec0, ec1 = end = (int(end[0]), int(end[1]))
+    if labels is not None and _connected(labels, start, end) is False:
+        print(f"({sc0},{sc1})->({ec0},{ec1}) is walled off; using Manhattan fallback")
+        return manhattan_cells(start, end)
+
+    d0, d1 = grid.shape
+    dist = abs(sc0 - ec0) + abs(sc1 - ec1)
+    margins = WINDOW_MARGINS[:1] if graph is not None and dist >= HPA_MIN_DIST else WINDOW_MARGINS
+    for margin in margins:
+        # Clip A* to a padded bounding box so search is O(margin^2) not O(grid^2)
+        r0 = max(0, min(sc0, ec0) - margin)
+        r1 = min(d0, max(sc0, ec0) + margin + 1)
+        c0 = max(0, min(sc1, ec1) - margin)
+        c1 = min(d1, max(sc1, ec1) + margin + 1)
+        whole = (r0, c0, r1, c1) == (0, 0, d0, d1)
+        # A detour of more than 2 * margin cells belongs to a wider window
+        max_cost = None if whole else STEP_COST * (dist + 2 * margin)
+        sub_grid = grid[r0:r1, c0:c1]
+        start_local = (sc0 - r0, sc1 - c0)
+        end_local   = (ec0 - r0, ec1 - c0)
+
+        key = (start_local, end_local, kernel, margin) + _region_key(sub_grid)
+        path_local = _cache_get(key)
+        if path_local is None:
+            astar = AStar(sub_grid, kernel=kernel, max_cost=max_cost, max_expansions=_budget(stats))
+            path_local = astar.find_path(start_local, end_local)
+            _record(stats, astar)
+            if not astar.budget_hit:
+                _cache_put(key, path_local)
+        if path_local:
+            return [(px + r0, py + c0) for px, py in path_local]
+        if _spent(stats):
+            break
+        if whole:
+            # The window already was the whole grid and was searched unbounded
+            print(f"A* found no path ({sc0},{sc1})->({ec0},{ec1}); using Manhattan fallback")
+            return manhattan_cells(start, end)
+
+    if graph is not None and not _spent(stats):
+        path = graph.find_path(start, end, kernel, stats)
+        if path:
+            return path
+    if _spent(stats):
+        print(f"Expansion budget spent routing ({sc0},{sc1})->({ec0},{ec1}); using Manhattan fallback")
+        return manhattan_cells(start, end)
+    if not isinstance(grid, np.ndarray):
+        # Sparse (TileGrid) canvases are never searched whole
+        print(f"A* found no path ({sc0},{sc1})->({ec0},{ec1}); using Manhattan fallback")
+        return manhattan_cells(start, end)
+
+    # Every window too tight or blocked — retry on full grid before Manhattan
+    full_key = (start, end, kernel, FULL_GRID_ALGORITHM) + _region_key(grid)
+    path_full = _cache_get(full_key)
+    if path_full is None:
+        astar = AStar(grid, kernel=kernel, algorithm=FULL_GRID_ALGORITHM, max_expansions=_budget(stats))
+        path_full = astar.find_path(start, end)
+        _record(stats, astar)
+        if not path_full:
+            print(f"A* found no path ({sc0},{sc1})->({ec0},{ec1}); using Manhattan fallback")
+            path_full = manhattan_cells(start, end)
+        if not astar.budget_hit:
+            _cache_put(full_key, path_full)
+    return list(path_full)
+
+
+############## PATH REPAIR ###############
+# Endpoint moves of at most this many cells are patched instead of re-routed
+PATCH_MAX_CELLS = 8
+
+
+def path_is_clear(grid, cells):
+    """
+    Whether every cell between the two ends of a cell path is inside grid
+    and free, read with one gather.  The ends sit on pins and are not
+    checked.
+    """
+    inner = np.asarray(cells, dtype=np.intp).reshape(-1, 2)[1:-1]
+    if not len(inner):
+        return True
+    rows, cols = inner[:, 0], inner[:, 1]
+    if rows.min() < 0 or cols.min() < 0 or rows.max() >= grid.shape[0] or cols.max() >= grid.shape[1]:
+        return False
+    counts = grid[rows, cols] if isinstance(grid, np.ndarray) else grid.gather(rows, cols)
+    return not (counts >= 1).any()
+
+
+def _drop_loops(cells):
+    """Cut out every loop where a path revisits a cell."""
+    out, seen = [], {}
+    for cell in cells:
+        k = seen.get(cell)
+        if k is None:
+            seen[cell] = len(out)
+            out.append(cell)
+            continue
+        for c in out[k + 1:]:
+            del seen[c]
+        del out[k + 1:]
+    return out
+
+
+def patch_endpoint(grid, cells, new_cell, at_start=False, max_stub=PATCH_MAX_CELLS):
+    """
+    Re-attach a routed cell path to an end (the start if at_start) that
+    moved to new_cell, with a Manhattan stub of at most max_stub cells in
+    either L orientation.  Returns the patched path, or None when the move
+    is too long or the patched path is blocked on grid, so the caller
+    should search again.
+    """
+    cells = [(int(r), int(c)) for r, c in cells]
+    if len(cells) < 2:
+        return None
+    new_cell = (int(new_cell[0]), int(new_cell[1]))
+    if at_start:
+        cells.reverse()
+    anchor = cells[-1]
+    if abs(anchor[0] - new_cell[0]) + abs(anchor[1] - new_cell[1]) > max_stub:
+        return None
+    for stub in (manhattan_cells(anchor, new_cell), manhattan_cells(new_cell, anchor)[::-1]):
+        path = _drop_loops(cells[:-1] + stub)
+        if at_start:
+            path.reverse()
+        if path_is_clear(grid, path):
+            return path
+    return None
+
+
+############## BATCH ROUTING ###############
+# Set once per worker process by _init_worker so the grid is pickled once
+# per worker rather than once per task.
+_worker_grid = None
+_worker_kernel = "flat"
+_worker_extra = {}
+
+
+def _init_worker(grid, kernel, extra):
+    global _worker_grid, _worker_kernel, _worker_extra
+    _worker_grid = grid
+    _worker_kernel = kernel
+    _worker_extra = extra
+
+
+def _route_chunk(fn, chunk):
+    return [(i, fn(_worker_grid, *args, _worker_kernel, **_worker_extra)) for i, *args in chunk]
+
+
+def _run_batch(fn, grid, jobs, kernel, progress, workers, chunk_size, labels=None, graph=None, **extra):
+    """Call fn(grid, *job, kernel, labels=, graph=, **extra) for every job, in a process pool when worthwhile."""
+    jobs = list(jobs)
+    total = len(jobs)
+    results = [None] * total
+    if not total:
+        return results
+    if labels is None and isinstance(grid, np.ndarray):
+        # One labelling pass lets every unreachable job skip its searches
+        labels = label_components(grid)
+    extra = dict(extra, labels=labels, graph=graph)
+    if workers is None:
+        workers = min(MAX_WORKERS, os.cpu_count() or 1)
+    if chunk_size is None:
+        # A few chunks per worker keeps the pool balanced when some routes are slow
+        chunk_size = max(1, -(-total // (workers * 4)))
+    indexed = [(i,) + tuple(job) for i, job in enumerate(jobs)]
+    chunks = [indexed[k:k + chunk_size] for k in range(0, total, chunk_size)]
+
+    if total >= PARALLEL_MIN and workers > 1:
+        try:
+            # spawn: never fork the GTK process and its threads
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_init_worker, initargs=(grid, kernel, extra)) as pool:
+                futures = {pool.submit(_route_chunk, fn, c): len(c) for c in chunks}
+                done = 0
+                for fut in as_completed(futures):
+                    for i, result in fut.result():
+                        results[i] = result
+                    done += futures[fut]
+                    if progress:
+                        progress(done, total)
+            return results
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Error in {fn.__name__} batch: {e}; routing serially")
+
+    done = 0
+    for chunk in chunks:
+        for i, *args in chunk:
+            results[i] = fn(grid, *args, kernel, **extra)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return results
+
+
+def _measured(fn, *args, max_expansions=None, **kwargs):
+    stats = SearchStats(max_expansions)
+    return fn(*args, stats=stats, **kwargs), stats
+
+
+def _route_cells_measured(grid, start, end, kernel, labels=None, graph=None, max_expansions=None):
+    return _measured(route_cells, grid, start, end, kernel, labels, graph, max_expansions=max_expansions)
+
+
+def _unpack_stats(results, stats):
+    if stats is not None:
+        stats.extend(s for _, s in results)
+    return [r for r, _ in results]
+
+
+def route_batch(grid, jobs, kernel="flat", progress=None, workers=None, chunk_size=None, labels=None,
+                graph=None, max_expansions=None, stats=None):
+    """
+    Route every (start_cell, end_cell) in jobs against the same grid.
+
+    Routes are independent, so they are split into chunks and spread over a
+    process pool (small batches, or a pool that cannot start, are routed
+    serially).  progress(done, total) is called from the calling thread as
+    chunks finish.  Returns the paths in job order; nothing is written to
+    any Wire, so callers can apply all results in one pass.  labels are the
+    grid's label_components(), computed here when not given; graph is its
+    optional ClusterGraph (see route_cells()).  Each route may expand at
+    most max_expansions nodes; its SearchStats are appended to the stats
+    list, in job order, when one is given.
+    """
+    jobs = [(tuple(s), tuple(e)) for s, e in jobs]
+    results = _run_batch(_route_cells_measured, grid, jobs, kernel, progress, workers, chunk_size, labels, graph,
+                         max_expansions=max_expansions)
+    return _unpack_stats(results, stats)
+
+
+############## STEINER NETS ###############
+def _tree_reaches(labels, cells, sink):
+    """
+    Whether a search seeded with the tree's cells ((n, 2) array) can reach
+    sink: the sources leave through their own free cells or any free
+    4-neighbour.
+    """
+    d0, d1 = labels.shape
+    if not (0 <= sink[0] < d0 and 0 <= sink[1] < d1):
+        return True
+    goal = labels[sink]
+    if not goal:
+        return False
+    for dr, dc in ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)):
+        r, c = cells[:, 0] + dr, cells[:, 1] + dc
+        ok = (r >= 0) & (r < d0) & (c >= 0) & (c < d1)
+        if (labels[r[ok], c[ok]] == goal).any():
+            return True
+    return False
+
+
+def _route_to_tree(grid, cells, sink, kernel="flat", labels=None, graph=None, stats=None):
+    """
+    Cheapest branch from any of the net's tree cells ((n, 2) array) to
+    sink; returns the path from its tap cell.  The "classic" kernel has no
+    multi-source search, so it branches with "flat".  stats as in route_cells().
+    """
+    kernel = "bends" if kernel == "bends" else "flat"
+    tap = tuple(int(v) for v in cells[np.abs(cells - sink).sum(axis=1).argmin()])
+    if labels is not None and not _tree_reaches(labels, cells, sink):
+        print(f"{sink} is walled off from its net; using Manhattan fallback")
+        return manhattan_cells(tap, sink)
+    d0, d1 = grid.shape
+    r0 = max(0, min(tap[0], sink[0]) - MARGIN)
+    r1 = min(d0, max(tap[0], sink[0]) + MARGIN + 1)
+    c0 = max(0, min(tap[1], sink[1]) - MARGIN)
+    c1 = min(d1, max(tap[1], sink[1]) + MARGIN + 1)
+    inside = cells[(cells[:, 0] >= r0) & (cells[:, 0] < r1) & (cells[:, 1] >= c0) & (cells[:, 1] < c1)]
+    # Nearest tap first so the search always has it as a source
+    local = [(tap[0] - r0, tap[1] - c0)] + (inside - (r0, c0)).tolist()
+    astar = AStar(grid[r0:r1, c0:c1], kernel=kernel, max_expansions=_budget(stats))
+    path = astar.find_path_from_any(local, (sink[0] - r0, sink[1] - c0))
+    _record(stats, astar)
+    if path:
+        return [(r + r0, c + c0) for r, c in path]
+    if _spent(stats):
+        print(f"Expansion budget spent on the branch to {sink}; using Manhattan fallback")
+        return manhattan_cells(tap, sink)
+    if isinstance(grid, np.ndarray):
+        astar = AStar(grid, kernel=kernel, max_expansions=_budget(stats))
+        path = astar.find_path_from_any([tap] + cells.tolist(), sink)
+        _record(stats, astar)
+    elif graph is not None:
+        path = graph.find_path(tap, sink, kernel, stats)
+    if path:
+        return path
+    print(f"A* found no branch to {sink}; using Manhattan fallback")
+    return manhattan_cells(tap, sink)
+
+
+def route_net(grid, source, sinks, kernel="flat", labels=None, graph=None, stats=None):
+    """
+    Rectilinear Steiner tree for one net.  The nearest sink is routed from
+    the source with route_cells(); every further sink (nearest first) is
+    reached by a search seeded with every cell already in the tree at zero
+    cost, so branches tap into existing trunks instead of running back to
+    the source.  Returns [(tap_cell, path)] in sink order, each path running
+    from its tap cell to the sink.  labels (label_components() of grid) let
+    walled-off sinks skip the search; graph is passed on to route_cells().
+    stats (astar.SearchStats) is one budget and tally for the whole net.
+    """
+    source = tuple(source)
+    sinks = [tuple(k) for k in sinks]
+    result = [None] * len(sinks)
+    tree = set()        # tree cells; kept as a set so huge sparse grids need no mask
+    cells = []          # the same cells in insertion order, for the nearest-tap query
+    order = sorted(range(len(sinks)), key=lambda k: abs(sinks[k][0] - source[0]) + abs(sinks[k][1] - source[1]))
+    for n, k in enumerate(order):
+        sink = sinks[k]
+        if n == 0:
+            path = route_cells(grid, source, sink, kernel, labels, graph, stats)
+        elif sink in tree:
+            path = [sink]
+        else:
+            path = _route_to_tree(grid, np.array(cells), sink, kernel, labels, graph, stats)
+        for cell in path:
+            cell = (int(cell[0]), int(cell[1]))
+            if 0 <= cell[0] < grid.shape[0] and 0 <= cell[1] < grid.shape[1] and cell not in tree:
+                tree.add(cell)
+                cells.append(cell)
+        result[k] = (path[0], path)
+    return result
+
+
+def _route_net_measured(grid, source, sinks, kernel, labels=None, graph=None, max_expansions=None):
+    return _measured(route_net, grid, source, sinks, kernel, labels, graph, max_expansions=max_expansions)
+
+
+def route_net_batch(grid, nets, kernel="flat", progress=None, workers=None, chunk_size=None, labels=None,
+                    graph=None, max_expansions=None, stats=None):
+    """
+    route_net() for every (source_cell, [sink_cells]) in nets, in a process
+    pool like route_batch().  progress counts nets; max_expansions and stats
+    apply per net.  Returns one [(tap_cell, path)] list per net.
+    """
+    nets = [(tuple(src), [tuple(k) for k in sinks]) for src, sinks in nets]
+    results = _run_batch(_route_net_measured, grid, nets, kernel, progress, workers, chunk_size, labels, graph,
+                         max_expansions=max_expansions)
+    return _unpack_stats(results, stats)
+
+
+############## NEGOTIATED CONGESTION ###############
+# Present-congestion factor for the first pass and its growth per iteration
+PRES_FAC_FIRST = 0.5
+PRES_FAC_MULT = 1.8
+# History cost added per iteration for every net over a track's capacity (1)
+HIST_FAC = 0.4
+
+
+def _track_usage(path):
+    """
+    Tracks (axis, r, c) a path occupies: a cell entered or left by a move
+    along axis 0 uses its axis-0 track, likewise axis 1.  Perpendicular
+    crossings therefore do not conflict; running along the same track does.
+    """
+    used = set()
+    for a, b in zip(path, path[1:]):
+        axis = 0 if a[0] != b[0] else 1
+        used.add((axis, a[0], a[1]))
+        used.add((axis, b[0], b[1]))
+    return used
+
+
+class _Negotiation:
+    """Shared track usage and history costs for one route_negotiated() run."""
+
+    def __init__(self, grid, max_expansions=None):
+        self.grid = grid
+        self.max_expansions = max_expansions    # per search, window and full grid alike
+        self.use = np.zeros((2,) + grid.shape, dtype=np.int32)   # nets per track
+        self.hist = np.zeros((2,) + grid.shape)
+        self.pres_fac = PRES_FAC_FIRST
+        self.net_tracks = {}    # net key -> {track: wires of that net using it}
+
+    def add(self, net, path):
+        own = self.net_tracks.setdefault(net, {})
+        for t in _track_usage(path):
+            n = own.get(t, 0)
+            if not n:
+                self.use[t] += 1
+            own[t] = n + 1
+
+    def rip(self, net, path):
+        own = self.net_tracks[net]
+        for t in _track_usage(path):
+            n = own[t] - 1
+            if n:
+                own[t] = n
+            else:
+                del own[t]
+                self.use[t] -= 1
+
+    def _penalty(self, net, r0, r1, c0, c1):
+        # Other nets on each track; a net's own wires share tracks for free
+        occ = self.use[:, r0:r1, c0:c1].astype(float)
+        for axis, r, c in self.net_tracks.get(net, ()):
+            if r0 <= r < r1 and c0 <= c < c1:
+                occ[axis, r - r0, c - c0] -= 1
+        cost = (1.0 + self.hist[:, r0:r1, c0:c1]) * (1.0 + self.pres_fac * occ) - 1.0
+        # Charged on both cells of a move, so halve it
+        pen = np.rint(cost * (STEP_COST / 2.0)).astype(np.int64)
+        return pen[0], pen[1]
+
+    def route(self, net, start, end):
+        d0, d1 = self.grid.shape
+        windows = [(max(0, min(start[0], end[0]) - MARGIN), min(d0, max(start[0], end[0]) + MARGIN + 1),
+                    max(0, min(start[1], end[1]) - MARGIN), min(d1, max(start[1], end[1]) + MARGIN + 1)),
+                   (0, d0, 0, d1)]
+        for r0, r1, c0, c1 in windows:
+            astar = AStar(self.grid[r0:r1, c0:c1], kernel="flat",
+                          penalty=self._penalty(net, r0, r1, c0, c1), max_expansions=self.max_expansions)
+            path = astar.find_path((start[0] - r0, start[1] - c0), (end[0] - r0, end[1] - c0))
+            if path:
+                return [(r + r0, c + c0) for r, c in path]
+        return manhattan_cells(start, end)
+
+    def overused(self):
+        return self.use > 1
+
+    def end_iteration(self):
+        self.hist += HIST_FAC * np.maximum(self.use - 1, 0)
+        self.pres_fac *= PRES_FAC_MULT
+
+
+def route_negotiated(grid, jobs, nets=None, max_iterations=8, time_budget=30.0, progress=None,
+                     max_expansions=None):
+    """
+    Route every (start_cell, end_cell) in jobs together with negotiated
+    congestion (PathFinder): each iteration rips up and reroutes the wires
+    that sit on a track used by more than one net, with present-congestion
+    and accumulated history costs steering them apart.
+
+    nets gives a net key per job (wires of one net may share tracks); by
+    default wires with the same start cell are one net.  Stops when no track
+    is overused, after max_iterations, or once time_budget seconds have
+    passed (every wire keeps its latest route; wires not yet routed when it
+    runs out take manhattan_cells()).  Each search may expand at most
+    max_expansions nodes before the wire falls back to manhattan_cells().
+    progress(done, total) is called after each iteration.  Returns
+    (paths, overused_tracks).
+    """
+    jobs = [(tuple(s), tuple(e)) for s, e in jobs]
+    if nets is None:
+        nets = [s for s, _ in jobs]
+    if jobs and not isinstance(grid, np.ndarray):
+        # Sparse (TileGrid) canvas: negotiate inside the jobs' padded bounding box
+        ends = np.array([c for job in jobs for c in job])
+        r0, c0 = np.maximum(ends.min(axis=0) - 2 * MARGIN, 0).tolist()
+        r1, c1 = np.minimum(ends.max(axis=0) + 2 * MARGIN + 1, grid.shape).tolist()
+        local = [((s[0] - r0, s[1] - c0), (e[0] - r0, e[1] - c0)) for s, e in jobs]
+        paths, overflow = route_negotiated(grid[r0:r1, c0:c1], local, nets, max_iterations,
+                                           time_budget, progress, max_expansions)
+        return [[(r + r0, c + c0) for r, c in p] for p in paths], overflow
+    neg = _Negotiation(grid, max_expansions)
+    paths = [None] * len(jobs)
+    deadline = time.time() + time_budget
+    overflow = 0
+
+    for it in range(max_iterations):
+        if it == 0:
+            todo = range(len(jobs))
+        else:
+            over = neg.overused()
+            todo = [i for i, p in enumerate(paths)
+                    if any(over[t] for t in _track_usage(p))]
+            if not todo:
+                break
+        for i in todo:
+            start, end = jobs[i]
+            if time.time() > deadline:
+                if paths[i] is None:
+                    paths[i] = manhattan_cells(start, end)
+                    neg.add(nets[i], paths[i])
+                continue
+            if paths[i] is not None:
+                neg.rip(nets[i], paths[i])
+            paths[i] = neg.route(nets[i], start, end)
+            neg.add(nets[i], paths[i])
+        overflow = int(neg.overused().sum())
+        if progress:
+            progress(it + 1, max_iterations)
+        if not overflow or time.time() > deadline:
+            break
+        neg.end_iteration()
+
+    if overflow:
+        print(f"Negotiated routing: {overflow} tracks still shared by several nets")
+    return paths, overflow
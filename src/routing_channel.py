@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+routing_channel.py -- channel router for column-placed netlists
+
+yosys_importer places cells in topological columns, leaving a vertical
+channel between neighbouring columns.  Instead of one A* per sink, every
+connection is routed as a Z: along a free row out of its source, down a
+vertical trunk in the channel beside its sink's column, and along a free
+row into the sink.  Trunks are put on channel tracks with the left-edge
+algorithm (all sinks of a net in one channel share a trunk), and every
+horizontal run and stub is reserved for its net, so different nets only
+ever cross, never overlap.  The work is a few lookups per connection,
+independent of the canvas area.  Connections the channels cannot carry are
+left for the regular router.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# Rows tried above and below a pin for its run into a channel
+ESCAPE_ROWS = 6
+
+# Row offsets in the order they are tried: the pin's own row first
+_OFFSETS = [0] + [d for k in range(1, ESCAPE_ROWS + 1) for d in (-k, k)]
+
+
+def left_edge(intervals):
+    """
+    Left-edge track assignment for [(lo, hi)] row intervals: returns
+    (track of each interval, number of tracks).  Intervals are taken by
+    their top row and reuse any track whose last interval ended above it.
+    """
+    order = sorted(range(len(intervals)), key=intervals.__getitem__)
+    tracks = [0] * len(intervals)
+    ends = []       # (last row, track) heap
+    for i in order:
+        lo, hi = intervals[i]
+        if ends and ends[0][0] < lo:
+            t = ends[0][1]
+            heapq.heapreplace(ends, (hi, t))
+        else:
+            t = len(ends)
+            heapq.heappush(ends, (hi, t))
+        tracks[i] = t
+    return tracks, len(ends)
+
+
+class _Obstacles:
+    """
+    Blocked cells of the footprints and connection points, stored only for
+    the columns that hold any, with prefix sums for O(log n) clear-run
+    tests along a row or a column.
+    """
+
+    def __init__(self, rects, points):
+        cols = set()
+        for y1, y2, x1, x2 in rects:
+            cols.update(range(x1, x2))
+        cols.update(x for x, _ in points)
+        self.cols = sorted(cols)
+        self.index = {c: k for k, c in enumerate(self.cols)}
+        h = max([y2 for _, y2, _, _ in rects] + [y + 1 for _, y in points] + [0]) + 1
+        self.height = h
+        counts = np.zeros((h + 1, len(self.cols) + 1), dtype=np.int32)
+        if rects:
+            r = np.asarray(rects)
+            k1 = np.searchsorted(self.cols, r[:, 2])
+            k2 = np.searchsorted(self.cols, r[:, 3])
+            # 2-D difference array: each rectangle is four corner updates
+            np.add.at(counts, (r[:, 0], k1), 1)
+            np.add.at(counts, (r[:, 0], k2), -1)
+            np.add.at(counts, (r[:, 1], k1), -1)
+            np.add.at(counts, (r[:, 1], k2), 1)
+            counts = counts.cumsum(axis=0).cumsum(axis=1)
+        counts = counts[:h, :len(self.cols)]
+        if points:
+            p = np.asarray(points)
+            np.add.at(counts, (p[:, 1], np.searchsorted(self.cols, p[:, 0])), 1)
+        blocked = (counts > 0).astype(np.int32)
+        self.along_row = np.zeros((h, len(self.cols) + 1), dtype=np.int32)
+        self.along_row[:, 1:] = blocked.cumsum(axis=1)
+        self.along_col = np.zeros((h + 1, len(self.cols)), dtype=np.int32)
+        self.along_col[1:] = blocked.cumsum(axis=0)
+
+    def row_clear(self, r, c0, c1):
+        """True if cells c0..c1 of row r are all free."""
+        if c0 > c1:
+            return True
+        if r < 0:
+            return False
+        if r >= self.height:
+            return True
+        k0, k1 = bisect_left(self.cols, c0), bisect_right(self.cols, c1)
+        return k0 == k1 or self.along_row[r, k1] == self.along_row[r, k0]
+
+    def col_clear(self, c, r0, r1):
+        """True if rows r0..r1 of column c are all free."""
+        if r0 > r1:
+            return True
+        if r0 < 0:
+            return False
+        k = self.index.get(c)
+        if k is None:
+            return True
+        r1 = min(r1, self.height - 1)
+        return r0 > r1 or self.along_col[r1 + 1, k] == self.along_col[r0, k]
+
+
+class _Lanes:
+    """
+    Stretches of rows (or columns) already claimed, by net.  Overlapping
+    claims of one net are merged, so each line's stretches stay disjoint
+    and sorted and a lookup is a bisection.
+    """
+
+    def __init__(self):
+        self.used = {}      # row or column -> ([first], [(first, last, net)])
+
+    def _overlapping(self, key, a, b):
+        """Index range of the stretches on key that overlap a..b."""
+        starts, spans = self.used.get(key, ((), ()))
+        i = j = bisect_right(starts, b)
+        while j and spans[j - 1][1] >= a:
+            j -= 1
+        return j, i
+
+    def free(self, key, a, b, net):
+        j, i = self._overlapping(key, a, b)
+        spans = self.used[key][1] if i else ()
+        return all(spans[k][2] == net for k in range(j, i))
+
+    def claim(self, key, a, b, net):
+        j, i = self._overlapping(key, a, b)
+        starts, spans = self.used.setdefault(key, ([], []))
+        if j < i:
+            a, b = min(a, spans[j][0]), max(b, spans[i - 1][1])
+        starts[j:i] = [a]
+        spans[j:i] = [(a, b, net)]
+
+
+def _escape(obst, rows, cols, cell, lo, hi, net):
+    """
+    Row for cell's horizontal run across channel (lo, hi): the pin's own
+    row if it is clear, else the nearest clear row within ESCAPE_ROWS,
+    reached by a vertical stub.  The run (to the channel's far side, as
+    the trunk may be on any track) and stub are claimed for net.  Returns
+    None if no row works.
+    """
+    x, y = cell
+    if lo <= x <= hi:
+        return None
+    a, b = (x, hi) if x < lo else (lo, x)
+    ra, rb = (x + 1, hi) if x < lo else (lo, x - 1)     # the run without the pin's own column
+    for dy in _OFFSETS:
+        r = y + dy
+        s0, s1 = (r, y - 1) if dy < 0 else (y + 1, r)
+        if (obst.row_clear(r, ra, rb) and obst.col_clear(x, s0, s1)
+                and rows.free(r, a, b, net) and (not dy or cols.free(x, s0, s1, net))):
+            rows.claim(r, a, b, net)
+            if dy:
+                cols.claim(x, s0, s1, net)
+            return r
+    return None
+
+
+def _branches(src, sinks, xt, rs, ends, out):
+    """
+    Corner paths for one trunk at column xt: the sink nearest the source
+    row gets the whole Z from the source, later ones tap the trunk.
+    """
+    sx = src[0]
+    top = bottom = rs
+    for n, (i, rd) in enumerate(sorted(ends, key=lambda e: abs(e[1] - rs))):
+        dx, dy = sinks[i]
+        tail = [(xt, rd), (dx, rd), (dx, dy)]
+        if n == 0:
+            out[i] = (src, [src, (sx, rs), (xt, rs)] + tail)
+        elif top <= rd <= bottom:
+            out[i] = ((xt, rd), tail)
+        else:
+            tap = (xt, bottom if rd > bottom else top)
+            out[i] = (tap, [tap] + tail)
+        top, bottom = min(top, rd), max(bottom, rd)
+
+
+def route_channels(rects, points, nets, channels):
+    """
+    Route nets [(source cell, [sink cells])] through the channels between
+    placement columns.  rects are the (y1, y2, x1, x2) cell footprints of
+    the blocks and pins, points their connection cells, and channels the
+    (first, last) track columns of each channel, left to right.  Cells are
+    (x, y) like Wire.endpoint_cells().
+
+    A sink right of its source uses the channel left of the sink's column,
+    any other the channel right of it.  Returns, per net, (tap, corners)
+    for each sink -- tap is the source, or the trunk cell the branch
+    starts from -- or None where the channels could not take it.
+    """
+    obst = _Obstacles(list(rects), list(points))
+    rows, cols = _Lanes(), _Lanes()
+    los = [lo for lo, _ in channels]
+    his = [hi for _, hi in channels]
+    out = [[None] * len(sinks) for _, sinks in nets]
+    groups = []         # (net, channel, source row, [(sink, sink row)])
+    for n, (src, sinks) in enumerate(nets):
+        by_channel = {}
+        for i, dst in enumerate(sinks):
+            ch = bisect_left(his, dst[0]) - 1 if dst[0] > src[0] else bisect_right(los, dst[0])
+            if 0 <= ch < len(channels):
+                by_channel.setdefault(ch, []).append(i)
+        for ch, picks in by_channel.items():
+            lo, hi = channels[ch]
+            rs = _escape(obst, rows, cols, src, lo, hi, n)
+            if rs is None:
+                continue
+            ends = []
+            for i in picks:
+                rd = _escape(obst, rows, cols, sinks[i], lo, hi, n)
+                if rd is not None:
+                    ends.append((i, rd))
+            if ends:
+                groups.append((n, ch, rs, ends))
+
+    spans = {}          # channel -> [(top row, bottom row, group)]
+    for g, (_, ch, rs, ends) in enumerate(groups):
+        used = [rs] + [rd for _, rd in ends]
+        spans.setdefault(ch, []).append((min(used), max(used), g))
+    for ch, items in spans.items():
+        lo, hi = channels[ch]
+        tracks, _ = left_edge([(a, b) for a, b, _ in items])
+        for (a, b, g), t in zip(items, tracks):
+            xt = lo + t
+            if xt > hi or not obst.col_clear(xt, a, b):
+                continue
+            n, _, rs, ends = groups[g]
+            src, sinks = nets[n]
+            _branches(src, sinks, xt, rs, ends, out[n])
+    return out
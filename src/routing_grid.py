@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+import itertools
+import numpy as np
+from routing_hpa import ClusterGraph
+
+# Canvases with more cells than this keep their occupancy in a TileGrid
+SPARSE_MIN_CELLS = 1 << 20
+# Cells per TileGrid tile side
+TILE = 64
+
+
+def label_components(grid):
+    """
+    4-connected component labels of the free cells (grid < 1): 0 marks a
+    blocked cell, 1.. a component.  Works on horizontal runs of free cells,
+    unioning each run with the runs it touches in the previous row, so the
+    Python loop is per run rather than per cell.
+    """
+    free = np.asarray(grid) < 1
+    h, w = free.shape
+    parent = [0]
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    runs = []           # (row, start, end, run id)
+    prev = []
+    for r in range(h):
+        edges = np.diff(np.concatenate(([0], free[r].view(np.int8), [0])))
+        cur = []
+        j = 0
+        for s, e in zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()):
+            rid = len(parent)
+            parent.append(rid)
+            while j < len(prev) and prev[j][1] <= s:
+                j += 1
+            k = j
+            while k < len(prev) and prev[k][0] < e:
+                a, b = find(rid), find(prev[k][2])
+                if a != b:
+                    parent[a] = b
+                k += 1
+            cur.append((s, e, rid))
+            runs.append((r, s, e, rid))
+        prev = cur
+
+    labels = np.zeros((h, w), dtype=np.int32)
+    compact = {}
+    for r, s, e, rid in runs:
+        labels[r, s:e] = compact.setdefault(find(rid), len(compact) + 1)
+    return labels
+
+
+class TileGrid:
+    """
+    Sparse occupancy counts for very large canvases.  TILE x TILE int16
+    tiles exist only where something is marked and are dropped again once
+    empty, so memory follows the number of blocks and pins, not the canvas
+    area.  Indexing works like the dense array for the reads routing does:
+    grid[r, c] is a count and slices return a dense int array (missing
+    tiles read as free), so A* windows are cut exactly as from numpy;
+    gather() stands in for fancy indexing.
+    """
+
+    def __init__(self, shape, tiles=None):
+        self.shape = tuple(shape)
+        self.tiles = {} if tiles is None else tiles   # (tile row, tile col) -> int16 counts
+        self._shared = set()    # tiles also held by a snapshot(); copied before writing
+
+    @property
+    def nbytes(self):
+        return sum(t.nbytes for t in self.tiles.values())
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        ranges, picks = [], []
+        for k, n in zip(key, self.shape):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(n)
+                if step != 1:
+                    raise IndexError("TileGrid slices must have step 1")
+                ranges.append((start, max(start, stop)))
+                picks.append(slice(None))
+            else:
+                k = int(k) + (n if k < 0 else 0)
+                if not 0 <= k < n:
+                    raise IndexError(f"index {k} out of range for TileGrid axis of size {n}")
+                ranges.append((k, k + 1))
+                picks.append(0)
+        (r0, r1), (c0, c1) = ranges
+        out = np.zeros((r1 - r0, c1 - c0), dtype=int)
+        for ti in range(r0 // TILE, -(-r1 // TILE)):
+            for tj in range(c0 // TILE, -(-c1 // TILE)):
+                tile = self.tiles.get((ti, tj))
+                if tile is None:
+                    continue
+                y0, x0 = ti * TILE, tj * TILE
+                a0, a1 = max(r0, y0), min(r1, y0 + TILE)
+                b0, b1 = max(c0, x0), min(c1, x0 + TILE)
+                out[a0 - r0:a1 - r0, b0 - c0:b1 - c0] = tile[a0 - y0:a1 - y0, b0 - x0:b1 - x0]
+        if picks == [0, 0]:
+            return int(out[0, 0])
+        return out[tuple(picks)]
+
+    def gather(self, rows, cols):
+        """Counts at the cells (rows[i], cols[i]), like grid[rows, cols] on an array."""
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        out = np.zeros(rows.shape, dtype=int)
+        ti, tj = rows // TILE, cols // TILE
+        for key in set(zip(ti.tolist(), tj.tolist())):
+            tile = self.tiles.get(key)
+            if tile is None:
+                continue
+            m = (ti == key[0]) & (tj == key[1])
+            out[m] = tile[rows[m] - key[0] * TILE, cols[m] - key[1] * TILE]
+        return out
+
+    def add(self, rect, delta):
+        """Add delta to every count in rect (y1, y2, x1, x2), clipped to the grid."""
+        y1, y2, x1, x2 = rect
+        y2, x2 = min(y2, self.shape[0]), min(x2, self.shape[1])
+        for ti in range(y1 // TILE, -(-y2 // TILE)):
+            for tj in range(x1 // TILE, -(-x2 // TILE)):
+                key = (ti, tj)
+                tile = self.tiles.get(key)
+                if tile is None:
+                    tile = self.tiles[key] = np.zeros((TILE, TILE), dtype=np.int16)
+                elif key in self._shared:
+                    tile = self.tiles[key] = tile.copy()
+                    self._shared.discard(key)
+                y0, x0 = ti * TILE, tj * TILE
+                tile[max(y1, y0) - y0:min(y2, y0 + TILE) - y0, max(x1, x0) - x0:min(x2, x0 + TILE) - x0] += delta
+                if delta < 0 and not tile.any():
+                    del self.tiles[key]
+                    self._shared.discard(key)
+
+    def snapshot(self):
+        """Read-only copy sharing every tile; later writes here copy the tiles they touch."""
+        self._shared = set(self.tiles)
+        return TileGrid(self.shape, dict(self.tiles))
+
+
+class OccupancyGrid:
+    """
+    Long-lived A* obstacle grid for the canvas.
+
+    Each block/pin footprint is remembered as a cell rectangle and cells hold
+    a coverage count, so moving or deleting one element only patches its own
+    rectangle (overlapping footprints stay blocked).  Every patch bumps
+    `version`; snapshot() hands out the current array copy-on-write, so a
+    route always searches one consistent state even if the canvas changes.
+    components() keeps free-cell connectivity labels for the same version,
+    and hierarchy() a cluster graph patched only where footprints changed.
+    Canvases over SPARSE_MIN_CELLS cells use a TileGrid instead of a dense
+    array (`sparse`); they have no component labels.
+    """
+
+    def __init__(self, width, height, grid_size):
+        self.grid_size = grid_size
+        shape = (height // grid_size, width // grid_size)
+        self.sparse = shape[0] * shape[1] > SPARSE_MIN_CELLS
+        self.grid = TileGrid(shape) if self.sparse else np.zeros(shape, dtype=int)
+        self.version = 0
+        self._rects = {}        # element -> (y1, y2, x1, x2) currently marked
+        self._shared = False    # grid array was handed out by snapshot()
+        self._labels = None     # (version, label array) from components()
+        self._graph = None      # ClusterGraph from hierarchy()
+        self._snapshot = None   # (version, frozen TileGrid) for sparse grids
+        self._dirty = []        # cell rects changed since the graph was last patched
+
+    def cell_rect(self, elem):
+        """Grid-cell footprint (y1, y2, x1, x2) of a block or pin."""
+        gs = self.grid_size
+        x1, y1 = int(elem.x // gs), int(elem.y // gs)
+        x2, y2 = int((elem.x + elem.width) // gs), int((elem.y + elem.height) // gs)
+        return (max(0, y1), max(0, y2), max(0, x1), max(0, x2))
+
+    def _writable(self):
+        if self._shared:
+            self.grid = self.grid.copy()
+            self._shared = False
+        return self.grid
+
+    def _mark(self, rect, delta):
+        y1, y2, x1, x2 = rect
+        if self.sparse:
+            self.grid.add(rect, delta)
+        else:
+            self._writable()[y1:y2, x1:x2] += delta
+        self._touch(rect)
+
+    def update(self, elem):
+        """Mark elem at its current position; returns True if the grid changed."""
+        rect = self.cell_rect(elem)
+        old = self._rects.get(elem)
+        if old == rect:
+            return False
+        if old is not None:
+            self._mark(old, -1)
+        self._mark(rect, 1)
+        self._rects[elem] = rect
+        self.version += 1
+        return True
+
+    def remove(self, elem):
+        """Clear elem's footprint; returns True if it was marked."""
+        old = self._rects.pop(elem, None)
+        if old is None:
+            return False
+        self._mark(old, -1)
+        self.version += 1
+        return True
+
+    def _touch(self, rect):
+        if self._graph is not None:
+            self._dirty.append(rect)
+
+    def sync(self, blocks, pins):
+        """
+        Patch the grid to match the given blocks and pins: new or moved
+        elements are (re)marked, elements no longer present are cleared.
+        Returns the number of footprints that changed.
+        """
+        live = set()
+        changed = 0
+        for elem in itertools.chain(blocks, pins):
+            live.add(elem)
+            changed += self.update(elem)
+        # Every live element is in _rects now, so equal sizes mean no stale ones
+        if len(self._rects) != len(live):
+            for elem in [e for e in self._rects if e not in live]:
+                changed += self.remove(elem)
+        return changed
+
+    def snapshot(self):
+        """(version, grid) for routing; the grid is never mutated afterwards."""
+        if self.sparse:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                self._snapshot = (self.version, self.grid.snapshot())
+            return self._snapshot
+        self._shared = True
+        return self.version, self.grid
+
+    def components(self):
+        """Connected-component labels of the free cells for the current version (None if sparse)."""
+        if self.sparse:
+            return None
+        if self._labels is None or self._labels[0] != self.version:
+            self._labels = (self.version, label_components(self.grid))
+        return self._labels[1]
+
+    def hierarchy(self):
+        """ClusterGraph of the current grid for long routes (see routing_hpa)."""
+        version, grid = self.snapshot()
+        if self._graph is None:
+            self._graph = ClusterGraph(grid)
+        elif self._dirty or self._graph.grid is not grid:
+            self._graph.update(grid, self._dirty)
+            self._dirty = []
+        return self._graph
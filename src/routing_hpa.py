@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+routing_hpa.py -- hierarchical (HPA*-style) abstract graph over the occupancy grid
+
+The grid is cut into CLUSTER_SIZE x CLUSTER_SIZE clusters.  Every run of
+free cells along the border of two clusters gets one or two transitions
+(an entrance cell on each side), and the entrances of one cluster are
+joined by their walking distance inside it.  A long route is planned on
+this small graph first and only then refined cell by cell, one cluster at
+a time, so its cost follows the route's length instead of the canvas area.
+Clusters are built the first time a search reaches them, and moving a
+block only drops the clusters around its footprint.
+"""
+import heapq
+import time
+from collections import deque
+import numpy as np
+from astar import AStar, SearchStats, STEP_COST
+
+# Cells per cluster side
+CLUSTER_SIZE = 25
+# Border runs at least this long get a transition at each end instead of
+# one in the middle, so wide-open borders do not force a detour to the centre
+SPLIT_RUN = 8
+
+
+class ClusterGraph:
+    def __init__(self, grid, cluster=CLUSTER_SIZE):
+        self.cluster = cluster
+        self.grid = grid
+        h, w = grid.shape
+        self.shape = (-(-h // cluster), -(-w // cluster))
+        # Both caches fill lazily; a cluster's edges are only cached while
+        # all four of its borders are.
+        self.borders = {}   # (cluster, axis) -> [(inside, outside)] transitions to the next cluster along axis
+        self.intra = {}     # cluster -> {entrance: [(entrance, cost)]} inside the cluster
+        self.expanded = 0   # abstract nodes expanded by the last find_path()
+
+    def cluster_of(self, cell):
+        return (cell[0] // self.cluster, cell[1] // self.cluster)
+
+    def bounds(self, k):
+        """Cell range (r0, r1, c0, c1) of cluster k."""
+        h, w = self.grid.shape
+        n = self.cluster
+        return k[0] * n, min(h, (k[0] + 1) * n), k[1] * n, min(w, (k[1] + 1) * n)
+
+    ############## BUILD ###############
+    def _scan_border(self, k, axis):
+        """Transitions from cluster k to its neighbour along axis, read from the grid."""
+        r0, r1, c0, c1 = self.bounds(k)
+        grid = self.grid
+        pairs = []
+        if axis == 1 and c1 < grid.shape[1]:
+            both = (grid[r0:r1, c1 - 1] < 1) & (grid[r0:r1, c1] < 1)
+            cell = lambda i: ((r0 + i, c1 - 1), (r0 + i, c1))
+        elif axis == 0 and r1 < grid.shape[0]:
+            both = (grid[r1 - 1, c0:c1] < 1) & (grid[r1, c0:c1] < 1)
+            cell = lambda i: ((r1 - 1, c0 + i), (r1, c0 + i))
+        else:
+            both = None
+        if both is not None:
+            edges = np.diff(np.concatenate(([0], both.view(np.int8), [0])))
+            for s, e in zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()):
+                picks = (s, e - 1) if e - s >= SPLIT_RUN else ((s + e - 1) // 2,)
+                pairs.extend(cell(i) for i in picks)
+        return pairs
+
+    def border(self, k, axis):
+        """Cached transitions [(cell in k, cell across)] to the next cluster along axis."""
+        pairs = self.borders.get((k, axis))
+        if pairs is None:
+            pairs = self.borders[(k, axis)] = self._scan_border(k, axis)
+        return pairs
+
+    def _entrances(self, k):
+        """Entrance cells of cluster k from all four of its borders."""
+        cells = {a for a, _ in self.border(k, 0)}
+        cells.update(a for a, _ in self.border(k, 1))
+        if k[0]:
+            cells.update(b for _, b in self.border((k[0] - 1, k[1]), 0))
+        if k[1]:
+            cells.update(b for _, b in self.border((k[0], k[1] - 1), 1))
+        return sorted(cells)
+
+    def across(self, cell):
+        """Entrance cells joined to cell by a one-step transition into a neighbouring cluster."""
+        k = self.cluster_of(cell)
+        r0, r1, c0, c1 = self.bounds(k)
+        out = []
+        if cell[0] == r1 - 1:
+            out += [b for a, b in self.border(k, 0) if a == cell]
+        if cell[1] == c1 - 1:
+            out += [b for a, b in self.border(k, 1) if a == cell]
+        if cell[0] == r0 and k[0]:
+            out += [a for a, b in self.border((k[0] - 1, k[1]), 0) if b == cell]
+        if cell[1] == c0 and k[1]:
+            out += [a for a, b in self.border((k[0], k[1] - 1), 1) if b == cell]
+        return out
+
+    def _reach(self, k, src, targets):
+        """
+        Walking cost inside cluster k from src to each reachable cell in
+        targets.  src itself may be blocked (an endpoint on a pin).
+        """
+        r0, r1, c0, c1 = self.bounds(k)
+        w = c1 - c0
+        free = (self.grid[r0:r1, c0:c1] < 1).ravel().tolist()
+        want = {(t[0] - r0) * w + t[1] - c0: t for t in targets}
+        s = (src[0] - r0) * w + src[1] - c0
+        dist = {s: 0}
+        found = {want[s]: 0} if s in want else {}
+        queue = deque([s])
+        n = len(free)
+        while queue and len(found) < len(want):
+            cur = queue.popleft()
+            d = dist[cur] + STEP_COST
+            col = cur % w
+            for nxt in (cur - w, cur + w, cur - 1 if col else -1, cur + 1 if col + 1 < w else -1):
+                if 0 <= nxt < n and free[nxt] and nxt not in dist:
+                    dist[nxt] = d
+                    queue.append(nxt)
+                    if nxt in want:
+                        found[want[nxt]] = d
+        return found
+
+    def edges(self, k):
+        """{entrance: [(entrance, cost)]} inside cluster k, built on first use."""
+        edges = self.intra.get(k)
+        if edges is None:
+            edges = self.intra[k] = self._build_intra(k)
+        return edges
+
+    def _build_intra(self, k):
+        nodes = self._entrances(k)
+        r0, r1, c0, c1 = self.bounds(k)
+        edges = {}
+        if (self.grid[r0:r1, c0:c1] < 1).all():
+            # Open cluster: walking distance is the Manhattan distance
+            for a in nodes:
+                edges[a] = [(b, STEP_COST * (abs(a[0] - b[0]) + abs(a[1] - b[1]))) for b in nodes if b != a]
+        else:
+            for a in nodes:
+                edges[a] = [(b, d) for b, d in self._reach(k, a, nodes).items() if b != a]
+        return edges
+
+    def update(self, grid, rects):
+        """
+        Patch the graph after the cells in rects ((r0, r1, c0, c1) ranges)
+        changed in grid: the clusters they touch, and neighbours whose shared
+        border changed, are dropped and rebuilt when next searched.
+        """
+        self.grid = grid
+        n = self.cluster
+        ki_max, kj_max = self.shape
+        dirty = set()
+        for r0, r1, c0, c1 in rects:
+            # One cell of slack: a border cell change alters both clusters' transitions
+            for ki in range(max(0, (r0 - 1) // n), min(ki_max, r1 // n + 1)):
+                for kj in range(max(0, (c0 - 1) // n), min(kj_max, c1 // n + 1)):
+                    dirty.add((ki, kj))
+        borders = set()
+        for ki, kj in dirty:
+            borders.update((((ki, kj), 0), ((ki, kj), 1), ((ki - 1, kj), 0), ((ki, kj - 1), 1)))
+        stale = set(dirty)
+        for k, axis in borders:
+            old = self.borders.get((k, axis))
+            if old is None:
+                continue        # never scanned, so no cached cluster depends on it
+            pairs = self._scan_border(k, axis)
+            if pairs != old:
+                self.borders[(k, axis)] = pairs
+                # Both clusters on a changed border gain or lose entrances
+                stale.update((k, (k[0] + 1 - axis, k[1] + axis)))
+        for k in stale:
+            self.intra.pop(k, None)
+
+    ############## QUERY ###############
+    def find_path(self, start, goal, kernel="flat", stats=None):
+        """
+        Plan start -> goal over the cluster graph, then refine each hop
+        with A* inside its cluster.  Returns [(r, c), ...] or [].
+        Abstract nodes and refinement searches are both charged to stats
+        (astar.SearchStats) and stop once its budget is spent.
+        """
+        h, w = self.grid.shape
+        start, goal = tuple(start), tuple(goal)
+        self.expanded = 0
+        if not (0 <= start[0] < h and 0 <= start[1] < w and 0 <= goal[0] < h and 0 <= goal[1] < w):
+            return []
+        if start == goal:
+            return [start]
+        if self.grid[goal] >= 1:
+            return []
+        ks, kg = self.cluster_of(start), self.cluster_of(goal)
+        from_start = self._reach(ks, start, self._entrances(ks) + ([goal] if ks == kg else []))
+        to_goal = self._reach(kg, goal, self._entrances(kg))
+
+        def heur(cell):
+            return STEP_COST * (abs(cell[0] - goal[0]) + abs(cell[1] - goal[1]))
+
+        GOAL = (-1, -1)     # virtual node: the goal cell reached from inside its cluster
+        plan = SearchStats()
+        limit = stats.remaining() if stats is not None and stats.max_expansions is not None else 1 << 62
+        t0 = time.perf_counter()
+        g = {}
+        parent = {}
+        frontier = []
+        for node, d in from_start.items():
+            if node == goal:
+                node = GOAL
+            if d < g.get(node, 1 << 62):
+                g[node] = d
+                parent[node] = start
+                heapq.heappush(frontier, (d + (0 if node == GOAL else heur(node)), d, node))
+                plan.pushes += 1
+        found = False
+        while frontier:
+            _, d, node = heapq.heappop(frontier)
+            if node == GOAL:
+                found = True
+                break
+            if d > g[node]:
+                continue
+            if self.expanded >= limit:
+                plan.budget_hit = True
+                break
+            self.expanded += 1
+            steps = list(self.edges(self.cluster_of(node)).get(node, ()))
+            steps += [(b, STEP_COST) for b in self.across(node)]
+            if node in to_goal:
+                steps.append((GOAL, to_goal[node]))
+            for nxt, cost in steps:
+                nd = d + cost
+                if nd < g.get(nxt, 1 << 62):
+                    g[nxt] = nd
+                    parent[nxt] = node
+                    heapq.heappush(frontier, (nd + (0 if nxt == GOAL else heur(nxt)), nd, nxt))
+                    plan.pushes += 1
+        plan.searches, plan.expanded = 1, self.expanded
+        plan.elapsed = time.perf_counter() - t0
+        if stats is not None:
+            stats.add(plan)
+        if not found:
+            return []
+
+        hops = [goal]
+        node = parent[GOAL]
+        while node != start:
+            hops.append(node)
+            node = parent[node]
+        hops.append(start)
+        hops.reverse()
+
+        path = [start]
+        for a, b in zip(hops, hops[1:]):
+            if self.cluster_of(a) != self.cluster_of(b):
+                path.append(b)
+                continue
+            r0, r1, c0, c1 = self.bounds(self.cluster_of(b))
+            astar = AStar(self.grid[r0:r1, c0:c1], kernel=kernel,
+                          max_expansions=None if stats is None else stats.remaining())
+            leg = astar.find_path((a[0] - r0, a[1] - c0), (b[0] - r0, b[1] - c0))
+            if stats is not None:
+                stats.add(astar.stats)
+            if not leg:
+                return []
+            path.extend((r + r0, c + c0) for r, c in leg[1:])
+        return path
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+symbol_cache.py -- rendered block and pin symbols, reused across frames
+
+Block.draw() and Pin.draw() rebuild the same outlines, gate beziers, dots
+and labels for every instance on every frame.  SymbolCache keeps each
+distinct appearance -- everything that changes the pixels relative to the
+element's origin, plus the device scale -- rendered once into an image
+surface, and later frames copy that image to the element's position.  The
+least recently used images are evicted once their total size passes
+max_bytes.
+"""
+import math
+from collections import OrderedDict
+import cairo
+
+# Budget for all cached symbol images, in bytes of pixel data
+MAX_BYTES = 64 << 20
+
+# Targets that keep vectors (SVG export, recordings): always drawn directly
+_VECTOR_SURFACES = tuple(getattr(cairo, name) for name in
+                         ("SVGSurface", "PDFSurface", "PSSurface", "RecordingSurface")
+                         if hasattr(cairo, name))
+
+
+class SymbolCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()    # key -> (image, canvas-px offset of its corner from the origin)
+
+    def __len__(self):
+        return len(self._images)
+
+    def clear(self):
+        self._images.clear()
+        self.nbytes = 0
+
+    def _render(self, key, origin, sx, sy, render):
+        # Record first: the recording's ink extents are exactly what render() paints
+        rec = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+        render(cairo.Context(rec))
+        ix, iy, iw, ih = rec.ink_extents()
+        # One device px of slack on each side for antialiasing
+        x0, y0 = math.floor(ix - 1 / sx), math.floor(iy - 1 / sy)
+        w = max(1, math.ceil((ix + iw + 1 / sx - x0) * sx))
+        h = max(1, math.ceil((iy + ih + 1 / sy - y0) * sy))
+        if w * h * 4 > self.max_bytes:
+            return None
+        image = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
+        cr = cairo.Context(image)
+        cr.scale(sx, sy)
+        cr.set_source_surface(rec, -x0, -y0)
+        cr.paint()
+        entry = (image, x0 - origin[0], y0 - origin[1])
+        self._images[key] = entry
+        self.nbytes += image.get_stride() * h
+        while self.nbytes > self.max_bytes:
+            old, _ = self._images.popitem(last=False)
+            self.nbytes -= old.get_stride() * old.get_height()
+        return entry
+
+    def paint(self, cr, key, origin, render):
+        """
+        Paint the symbol identified by key for an element whose origin is at
+        canvas (x, y), rendering it with render(cr) on a miss.  key must
+        cover everything that changes the drawing relative to origin.  A
+        rotated or skewed cr, or a vector target, is drawn into directly.
+        """
+        m = cr.get_matrix()
+        if m.xy or m.yx or isinstance(cr.get_target(), _VECTOR_SURFACES):
+            render(cr)
+            return
+        key = (key, m.xx, m.yy)
+        entry = self._images.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = self._render(key, origin, m.xx, m.yy, render)
+            if entry is None:
+                render(cr)
+                return
+        else:
+            self.hits += 1
+            self._images.move_to_end(key)
+        image, dx, dy = entry
+        # Paint at a whole device pixel so the image is copied, not resampled
+        x, y = cr.user_to_device(origin[0] + dx, origin[1] + dy)
+        cr.save()
+        cr.identity_matrix()
+        cr.set_source_surface(image, round(x), round(y))
+        cr.paint()
+        cr.restore()
+
+
+# Shared by every Block and Pin
+SYMBOLS = SymbolCache()
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """
-test_gui_adversarial.py -- 49 student-scenario adversarial tests for SVCG.
+test_gui_adversarial.py -- 76 student-scenario adversarial tests for SVCG.
 
 Covers: combinational/sequential circuits, VHDL content correctness,
 save/load fidelity, student-mistake edge cases, component library,
-testbench quality, export integrity, wire routing, Yosys import.
+testbench quality, export integrity, wire routing, Yosys import, canvas rendering.
 
 Usage:
     cd src
@@ -239,6 +239,34 @@ def _TC_IDS():
         "TC-47 Yosys unsupported cell warning no crash":         "TC-47",
         "TC-48 Yosys empty JSON returns gracefully":             "TC-48",
         "TC-49 Yosys multi-driver net no crash":                 "TC-49",
+        "TC-50 Flat A* kernel matches classic paths":            "TC-50",
+        "TC-51 Occupancy grid patches match full rebuild":       "TC-51",
+        "TC-52 Batch router matches single-wire routing":        "TC-52",
+        "TC-53 Negotiated routing removes net overlaps":         "TC-53",
+        "TC-54 Route cache hits on repeat, move and undo":       "TC-54",
+        "TC-55 JPS and bidirectional match A* cost":             "TC-55",
+        "TC-56 Steiner net routing shares branches":             "TC-56",
+        "TC-57 Background routing applies only the newest job":  "TC-57",
+        "TC-58 Window widening and component reachability":      "TC-58",
+        "TC-59 Compressed wire paths":                           "TC-59",
+        "TC-60 Hierarchical cluster-graph routing":              "TC-60",
+        "TC-61 Sparse occupancy for huge canvases":              "TC-61",
+        "TC-62 Expansion budgets and route stats":               "TC-62",
+        "TC-63 Endpoint nudges patch still-valid routes":        "TC-63",
+        "TC-64 Wire hit-testing through the segment index":      "TC-64",
+        "TC-65 Channel-routed Yosys import":                     "TC-65",
+        "TC-66 Bend-penalised routing kernel":                   "TC-66",
+        "TC-67 Table-driven block port geometry":                "TC-67",
+        "TC-68 Cached grid background":                          "TC-68",
+        "TC-69 Viewport-culled drawing":                         "TC-69",
+        "TC-70 Cached block and pin symbols":                    "TC-70",
+        "TC-71 Damage-region redraws":                           "TC-71",
+        "TC-72 Level-of-detail drawing":                         "TC-72",
+        "TC-73 Batched wire stroking":                           "TC-73",
+        "TC-74 Frame timing instrumentation":                    "TC-74",
+        "TC-75 Rotated saved block drags its wires":             "TC-75",
+        "TC-76 Failed background route falls back to Manhattan": "TC-76",
+        "TC-77 Oversized canvas_size preference":                "TC-77",
     }
 
 
@@ -803,6 +831,75 @@ def tg05_adversarial(win):
         assert len(win.redo_stack) == 0   # all redone
     run_test("TC-28 30 undo push/pop cycles consistent", t28)
 
+    # TC-67: Port tables reproduce the rotate_point ports saved projects hold, and follow the block
+    def t67():
+        import math
+        for bt in list(Block._WIRE_COUNTS) + ["CUSTOM"]:
+            b = Block(gs*7, gs*3, gs*3, gs*5, "PORTS", bt, gs, win)
+            if bt == "CUSTOM":
+                b.custom_data = {"input_names": ["a", "b", "c"], "output_names": ["y"]}
+                b.update_points()
+            start = b.input_points + b.output_points
+            assert start and len(b.input_names) == len(b.input_points), f"{bt}: no ports"
+            for turn in range(1, 5):
+                b.rotate(90)
+                cx, cy = b.x + b.width / 2, b.y + b.height / 2
+                a = math.radians(b.rotation)
+                for (px, py), (qx, qy) in zip(b.input_points + b.output_points, start):
+                    # Same expression as the original rotate_point: wires are matched to ports by ==
+                    ex = cx + (qx - cx) * math.cos(a) - (qy - cy) * math.sin(a)
+                    ey = cy + (qx - cx) * math.sin(a) + (qy - cy) * math.cos(a)
+                    assert (px, py) == (ex, ey), \
+                        f"{bt} at {b.rotation} deg: port ({px}, {py}), expected ({ex}, {ey})"
+            assert b.input_points + b.output_points == start, f"{bt}: four quarter turns moved the ports"
+            b.start_drag(gs*7, gs*3)
+            b.drag(gs*9 + 0.4, gs*3 + 0.6, 10**6, 10**6)
+            mid = b.input_points + b.output_points
+            b.end_drag()
+            assert b.input_points + b.output_points == [(x + gs*2, y) for x, y in start], \
+                f"{bt}: ports did not follow the dropped block"
+            assert all(abs(p[0] - q[0] - gs*2) <= 1 and abs(p[1] - q[1]) <= 1 for p, q in zip(mid, start)), \
+                f"{bt}: ports lag the block mid-drag"
+    run_test("TC-67 Table-driven block port geometry", t67)
+
+    # TC-75: A rotated block loaded from a saved project drags its wires along
+    def t75():
+        import json
+        from types import SimpleNamespace
+        from pins import Pin
+        reset(win)
+        rebuild_grid(win)
+        blk = Block(gs*2, gs*2, gs*4, gs*6, "ROT", "AND", gs, win)
+        src = Pin(gs*12, gs*12, gs*3, gs*2, "A", "input_pin", gs, 1, win)
+        blk.rotate(90)
+        win.blocks.append(blk)
+        win.pins.append(src)
+        connect_wire(win, src, 0, "pin", blk, 0, "input", "n_rot")
+        p = os.path.join(tempfile.mkdtemp(), "rotated.json")
+        win.save_to_json(p)
+        with open(p) as f:
+            saved = json.load(f)
+        # As in any project saved so far, the rotated port left cos/sin rounding in the wire end
+        (ex, ey) = saved_end = next(d["end_point"] for d in saved if d.get("start_point") is not None)
+        assert ex != round(ex) or ey != round(ey), f"expected a cos/sin-rounded endpoint, got {saved_end}"
+
+        win.load_from_json(p)
+        blk = win.blocks[0]
+        wire = win.wires[0]
+        blk.update_points()
+        assert tuple(wire.end_point) == blk.input_points[0], \
+            f"loaded port {blk.input_points[0]} no longer matches the saved wire end {wire.end_point}"
+        blk.start_drag(gs*4, gs*5)
+        blk.drag(gs*7, gs*5, 10**6, 10**6)
+        z = win.drawing_area.zoom
+        win.dragging_wire = False
+        win.on_button_release(win.drawing_area, SimpleNamespace(x=gs*7 * z, y=gs*5 * z))
+        assert blk.x == gs*5, f"block not dropped at x={gs*5}: {blk.x}"
+        assert list(wire.end_point) == list(blk.input_points[0]), \
+            f"wire end {wire.end_point} left behind by the dragged port {blk.input_points[0]}"
+        reset(win)
+    run_test("TC-75 Rotated saved block drags its wires", t75)
+
 
 # ---------------------------------------------------------------------------
 # TG-06 — Component library
@@ -1148,6 +1245,510 @@ def tg09_routing(win):
         assert not empty, f"{len(empty)} bus wires have empty/trivial paths"
     run_test("TC-45 20-wire bus pattern all non-empty", t45)
 
+    # TC-50: Flat A* kernel agrees with the classic kernel (pure function, no canvas)
+    def t50():
+        from astar import AStar
+        g = np.zeros((250, 250), dtype=int)
+        g[20:200, 120] = 1          # long wall with a gap at the bottom
+        g[60:64, 30:90] = 1
+        for start, goal in [((10, 10), (150, 200)), ((62, 10), (62, 100)), ((0, 0), (0, 0))]:
+            classic = AStar(g).find_path(start, goal)
+            flat    = AStar(g, kernel="flat").find_path(start, goal)
+            assert flat and classic, f"{start}->{goal}: classic={len(classic)} flat={len(flat)}"
+            assert flat[0] == start and flat[-1] == goal, f"Flat path endpoints wrong: {flat[0]}..{flat[-1]}"
+            assert len(flat) <= len(classic), \
+                f"Flat path longer than classic: {len(flat)} > {len(classic)}"
+            for a, b in zip(flat, flat[1:]):
+                assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"Non-unit step {a} -> {b}"
+                assert g[b] == 0, f"Flat path crosses obstacle at {b}"
+        walled = g.copy()
+        walled[100:110, 100] = walled[100:110, 110] = 1
+        walled[100, 100:111] = walled[110, 100:111] = 1
+        assert AStar(walled, kernel="flat").find_path((5, 5), (105, 105)) == [], \
+            "Flat kernel found a path into a sealed box"
+    run_test("TC-50 Flat A* kernel matches classic paths", t50)
+
+    # TC-51: Incremental occupancy grid stays identical to a full rebuild
+    reset(win)
+
+    def t51():
+        from drawing_area import DrawingArea
+        a = Block(gs*5, gs*5, gs*4, gs*4, "OCC_A", "AND", gs, win)
+        b = Block(gs*7, gs*6, gs*4, gs*4, "OCC_B", "OR",  gs, win)   # overlaps a
+        win.blocks.extend([a, b])
+        win.drawing_area.sync_grid()
+        occ = win.drawing_area.occupancy
+        v0, snap = win.drawing_area.routing_snapshot()
+        snap_copy = snap.copy()
+        b.x, b.y = gs*30, gs*30                      # move b away
+        win.blocks.remove(a)                         # delete a
+        win.drawing_area.sync_grid()
+        assert occ.version > v0, "Grid version did not advance after edits"
+        assert (snap == snap_copy).all(), "Routing snapshot was mutated by a later patch"
+        patched = win.drawing_area.grid.copy()
+        rebuild_grid(win)
+        assert (patched > 0).tolist() == (win.drawing_area.grid > 0).tolist(), \
+            "Patched occupancy grid differs from a full rebuild"
+        v1 = win.drawing_area.occupancy.version
+        win.drawing_area.sync_grid()
+        assert win.drawing_area.occupancy.version == v1, "Sync without edits bumped the version"
+    run_test("TC-51 Occupancy grid patches match full rebuild", t51)
+
+    # TC-52: Process-pool batch routing returns the same paths as routing one by one
+    def t52():
+        from routing import route_batch, route_cells, PARALLEL_MIN
+        g = np.zeros((250, 250), dtype=int)
+        g[40:200, 100] = 1
+        g[120, 20:180] = 1
+        jobs = [((5 + i, 10), (200 - i, 150 + (i % 40))) for i in range(PARALLEL_MIN + 16)]
+        seen = []
+        paths = route_batch(g, jobs, progress=lambda done, total: seen.append((done, total)), workers=2)
+        assert len(paths) == len(jobs), f"Expected {len(jobs)} paths, got {len(paths)}"
+        for (s, e), path in zip(jobs, paths):
+            assert path == route_cells(g, s, e), f"Batch path differs for {s}->{e}"
+        assert seen and seen[-1] == (len(jobs), len(jobs)), f"Progress did not reach total: {seen[-1:]}"
+    run_test("TC-52 Batch router matches single-wire routing", t52)
+
+    # TC-53: Negotiated-congestion routing separates a bus squeezed through a gap
+    def t53():
+        from routing import route_negotiated, route_cells, manhattan_cells, _track_usage
+        g = np.zeros((250, 250), dtype=int)
+        g[:, 100] = 1
+        g[80:160, 100] = 0                            # 80-cell gap in a full-height wall
+        jobs = [((60 + i, 10), (100 + i, 200)) for i in range(40)]
+
+        def shared(paths):
+            owners = {}
+            for (start, _), path in zip(jobs, paths):
+                for t in _track_usage(path):
+                    owners.setdefault(t, set()).add(start)
+            return sum(len(o) > 1 for o in owners.values())
+        assert shared([route_cells(g, s, e) for s, e in jobs]) > 0, \
+            "Independent routing already overlap-free; scenario too easy"
+        paths, overflow = route_negotiated(g, jobs, time_budget=20.0)
+        assert overflow == 0 and shared(paths) == 0, f"{shared(paths)} tracks still shared"
+        for (s, e), path in zip(jobs, paths):
+            assert path[0] == s and path[-1] == e, f"Negotiated path endpoints wrong for {s}->{e}"
+            for a, b in zip(path, path[1:]):
+                assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"Non-unit step {a} -> {b}"
+                assert g[b] == 0, f"Negotiated path crosses obstacle at {b}"
+        # Out of time before the first pass ends: the rest take Manhattan routes instead of searching
+        paths, _ = route_negotiated(g, jobs, time_budget=0.0)
+        assert paths == [manhattan_cells(s, e) for s, e in jobs], "Expired deadline still searched"
+        # A sealed goal spends its expansion budget in the window and on the full grid, then falls back
+        sealed = g.copy()
+        sealed[199:202, 199:202] = 1
+        sealed[200, 200] = 0
+        searched = []
+        from astar import AStar
+        find_path = AStar.find_path
+        AStar.find_path = lambda self, *a: searched.append(self) or find_path(self, *a)
+        try:
+            paths, _ = route_negotiated(sealed, [((60, 10), (200, 200))], max_expansions=500)
+        finally:
+            AStar.find_path = find_path
+        assert paths == [manhattan_cells((60, 10), (200, 200))], "Sealed goal did not fall back"
+        assert len(searched) == 2 and all(a.stats.expanded <= 500 for a in searched), \
+            f"Searches expanded {[a.stats.expanded for a in searched]} of a 500-node budget"
+    run_test("TC-53 Negotiated routing removes net overlaps", t53)
+
+    # TC-54: Route memo serves repeated routes, translated layouts and undo rebuilds
+    reset(win)
+    rebuild_grid(win)
+
+    def t54():
+        from routing import clear_route_cache, route_cache_info
+        clear_route_cache()
+        w1 = Wire("memo", [gs*60, gs*60], [gs*80, gs*70], "wire", gs, win)
+        misses = route_cache_info()["misses"]
+        w2 = Wire("memo2", [gs*60, gs*60], [gs*80, gs*70], "wire", gs, win)
+        assert route_cache_info()["hits"] >= 1, "Identical route did not hit the cache"
+        assert w2.path == w1.path, "Cached path differs from the routed one"
+        w2.update_start_point([gs*100, gs*100])
+        w2.update_end_point([gs*120, gs*110])       # same empty neighbourhood, shifted
+        assert route_cache_info()["misses"] == misses + 1, \
+            "Translated route in an identical region missed the cache"
+        assert w2.path[0] == (100, 100) and w2.path[-1] == (120, 110), \
+            f"Translated cached path has wrong endpoints: {w2.path[0]}..{w2.path[-1]}"
+        before = route_cache_info()
+        w3 = Wire.from_dict(w1.to_dict(), win)
+        after = route_cache_info()
+        assert (after["hits"], after["misses"]) == (before["hits"], before["misses"]), \
+            "Wire.from_dict re-routed instead of restoring the saved path"
+        assert w3.path == w1.path, "Wire.from_dict did not restore the saved path"
+    run_test("TC-54 Route cache hits on repeat, move and undo", t54)
+
+    # TC-55: JPS / bidirectional give A*-cost paths with far fewer expansions
+    def t55():
+        from astar import AStar
+        g = np.zeros((250, 250), dtype=int)
+        g[20:240, 125] = 1                          # long wall forcing a detour
+        g[60:70, 40:90] = 1
+        runs = {}
+        for algorithm in ("astar", "jps", "bidirectional"):
+            search = AStar(g, kernel="flat", algorithm=algorithm)
+            runs[algorithm] = (search.find_path((100, 5), (100, 245)), search.expanded)
+        ref_path, ref_expanded = runs["astar"]
+        for algorithm, (path, expanded) in runs.items():
+            assert len(path) == len(ref_path), \
+                f"{algorithm} path cost {len(path) - 1} != A* cost {len(ref_path) - 1}"
+            assert path[0] == (100, 5) and path[-1] == (100, 245), f"{algorithm} endpoints wrong"
+            for a, b in zip(path, path[1:]):
+                assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"{algorithm}: non-unit step {a} -> {b}"
+                assert g[b] == 0, f"{algorithm} path crosses obstacle at {b}"
+        assert runs["jps"][1] * 10 <= ref_expanded, \
+            f"JPS expanded {runs['jps'][1]} nodes vs A* {ref_expanded}"
+        # Open grid: the jump tables carry each scan to the border or the goal's row and column
+        jps = AStar(np.zeros((250, 250), dtype=int), algorithm="jps")
+        for s, e in (((0, 0), (249, 249)), ((125, 0), (125, 249)), ((10, 200), (240, 30))):
+            path = jps.find_path(s, e)
+            assert len(path) == abs(s[0] - e[0]) + abs(s[1] - e[1]) + 1 and path[0] == s and path[-1] == e, \
+                f"JPS path {s}->{e} is not shortest"
+            assert jps.expanded <= 2, f"JPS expanded {jps.expanded} jump points on an open grid"
+        sealed = g.copy()
+        sealed[150:160, 150] = sealed[150:160, 160] = 1
+        sealed[150, 150:161] = sealed[160, 150:161] = 1
+        flat, bidi = AStar(sealed, kernel="flat"), AStar(sealed, algorithm="bidirectional")
+        assert flat.find_path((5, 5), (155, 155)) == [] and bidi.find_path((5, 5), (155, 155)) == [], \
+            "Found a path into a sealed box"
+        assert bidi.expanded * 10 <= flat.expanded, \
+            f"Bidirectional expanded {bidi.expanded} nodes vs A* {flat.expanded} on a sealed goal"
+    run_test("TC-55 JPS and bidirectional match A* cost", t55)
+
+    # TC-56: A fanout-20 net routed as one Steiner tree of shared branches
+    def t56():
+        from routing import route_net, route_cells
+        g = np.zeros((250, 250), dtype=int)
+        for c in range(0, 240, 30):
+            g[20:230, c + 10:c + 14] = 1            # columns of cells, as after a Yosys import
+        src = (50, 5)
+        sinks = [k for k in ((60 + (i * 37) % 150, 40 + (i * 53) % 190) for i in range(20)) if g[k] == 0]
+        branches = route_net(g, src, sinks)
+        assert len(branches) == len(sinks), f"Expected {len(sinks)} branches, got {len(branches)}"
+        tree = {src}
+        for _, path in branches:
+            tree.update(path)
+        for (tap, path), sink in zip(branches, sinks):
+            assert path[0] == tap and path[-1] == sink, f"Branch {tap}..{path[-1]} does not reach {sink}"
+            assert tap in tree, f"Branch tap {tap} is not on the net's tree"
+            for a, b in zip(path, path[1:]):
+                assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"Non-unit step {a} -> {b}"
+                assert g[b] == 0, f"Branch crosses obstacle at {b}"
+        independent = sum(len(route_cells(g, src, k)) for k in sinks)
+        steiner = sum(len(path) for _, path in branches)
+        assert steiner * 2 <= independent, \
+            f"Steiner tree stores {steiner} path cells vs {independent} for per-sink routes"
+    run_test("TC-56 Steiner net routing shares branches", t56)
+
+    # TC-57: Background route worker drops superseded jobs and applies via idle
+    reset(win)
+    rebuild_grid(win)
+
+    def t57():
+        import time
+        w = Wire("bg", [gs*10, gs*10], [gs*20, gs*12], "wire", gs, win)
+        win.wires.append(w)
+        for k in range(5):                          # user keeps dragging the far end
+            w.update_end_point([gs*(30 + k), gs*(20 + k)], background=True)
+        assert w.route_pending, "Background reroute did not enter preview state"
+        deadline = time.time() + 10
+        while win.route_worker.busy() and time.time() < deadline:
+            while Gtk.events_pending():
+                Gtk.main_iteration_do(False)
+            time.sleep(0.01)
+        assert not w.route_pending, "Background route never arrived"
+        assert w.path[0] == (10, 10) and w.path[-1] == (34, 24), \
+            f"Applied path {w.path[0]}..{w.path[-1]} is not the newest job's"
+        w.update_end_point([gs*50, gs*40], background=True)
+        w.update_end_point([gs*25, gs*15])           # synchronous edit cancels the queued job
+        assert not win.route_worker.busy(), "Synchronous reroute did not cancel the background job"
+        while Gtk.events_pending():
+            Gtk.main_iteration_do(False)
+        assert w.path[-1] == (25, 15), f"Stale background path overwrote the edit: {w.path[-1]}"
+    run_test("TC-57 Background routing applies only the newest job", t57)
+
+    # TC-76: A background route that raises still ends the wire's preview
+    def t76():
+        import time
+        import route_worker
+        from routing import manhattan_cells
+
+        def failing_route_cells(*args, **kwargs):
+            raise RuntimeError("injected routing failure")
+
+        w = Wire("bg_fail", [gs*10, gs*10], [gs*20, gs*12], "wire", gs, win)
+        win.wires.append(w)
+        real = route_worker.route_cells
+        route_worker.route_cells = failing_route_cells
+        try:
+            w.update_end_point([gs*24, gs*18], background=True)
+            assert w.route_pending, "Background reroute did not enter preview state"
+            deadline = time.time() + 10
+            while win.route_worker.busy() and time.time() < deadline:
+                while Gtk.events_pending():
+                    Gtk.main_iteration_do(False)
+                time.sleep(0.01)
+        finally:
+            route_worker.route_cells = real
+        assert not win.route_worker.busy(), "Failed route left the worker busy"
+        assert not w.route_pending, "Failed route left the wire in preview"
+        assert w.path == manhattan_cells((10, 10), (24, 18)), \
+            f"Failed route did not fall back to the Manhattan path: {w.path[0]}..{w.path[-1]}"
+        w.update_end_point([gs*25, gs*15])
+        assert w.path[-1] == (25, 15), "Wire no longer reroutes after a failed background route"
+    run_test("TC-76 Failed background route falls back to Manhattan", t76)
+
+    # TC-58: Widening windows find mid-range detours; walled-off pairs skip A*
+    def t58():
+        from routing import route_cells, route_cache_info, clear_route_cache
+        from routing_grid import label_components
+        from astar import AStar
+        g = np.zeros((250, 250), dtype=int)
+        g[60:141, 105] = 1                          # wall too long for the first window
+        g[180:200, 180] = g[180:200, 200] = 1       # sealed box
+        g[180, 180:201] = g[200, 180:201] = 1
+        labels = label_components(g)
+        assert labels[g == 1].max() == 0, "Blocked cells must be labelled 0"
+        assert labels[0, 0] == labels[249, 249] == labels[100, 100] == labels[100, 110] != 0, \
+            "Open cells on either side of the wall are in different components"
+        assert labels[190, 190] not in (0, labels[0, 0]), "Sealed box shares a component with the outside"
+        clear_route_cache()
+        path = route_cells(g, (100, 100), (100, 110), labels=labels)
+        best = AStar(g, kernel="flat").find_path((100, 100), (100, 110))
+        assert path[0] == (100, 100) and path[-1] == (100, 110), f"Bad endpoints {path[0]}..{path[-1]}"
+        assert len(path) == len(best), f"Widened route has {len(path)} cells, shortest has {len(best)}"
+        assert all(g[c] == 0 for c in path), "Widened route crosses the wall"
+        misses = route_cache_info()["misses"]
+        path = route_cells(g, (150, 150), (190, 190), labels=labels)
+        assert route_cache_info()["misses"] == misses, "Walled-off pair still ran an A* search"
+        assert path[0] == (150, 150) and path[-1] == (190, 190), "Walled-off pair did not fall back to Manhattan"
+    run_test("TC-58 Window widening and component reachability", t58)
+
+    # TC-59: Wires keep only bend points; cells, hit-tests and saves agree
+    def t59():
+        import json
+        w = Wire("corners", [gs*10, gs*10], [gs*120, gs*90], "wire", gs, win)
+        cells = w.path
+        assert len(w.corners) <= 4 < len(cells), \
+            f"Expected a few bend points for {len(cells)} cells, got {len(w.corners)}"
+        assert w.path_length() == len(cells), "path_length() disagrees with the cell path"
+        assert [w.path_cell(i) for i in range(len(cells))] == cells, "path_cell() disagrees with the cell path"
+        for cx, cy in cells[::7]:
+            assert w.contains_point(cx * gs + 5, cy * gs), f"Hit-test misses cell ({cx},{cy})"
+        assert not w.contains_point(gs * 200, gs * 5), "Hit-test accepts a far point"
+        saved = w.to_dict()
+        per_cell = dict(saved, path=[list(c) for c in cells])
+        assert len(json.dumps(saved)) * 3 < len(json.dumps(per_cell)), "Saved wire is not smaller than the cell list"
+        for d in (saved, per_cell):                 # new files and older per-cell files
+            assert Wire.from_dict(json.loads(json.dumps(d)), win).path == cells, "Reloaded path differs"
+    run_test("TC-59 Compressed wire paths", t59)
+
+    # TC-60: Cluster graph plans long detours and patches only moved clusters
+    def t60():
+        from routing_hpa import ClusterGraph
+        from astar import AStar
+        g = np.zeros((250, 250), dtype=int)
+        g[20:230, 125] = 1                          # long wall between the endpoints
+        for r in range(30, 220, 40):
+            g[r:r + 8, 40:60] = g[r + 20:r + 28, 180:200] = 1
+        graph = ClusterGraph(g)
+        src, dst = (125, 10), (125, 240)
+        path = graph.find_path(src, dst)
+        best = AStar(g, kernel="flat").find_path(src, dst)
+        assert path[0] == src and path[-1] == dst, f"Bad endpoints {path[0]}..{path[-1]}"
+        for a, b in zip(path, path[1:]):
+            assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"Non-unit step {a} -> {b}"
+            assert g[b] == 0, f"Planned path crosses obstacle at {b}"
+        assert len(path) <= len(best) * 1.1, f"Planned path {len(path)} cells vs shortest {len(best)}"
+        clusters = list(np.ndindex(*graph.shape))
+        for k in clusters:                          # build every cluster before patching
+            graph.edges(k)
+        g2 = g.copy()
+        g2[100:110, 130:140] = 1                    # a block moves into place
+        graph.update(g2, [(100, 110, 130, 140)])
+        fresh = ClusterGraph(g2)
+        for k in clusters:
+            assert graph.edges(k) == fresh.edges(k), f"Patched cluster {k} differs from a rebuild"
+            for cell in graph.edges(k):
+                assert sorted(graph.across(cell)) == sorted(fresh.across(cell)), \
+                    f"Patched border transitions at {cell} differ from a rebuild"
+        sealed = g2.copy()
+        sealed[200:205, 200] = sealed[200:205, 204] = sealed[200, 200:205] = sealed[204, 200:205] = 1
+        assert ClusterGraph(sealed).find_path(src, (202, 202)) == [], "Path into a sealed box"
+    run_test("TC-60 Hierarchical cluster-graph routing", t60)
+
+    # TC-61: 100k x 100k px canvas keeps a sparse occupancy grid and still routes
+    def t61():
+        from routing_grid import OccupancyGrid
+        from routing import route_cells
+        occ = OccupancyGrid(100000, 100000, gs)
+        assert occ.sparse, "Huge canvas did not switch to the sparse grid"
+        blks = [Block(gs*(100 + 400*i), gs*(3000 + 37*i), gs*6, gs*40, f"BIG_{i}", "AND", gs, win)
+                for i in range(10)]
+        occ.sync(blks, [])
+        dense_bytes = occ.grid.shape[0] * occ.grid.shape[1] * np.dtype(int).itemsize
+        assert occ.grid.nbytes * 1000 < dense_bytes, f"Sparse grid uses {occ.grid.nbytes} bytes"
+        y1, y2, x1, x2 = occ.cell_rect(blks[0])
+        assert (occ.grid[y1:y2, x1:x2] > 0).all(), "Block footprint not marked"
+        assert occ.grid[y1 - 1, x1] == 0 and occ.grid[y2, x2] == 0, "Cells around the block are marked"
+        v0, snap = occ.snapshot()
+        blks[0].x += gs*50
+        occ.sync(blks, [])
+        assert occ.version > v0 and snap[y1, x1] > 0 and occ.grid[y1, x1] == 0, \
+            "Moving a block changed the snapshot or left the old footprint marked"
+        _, grid = occ.snapshot()
+        y1, y2, x1, x2 = occ.cell_rect(blks[1])
+        start, end = (y1 + 10, x1 - 3), (y1 + 10, x2 + 3)
+        path = route_cells(grid, start, end, labels=occ.components(), graph=occ.hierarchy())
+        assert path[0] == start and path[-1] == end, f"Bad endpoints {path[0]}..{path[-1]}"
+        assert all(grid[c] == 0 for c in path), "Route on the sparse grid crosses a block"
+    run_test("TC-61 Sparse occupancy for huge canvases", t61)
+
+    # TC-62: Expansion budgets stop searches at the same node count every run
+    def t62():
+        from astar import AStar, SearchStats
+        from routing import route_cells, route_batch, clear_route_cache
+        g = np.zeros((200, 200), dtype=int)
+        g[10:190, 100] = 1                          # wall forces a long detour
+        src, dst = (100, 20), (100, 180)
+        for algorithm in ("astar", "bidirectional"):
+            full = AStar(g, kernel="flat", algorithm=algorithm)
+            assert full.find_path(src, dst), f"{algorithm}: no path without a budget"
+            st = full.stats
+            assert st.expanded > 500 and st.pushes >= st.expanded and not st.budget_hit and st.elapsed > 0, \
+                f"{algorithm}: bad stats {st}"
+            for _ in range(2):
+                cut = AStar(g, kernel="flat", algorithm=algorithm, max_expansions=300)
+                assert cut.find_path(src, dst) == [], f"{algorithm}: path found past the budget"
+                assert cut.stats.budget_hit and cut.stats.expanded == 300, f"{algorithm}: stopped at {cut.stats}"
+        clear_route_cache()
+        shared = SearchStats(max_expansions=400)
+        path = route_cells(g, src, dst, stats=shared)
+        assert shared.budget_hit and shared.expanded <= 400, f"Shared budget overrun: {shared}"
+        assert path[0] == src and path[-1] == dst, "Budgeted route lost its endpoints"
+        assert route_cells(g, (5, 5), (5, 8), stats=shared) == [(5, 5), (5, 6), (5, 7), (5, 8)], \
+            "Spent budget did not fall back to Manhattan"
+        open_stats = SearchStats()
+        path = route_cells(g, src, dst, stats=open_stats)
+        assert all(g[c] == 0 for c in path) and not open_stats.budget_hit, \
+            "A budget-truncated result was memoised"
+        assert open_stats.searches >= 1 and open_stats.expanded > 400, f"Unbudgeted stats {open_stats}"
+        clear_route_cache()
+        per_route = []
+        route_batch(g, [(src, dst), ((5, 5), (5, 30))], workers=1, max_expansions=300, stats=per_route)
+        assert [s.budget_hit for s in per_route] == [True, False], f"Per-route budgets {per_route}"
+    run_test("TC-62 Expansion budgets and route stats", t62)
+
+    # TC-63: Small endpoint moves patch a clear route; blocked ones search again
+    reset(win)
+    rebuild_grid(win)
+
+    def t63():
+        from routing import route_cells, patch_endpoint, path_is_clear, route_cache_info
+        from routing_grid import TileGrid
+        g = np.zeros((250, 250), dtype=int)
+        g[40:60, 70] = 1
+        path = route_cells(g, (50, 50), (50, 90))
+        moved = patch_endpoint(g, path, (53, 92))
+        assert moved[0] == (50, 50) and moved[-1] == (53, 92), f"Patched ends {moved[0]}..{moved[-1]}"
+        assert moved[:len(path) - 3] == path[:len(path) - 3], "Patch rewrote the route away from the moved end"
+        for a, b in zip(moved, moved[1:]):
+            assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"Non-unit step {a} -> {b}"
+        assert len(set(moved)) == len(moved), "Patched route loops back on itself"
+        back = patch_endpoint(g, path, (50, 84))     # end slides back along its own route
+        assert back == path[:path.index((50, 84)) + 1], "Backtracking stub left a loop"
+        assert patch_endpoint(g, path, (50, 50 + 90 + 20)) is None, "Long move was patched"
+        g2 = g.copy()
+        g2[path[len(path) // 2]] = 1                 # a block lands on the route
+        assert not path_is_clear(g2, path) and patch_endpoint(g2, path, (51, 90)) is None, \
+            "Blocked route accepted as valid"
+        tiles = TileGrid(g2.shape)
+        tiles.add((0, 250, 70, 71), 1)
+        rows, cols = np.array([10, 10, 200]), np.array([70, 71, 70])
+        assert tiles.gather(rows, cols).tolist() == [1, 0, 1], "TileGrid.gather disagrees with its counts"
+        w = Wire("nudge", [gs*20, gs*20], [gs*40, gs*30], "wire", gs, win)
+        misses = route_cache_info()["misses"]
+        w.update_end_point([gs*42, gs*31], background=True)
+        assert not w.route_pending and w.path[-1] == (42, 31), "Nudge was not patched in place"
+        assert route_cache_info()["misses"] == misses and w.route_stats.searches == 0, \
+            "Patching an endpoint ran A*"
+    run_test("TC-63 Endpoint nudges patch still-valid routes", t63)
+
+    # TC-64: Clicks resolve wires through the segment index, matching a full scan
+    reset(win)
+    rebuild_grid(win)
+
+    def t64():
+        import random
+        rng = random.Random(64)
+        for k in range(1000):
+            x, y = rng.randrange(5, 240), rng.randrange(5, 240)
+            x2, y2 = min(245, x + rng.randrange(1, 20)), min(245, y + rng.randrange(1, 20))
+            win.wires.append(Wire(f"idx{k}", [gs*x, gs*y], [gs*x2, gs*y2], "wire", gs, win,
+                                  path=[(x, y), (x2, y), (x2, y2)]))
+        clicks = [(rng.randrange(5000), rng.randrange(5000)) for _ in range(20)]
+        clicks += [(w.start_point[0] + 7, w.start_point[1]) for w in rng.sample(win.wires, 20)]
+        index = win.drawing_area.wire_index
+        tested = index.tested
+        found = [win.drawing_area.wire_at(x, y) for x, y in clicks]
+        per_click = (index.tested - tested) / len(clicks)
+        segments = sum(len(w.corners) - 1 for w in win.wires)
+        for (x, y), w in zip(clicks, found):
+            linear = [v for v in win.wires if v.contains_point(x, y)]
+            assert w is (linear[0] if linear else None), f"Index and full scan disagree at ({x}, {y})"
+        assert sum(w is not None for w in found) >= 20, "Clicks on wire starts missed"
+        assert per_click * 50 <= segments, f"Clicks measured {per_click:.1f} of {segments} segments each"
+        w = win.wires[0]
+        old = w.path[1]
+        w.path = [(2, 2), (2, 3)]                   # re-routed wires re-index themselves
+        assert win.drawing_area.wire_at(gs*2 + 3, gs*2 + 10) is w, "Moved wire not found at its new route"
+        assert win.drawing_area.wire_at(gs*old[0], gs*old[1]) is not w, "Moved wire still found on its old route"
+        win.delete_wire(w)
+        assert win.drawing_area.wire_at(gs*2 + 3, gs*2 + 10) is None, "Deleted wire still hit"
+        tmp = Wire("preview", [gs*2, gs*2], [gs*2, gs*3], "wire", gs, win, path=[(2, 2), (2, 3)])
+        tmp.path = [(2, 2), (2, 4)]
+        assert tmp not in win.drawing_area.wire_index and win.drawing_area.wire_at(gs*2 + 3, gs*2 + 10) is None, \
+            "Wire off the canvas was indexed"
+    run_test("TC-64 Wire hit-testing through the segment index", t64)
+
+    # TC-66: The bend-penalised kernel keeps lengths but cuts corners
+    def t66():
+        import random
+        from astar import AStar
+        from routing import route_cells, route_net, path_corners, clear_route_cache
+        rng = random.Random(66)
+        flat_segs = bend_segs = 0
+        for _ in range(10):
+            g = np.zeros((60, 60), dtype=int)
+            for _ in range(25):
+                r, c = rng.randrange(55), rng.randrange(55)
+                g[r:r + rng.randrange(1, 6), c:c + rng.randrange(1, 6)] = 1
+            src, dst = (rng.randrange(60), rng.randrange(60)), (rng.randrange(60), rng.randrange(60))
+            g[src] = g[dst] = 0
+            flat = AStar(g, kernel="flat").find_path(src, dst)
+            if not flat:
+                continue
+            bends = AStar(g, kernel="bends").find_path(src, dst)
+            free = AStar(g, kernel="bends", bend_cost=0).find_path(src, dst)
+            assert len(bends) == len(free) == len(flat), \
+                f"Lengths differ: flat {len(flat)}, bends {len(bends)}, bend_cost=0 {len(free)}"
+            assert bends[0] == src and bends[-1] == dst and all(g[c] == 0 for c in bends), "Invalid bends path"
+            for a, b in zip(bends, bends[1:]):
+                assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"Non-unit step {a} -> {b}"
+            flat_segs += len(path_corners(flat)) - 1
+            bend_segs += len(path_corners(bends)) - 1
+        assert bend_segs < flat_segs, f"Bends kernel gave {bend_segs} segments, flat {flat_segs}"
+        open_grid = np.zeros((40, 40), dtype=int)
+        assert len(path_corners(AStar(open_grid, kernel="bends").find_path((2, 3), (30, 35)))) == 3, \
+            "Open-grid route is not a single L"
+        clear_route_cache()
+        path = route_cells(open_grid, (5, 5), (20, 30), kernel="bends")
+        assert len(path) == 41 and len(path_corners(path)) == 3, "route_cells ignored the bends kernel"
+        net = route_net(open_grid, (5, 5), [(20, 30), (25, 10)], kernel="bends")
+        for tap, branch in net:
+            assert branch[0] == tap and len(path_corners(branch)) <= 3, f"Branch from {tap} has extra bends"
+    run_test("TC-66 Bend-penalised routing kernel", t66)
+
 
 # ---------------------------------------------------------------------------
 # TG-10 — Yosys import
@@ -1268,6 +1869,571 @@ def tg10_yosys(win):
         assert ok49, "import_yosys_json crashed on multi-driver net"
     run_test("TC-49 Yosys multi-driver net no crash", t49)
 
+    # TC-65: Channel-routed import keeps wires off blocks and apart from other nets
+    reset(win)
+    import random
+    gs = win.grid_size
+    rng = random.Random(65)
+    bits, cells65 = list(range(2, 10)), {}
+    for lvl in range(8):
+        made = []
+        for _ in range(75):
+            a, b, s = rng.choice(bits), rng.choice(bits), rng.choice(bits)
+            y = 10 + len(cells65)
+            cells65[f"g{y}"] = rng.choice([
+                {"type": "$_AND_", "connections": {"A": [a], "B": [b], "Y": [y]}},
+                {"type": "$_NOT_", "connections": {"A": [a], "Y": [y]}},
+                {"type": "$_MUX_", "connections": {"A": [a], "B": [b], "S": [s], "Y": [y]}},
+                {"type": "$_DFF_P_", "connections": {"D": [a], "C": [b], "Q": [y]}}])
+            made.append(y)
+        bits = made + rng.sample(bits, min(len(bits), 20))
+    ports65 = {f"i{k}": {"direction": "input", "bits": [2 + k]} for k in range(8)}
+    ports65["o"] = {"direction": "output", "bits": [bits[0]]}
+    p65 = write_yosys({"modules": {"top": {"cells": cells65, "ports": ports65, "netnames": {}}}})
+    _, n65, _ = import_yosys_json(p65, win, router="channel")
+    os.unlink(p65)
+
+    def t65():
+        from routing import manhattan_cells
+        import routing_channel
+        from routing_channel import route_channels, left_edge
+        blocked, pin_cells = set(), set()
+        for obj in win.blocks + win.pins:
+            x1, y1 = int(obj.x // gs), int(obj.y // gs)
+            x2, y2 = int((obj.x + obj.width) // gs), int((obj.y + obj.height) // gs)
+            blocked.update((x, y) for x in range(x1, x2) for y in range(y1, y2))
+            pts = obj.connection_points if hasattr(obj, "connection_points") else obj.input_points + obj.output_points
+            pin_cells.update((int(x / gs), int(y / gs)) for x, y in pts)
+        # Wires the channels could not take were handed to Wire.route_all()
+        channelled = [w for w in win.wires if w.grid_version is None]
+        assert len(channelled) >= 0.98 * n65, f"Only {len(channelled)}/{n65} wires channel-routed"
+        owner = {}
+        for w in channelled:
+            path = w.path
+            start, end = w.endpoint_cells()
+            assert path[-1] == end and (w.junction or path[0] == start), f"{w.text}: bad ends {path[0]}..{path[-1]}"
+            for a, b in zip(path, path[1:]):
+                assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"{w.text}: non-unit step {a} -> {b}"
+                seg = (min(a, b), max(a, b))
+                assert owner.setdefault(seg, start) == start, f"{w.text}: runs along another net at {seg}"
+            inner = set(path[1:-1]) - {path[0]}
+            assert not inner & blocked and not inner & pin_cells, f"{w.text}: crosses a block or pin"
+        # The rest are routed once the imported blocks and pins are on the occupancy grid
+        version, grid = win.drawing_area.routing_snapshot()
+        for w in win.wires:
+            if w.grid_version is None:
+                continue
+            assert w.grid_version == version, f"{w.text}: routed before the imported cells were on the grid"
+            if w.path != manhattan_cells(*w.endpoint_cells()):
+                assert all(grid[c] == 0 for c in w.path[1:-1]), f"{w.text}: fallback route crosses an imported cell"
+
+        # 10k gates in 20 columns, driven mostly from the previous column
+        rng = random.Random(650)
+        ncols, nrows = 20, 500
+        conns = [(c - 1 if rng.random() < 0.8 else rng.randrange(c), rng.randrange(nrows), c, r, side)
+                 for c in range(1, ncols) for r in range(nrows) for side in (0, 1)]
+        spans = [{} for _ in range(ncols)]
+        for sc, sr, dc, dr, _ in conns:
+            span = spans[dc - 1].setdefault((sc, sr), [10 * sr + 7, 10 * sr + 7])
+            span[0], span[1] = min(span[0], 10 * dr + 3), max(span[1], 10 * dr + 3)
+        xs, channels = [3], []
+        for c in range(ncols):
+            _, need = left_edge([(a - 1, b + 1) for a, b in spans[c].values()])
+            channels.append((xs[c] + 5, xs[c] + 8 + need))
+            xs.append(xs[c] + 10 + need)
+        rects = [(10 * r + 3, 10 * r + 7, xs[c], xs[c] + 4) for c in range(ncols) for r in range(nrows)]
+        points = [p for c in range(ncols) for r in range(nrows)
+                  for p in ((xs[c], 10 * r + 3), (xs[c] + 4, 10 * r + 3), (xs[c] + 2, 10 * r + 7))]
+        nets = {}
+        for sc, sr, dc, dr, side in conns:
+            nets.setdefault((xs[sc] + 2, 10 * sr + 7), []).append((xs[dc] + 4 * side, 10 * dr + 3))
+        # Count the obstacle lookups: the routing work per connection
+        lookups = [0]
+        real = {name: getattr(routing_channel._Obstacles, name) for name in ("row_clear", "col_clear")}
+        for name, fn in real.items():
+            def counted(self, *args, _fn=fn):
+                lookups[0] += 1
+                return _fn(self, *args)
+            setattr(routing_channel._Obstacles, name, counted)
+        try:
+            routes = route_channels(rects, points, list(nets.items()), channels)
+        finally:
+            for name, fn in real.items():
+                setattr(routing_channel._Obstacles, name, fn)
+        done = [b for branches in routes for b in branches if b is not None]
+        assert len(done) >= 0.98 * len(conns), f"Only {len(done)}/{len(conns)} connections channel-routed"
+        assert lookups[0] <= 8 * len(conns), \
+            f"Channel routing 10k gates took {lookups[0] / len(conns):.1f} obstacle lookups per connection"
+    run_test("TC-65 Channel-routed Yosys import", t65)
+
+
+# ---------------------------------------------------------------------------
+# TG-11 — Canvas rendering
+# ---------------------------------------------------------------------------
+
+def tg11_rendering(win):
+    gs = win.grid_size
+    print("\n-- TG-11: Canvas Rendering --")
+
+    def pixels(surface):
+        surface.flush()
+        h, stride = surface.get_height(), surface.get_stride()
+        return np.frombuffer(surface.get_data(), dtype=np.uint8).reshape(h, stride // 4, 4)
+
+    # TC-68: Grid dots and labels come from a cache keyed by grid size, zoom and theme
+    reset(win)
+
+    def t68():
+        bg = win.drawing_area.background
+        dark = win.dark_mode
+        try:
+            win.dark_mode = False
+            surface = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 600, 600)
+            win.on_draw(win.drawing_area, _cairo.Context(surface))
+            layers = bg._layers
+            assert bg.key == (5000, 5000, gs, win.drawing_area.zoom, False), f"Cache key {bg.key}"
+            px = pixels(surface)
+            assert px[10 * gs, 10 * gs, :3].tolist() == [0, 255, 0], "No grid dot on a grid point"
+            assert px[10 * gs + gs // 2, 10 * gs + gs // 2, :3].tolist() == [255, 255, 255], "Light background"
+            assert (px[:20, 50:500, :3] < 100).all(axis=2).any(), "No column labels along the top"
+            assert (px[50:500, :40, :3] < 100).all(axis=2).any(), "No row numbers down the left"
+            win.on_draw(win.drawing_area, _cairo.Context(surface))
+            assert bg._layers is layers, "Unchanged background was rendered again"
+            win.dark_mode = True
+            win.on_draw(win.drawing_area, _cairo.Context(surface))
+            assert bg._layers is not layers and bg.key[-1] is True, "Theme change reused the light background"
+            dark_px = pixels(surface)[10 * gs + gs // 2, 10 * gs + gs // 2, :3]
+            assert (abs(dark_px.astype(int) - 31) <= 2).all(), f"Dark background is {dark_px.tolist()}"
+
+            class Counting(_cairo.Context):
+                def __init__(self, surface):
+                    super().__init__(surface)
+                    self.calls = {"fill": 0, "arc": 0, "show_text": 0}
+
+                def fill(self):
+                    self.calls["fill"] += 1
+                    super().fill()
+
+                def arc(self, *args):
+                    self.calls["arc"] += 1
+                    super().arc(*args)
+
+                def show_text(self, text):
+                    self.calls["show_text"] += 1
+                    super().show_text(text)
+
+            layers = bg._layers
+            cr = Counting(surface)
+            bg.paint(cr, 5000, 5000, gs, win.drawing_area.zoom, True, win.get_column_label)
+            # One fill per cached layer, instead of a dot per grid point and a label per row and column
+            assert bg._layers is layers and cr.calls == {"fill": len(layers), "arc": 0, "show_text": 0}, \
+                f"Cached background paint made {cr.calls} calls for {len(layers)} layers"
+
+            # Strips longer than cairo's 32767 px limit: only the dot tile is cached, and the
+            # labels inside the clip are drawn directly instead of the canvas going blank
+            surface = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 600, 600)
+            cr = Counting(surface)
+            cr.rectangle(0, 0, 600, 600)
+            cr.clip()
+            bg.paint(cr, 100000, 100000, gs, 8.0, False, win.get_column_label)
+            assert len(bg._layers) == 1, f"{len(bg._layers)} layers cached for a 800000 px strip"
+            assert 0 < cr.calls["show_text"] <= 2 * (600 // gs + 2), \
+                f"{cr.calls['show_text']} labels drawn for a 600 px clip"
+            px = pixels(surface)
+            assert (px[:20, 50:500, :3] < 100).all(axis=2).any(), "No column labels on an oversized canvas"
+            assert px[10 * gs, 10 * gs, :3].tolist() == [0, 255, 0], "No grid dot on an oversized canvas"
+        finally:
+            win.dark_mode = dark
+    run_test("TC-68 Cached grid background", t68)
+
+    # TC-69: on_draw paints only what overlaps the clip, with identical pixels
+    reset(win)
+
+    def t69():
+        import random
+        from blocks import Block
+        from pins   import Pin
+        from wire   import Wire
+        rng = random.Random(69)
+        types = list(Block._WIRE_COUNTS)
+        for i in range(1500):
+            b = Block(gs*rng.randrange(240), gs*rng.randrange(240), gs*4, gs*4, f"V{i}", rng.choice(types), gs, win)
+            b.rotation = rng.choice([0, 90, 180, 270])
+            b.update_points()
+            win.blocks.append(b)
+        for i in range(300):
+            win.pins.append(Pin(gs*rng.randrange(240), gs*rng.randrange(240), gs*3, gs*2, f"VP{i}",
+                                rng.choice(["input_pin", "output_pin", "input_bus"]), gs, 2, win))
+        for k in range(3000):
+            x, y = rng.randrange(5, 240), rng.randrange(5, 240)
+            x2, y2 = min(245, x + rng.randrange(1, 30)), min(245, y + rng.randrange(1, 30))
+            win.wires.append(Wire(f"v{k}", [gs*x, gs*y], [gs*x2, gs*y2], "wire", gs, win,
+                                  path=[(x, y), (x2, y), (x2, y2)]))
+        everything = win.blocks + win.pins + win.wires
+        clipped = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 500, 400)
+        cr = _cairo.Context(clipped)
+        cr.translate(-1800, -2200)
+        win.on_draw(win.drawing_area, cr)
+        visible = win.drawing_area.visible_elements(*cr.clip_extents())
+        assert 0 < len(visible) < len(everything) // 10, f"{len(visible)} of {len(everything)} elements drawn"
+        full = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 500, 400)
+        cr = _cairo.Context(full)
+        cr.translate(-1800, -2200)
+        win.drawing_area.background.paint(cr, 5000, 5000, gs, win.drawing_area.zoom, win.dark_mode,
+                                          win.get_column_label)
+        for elem in win.blocks + win.pins:
+            elem.draw(cr)
+        Wire.draw_batch(cr, win.wires)
+        assert (pixels(clipped) == pixels(full)).all(), "Culled frame differs from drawing everything"
+        b = win.blocks[0]
+        b.x, b.y = gs*10, gs*10
+        assert b in win.drawing_area.visible_elements(gs*10, gs*10, gs*11, gs*11), "Block not found"
+        b.x, b.y = gs*200, gs*200
+        assert b not in win.drawing_area.visible_elements(gs*10, gs*10, gs*11, gs*11), \
+            "Moved block still listed at its old place"
+        assert b in win.drawing_area.visible_elements(gs*200, gs*200, gs*201, gs*201), "Moved block not found"
+        win.blocks.remove(b)
+        assert b not in win.drawing_area.visible_elements(0, 0, 5000, 5000), "Deleted block still drawn"
+    run_test("TC-69 Viewport-culled drawing", t69)
+
+    # TC-70: Blocks and pins paint from cached symbol images, matching direct drawing
+    reset(win)
+
+    def t70():
+        from blocks import Block
+        from pins   import Pin
+        from symbol_cache import SymbolCache, SYMBOLS
+        SYMBOLS.clear()
+        elems = [Block(gs*(5 + 6*(i % 8)), gs*(5 + 10*(i // 8)), gs*4, gs*4, f"S{i}", t, gs, win)
+                 for i, t in enumerate(["AND", "XOR", "MUX_4X1", "DFF", "NOT", "RCA_4BIT"] * 4)]
+        elems[1].rotation = 90
+        elems[1].update_points()
+        elems.append(Pin(gs*60, gs*10, gs*3, gs*2, "IN", "input_pin", gs, 1, win))
+        elems.append(Pin(gs*60, gs*20, gs*3, gs*2, "BUS", "input_bus", gs, 4, win))
+        cached = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 1400, 1200)
+        direct = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 1400, 1200)
+        cr, dr = _cairo.Context(cached), _cairo.Context(direct)
+        for e in elems:
+            e.draw(cr)
+            e._draw_symbol(dr)
+        diff = np.abs(pixels(cached).astype(int) - pixels(direct).astype(int))
+        assert diff.max() <= 2, f"Cached symbols differ from direct drawing by up to {diff.max()}"
+        assert SYMBOLS.misses == len(SYMBOLS) == 8, f"{SYMBOLS.misses} renders for 8 distinct symbols"
+        elems[0].set_selected(True)
+        elems[0].draw(cr)
+        assert SYMBOLS.misses == 9, "Selecting a block reused its unselected image"
+        renders = []
+        for e in elems:
+            e._draw_symbol = lambda c, draw=e._draw_symbol: renders.append(c) or draw(c)
+        hits, misses = SYMBOLS.hits, SYMBOLS.misses
+        try:
+            for e in elems:
+                e.draw(cr)
+        finally:
+            for e in elems:
+                del e._draw_symbol
+        # A warm pass copies one image per element and redraws no outline, bezier or label
+        assert not renders and SYMBOLS.misses == misses and SYMBOLS.hits - hits == len(elems), \
+            f"Cached pass: {len(renders)} symbol draws, {SYMBOLS.hits - hits} hits for {len(elems)} elements"
+        gates = [elems[i] for i in (0, 1, 4, 6, 7, 10)]    # AND, XOR and NOT: small images
+        small = SymbolCache(max_bytes=150_000)
+        for e in gates:
+            small.paint(cr, e.symbol_key(), (e.x, e.y), e._draw_symbol)
+        assert small.nbytes <= 150_000 and len(small) < len(gates), "Cache grew past its byte budget"
+        assert small._images and list(small._images)[-1][0] == gates[-1].symbol_key(), "Newest symbol evicted"
+        if hasattr(_cairo, "SVGSurface"):
+            import io
+            misses = SYMBOLS.misses
+            svg = _cairo.SVGSurface(io.BytesIO(), 400, 400)
+            elems[2].draw(_cairo.Context(svg))
+            svg.finish()
+            assert SYMBOLS.misses == misses, "SVG export drew a cached raster"
+    run_test("TC-70 Cached block and pin symbols", t70)
+
+    # TC-71: Edits queue redraws of the boxes they touch; plain hover queues none
+    reset(win)
+
+    def t71():
+        import math
+        from types import SimpleNamespace
+        from blocks import Block
+        from wire   import Wire
+        da = win.drawing_area
+        z = da.zoom
+        queued = []
+        da.queue_draw_area = lambda x, y, w, h: queued.append((x, y, w, h))
+
+        def covered(box):
+            return any(x <= math.floor(box[0] * z) and y <= math.floor(box[1] * z) and
+                       x + w >= math.ceil(box[2] * z) and y + h >= math.ceil(box[3] * z)
+                       for x, y, w, h in queued)
+
+        def motion(cx, cy):
+            win.on_motion_notify(da, SimpleNamespace(x=cx * z, y=cy * z))
+
+        win._wire_mid_drag_wire = None
+        try:
+            a = Block(gs*10, gs*10, gs*4, gs*4, "A", "AND", gs, win)
+            b = Block(gs*100, gs*100, gs*4, gs*4, "B", "OR", gs, win)
+            win.blocks += [a, b]
+            da.queue_damage()
+            queued.clear()
+            motion(gs*50, gs*50)
+            motion(gs*51, gs*52)
+            assert not queued, f"Hover queued {len(queued)} redraws"
+            old = a.bbox()
+            a.x += gs*5
+            assert da.queue_damage() == 2 and covered(old) and covered(a.bbox()), "Move not redrawn"
+            assert all(w * h < 400 * 400 * z * z for _, _, w, h in queued), "Move redrew a large area"
+            queued.clear()
+            b.set_selected(True)
+            assert da.queue_damage() == 1 and covered(b.bbox()), "Selection change not redrawn"
+            queued.clear()
+            old = a.bbox()
+            win.blocks.remove(a)
+            assert da.queue_damage() == 1 and covered(old), "Deleted block left on screen"
+            queued.clear()
+            win.dragging_wire, win.wire_start_point = True, (gs*10, gs*10)
+            motion(gs*30, gs*20)
+            assert covered((gs*10, gs*10, gs*30, gs*20)), "Rubber-band wire not redrawn"
+            queued.clear()
+            motion(gs*12, gs*40)
+            assert covered((gs*10, gs*10, gs*30, gs*20)), "Old rubber-band wire left on screen"
+            win.dragging_wire = False
+            win._preview_damage()
+            queued.clear()
+            for k in range(100):
+                win.wires.append(Wire(f"d{k}", [gs*k, gs*5], [gs*k, gs*9], "wire", gs, win,
+                                      path=[(k, 5), (k, 9)]))
+            assert da.queue_damage() == 1, "Many changes were not merged into one redraw"
+        finally:
+            win.dragging_wire = False
+            del da.queue_draw_area
+    run_test("TC-71 Damage-region redraws", t71)
+
+    # TC-72: Zoomed out, elements are drawn with less detail
+    reset(win)
+
+    def t72():
+        import lod
+        import random
+        from blocks import Block
+        from pins   import Pin
+        from wire   import Wire
+        assert [lod.tier(z) for z in (1.0, 0.5, 0.4, 0.3, 0.2)] == \
+            [lod.FULL, lod.FULL, lod.OUTLINE, lod.OUTLINE, lod.COARSE], "Wrong tiers"
+        b = Block(gs*10, gs*10, gs*4, gs*4, "LONG BLOCK TITLE", "AND", gs, win)
+        outline = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 200, 200)
+        cr = _cairo.Context(outline)
+        cr.scale(0.4, 0.4)
+        b.draw(cr, lod.OUTLINE)
+        px = pixels(outline)[int(gs*10*0.4) + 2:int(gs*14*0.4) - 2, int(gs*10*0.4) + 2:int(gs*14*0.4) - 2, :3]
+        assert (px == [204, 204, 204]).all(), "Outline block has detail inside its body"
+        full = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 200, 200)
+        cr = _cairo.Context(full)
+        cr.scale(0.4, 0.4)
+        b.draw(cr)
+        assert (pixels(full) != pixels(outline)).any(), "Full detail drew only the outline"
+        p = Pin(gs*10, gs*10, gs*3, gs*2, "P", "input_pin", gs, 1, win)
+        p.x += gs*5
+        p.draw(cr, lod.OUTLINE)
+        assert p.connection_points[0][0] == gs*15 + gs*1.5, "Outline pin left stale connection points"
+        stairs = [(k // 2 + 5, (k + 1) // 2 + 5) for k in range(40)]
+        w = Wire("stairs", [gs*5, gs*5], [gs*stairs[-1][0], gs*stairs[-1][1]], "wire", gs, win, path=stairs)
+        coarse = w.coarse_points(lod.COARSE_TOLERANCE / 0.2)
+        assert len(coarse) < len(w.corners) // 2, f"{len(coarse)} of {len(w.corners)} corners kept"
+        assert coarse[0] == (gs*5, gs*5) and coarse[-1] == tuple(gs*c for c in w.corners[-1].tolist()), \
+            "Decimation moved the route's ends"
+        assert w.coarse_points(lod.COARSE_TOLERANCE / 0.2) is coarse, "Decimated route not cached"
+
+        rng = random.Random(72)
+        types = list(Block._WIRE_COUNTS)
+        for i in range(1500):
+            win.blocks.append(Block(gs*rng.randrange(240), gs*rng.randrange(240), gs*4, gs*4, f"L{i}",
+                                    rng.choice(types), gs, win))
+        for k in range(3000):
+            x, y = rng.randrange(5, 240), rng.randrange(5, 240)
+            x2, y2 = min(245, x + rng.randrange(1, 30)), min(245, y + rng.randrange(1, 30))
+            win.wires.append(Wire(f"l{k}", [gs*x, gs*y], [gs*x2, gs*y2], "wire", gs, win,
+                                  path=[(x, y), (x2, y), (x2, y2)]))
+
+        class Counting(_cairo.Context):
+            OPS = ("move_to", "line_to", "rectangle", "arc", "show_text", "stroke", "fill", "fill_preserve", "paint")
+
+            def __init__(self, surface):
+                super().__init__(surface)
+                self.calls = dict.fromkeys(self.OPS, 0)
+
+            def _count(self, op):
+                self.calls[op] += 1
+
+            def move_to(self, *a): self._count("move_to"); super().move_to(*a)
+            def line_to(self, *a): self._count("line_to"); super().line_to(*a)
+            def rectangle(self, *a): self._count("rectangle"); super().rectangle(*a)
+            def arc(self, *a): self._count("arc"); super().arc(*a)
+            def show_text(self, *a): self._count("show_text"); super().show_text(*a)
+            def stroke(self): self._count("stroke"); super().stroke()
+            def fill(self): self._count("fill"); super().fill()
+            def fill_preserve(self): self._count("fill_preserve"); super().fill_preserve()
+            def paint(self): self._count("paint"); super().paint()
+
+        surface = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 1000, 1000)
+        calls = {}
+        for detail in (lod.FULL, lod.COARSE):
+            cr = Counting(surface)
+            cr.scale(0.2, 0.2)
+            for elem in win.blocks + win.wires:    # once to fill the symbol cache
+                elem.draw(cr, detail)
+            cr.calls = dict.fromkeys(Counting.OPS, 0)
+            for elem in win.blocks + win.wires:
+                elem.draw(cr, detail)
+            calls[detail] = cr.calls
+        coarse, full = calls[lod.COARSE], calls[lod.FULL]
+        assert coarse["show_text"] == coarse["arc"] == 0, f"Coarse frame drew text or dots: {coarse}"
+        assert sum(coarse.values()) < sum(full.values()), \
+            f"Coarse frame made {sum(coarse.values())} drawing calls vs {sum(full.values())} at full detail"
+    run_test("TC-72 Level-of-detail drawing", t72)
+
+    # TC-73: Unselected wires are stroked together, selected ones on top
+    reset(win)
+
+    def t73():
+        from wire import Wire
+
+        class Counting(_cairo.Context):
+            def __init__(self, surface):
+                super().__init__(surface)
+                self.calls = {"stroke": 0, "show_text": 0, "show_glyphs": 0, "set_source_rgb": 0}
+
+            def set_source_rgb(self, *rgb):
+                self.calls["set_source_rgb"] += 1
+                super().set_source_rgb(*rgb)
+
+            def stroke(self):
+                self.calls["stroke"] += 1
+                super().stroke()
+
+            def show_text(self, text):
+                self.calls["show_text"] += 1
+                super().show_text(text)
+
+            def show_glyphs(self, glyphs):
+                self.calls["show_glyphs"] += 1
+                super().show_glyphs(glyphs)
+
+        wires = []
+        for k in range(12):
+            x, y = 5 + 12 * (k % 4), 5 + 12 * (k // 4)
+            wires.append(Wire(f"n{k}", [gs*x, gs*y], [gs*(x + 6), gs*(y + 4)], "wire", gs, win,
+                              path=[(x, y), (x + 6, y), (x + 6, y + 4)]))
+        wires[1].junction = wires[1].corners[1].tolist()
+        wires[2].waypoint = wires[2].corners[1].tolist()
+        wires[3].set_selected(True)
+        wires[4].route_pending = True
+        batched = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 1100, 800)
+        single = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 1100, 800)
+        cr = Counting(batched)
+        Wire.draw_batch(cr, wires)
+        dr = _cairo.Context(single)
+        for w in wires:
+            w.draw(dr)
+        diff = np.abs(pixels(batched).astype(int) - pixels(single).astype(int))
+        assert diff.max() <= 2, f"Batched wires differ from single draws by up to {diff.max()}"
+        assert (cr.calls["stroke"], cr.calls["show_text"], cr.calls["show_glyphs"]) == (3, 1, 1), f"Calls {cr.calls}"
+        assert wires[0].label_glyphs(cr) is wires[0].label_glyphs(cr), "Label glyphs not cached"
+
+        for k in range(3000):
+            x, y = 5 + k % 200, 5 + (k * 7) % 200
+            win.wires.append(Wire(f"m{k}", [gs*x, gs*y], [gs*(x + 9), gs*(y + 9)], "wire", gs, win,
+                                  path=[(x, y), (x + 9, y), (x + 9, y + 9)]))
+        surface = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 1000, 1000)
+        batch, single = Counting(surface), Counting(surface)
+        Wire.draw_batch(batch, win.wires)
+        for w in win.wires:
+            w.draw(single)
+        # One stroke and two colours per frame, however many wires, against a stroke and colours per wire
+        assert batch.calls["stroke"] == 1 and batch.calls["set_source_rgb"] == 2, f"Batched frame: {batch.calls}"
+        assert single.calls["stroke"] == len(win.wires) and single.calls["set_source_rgb"] >= len(win.wires), \
+            f"One-by-one frame: {single.calls}"
+    run_test("TC-73 Batched wire stroking", t73)
+
+    # TC-74: Opt-in frame timing per draw phase, shown in the status bar and saved as CSV
+    reset(win)
+
+    def t74():
+        import csv
+        from blocks import Block
+        from pins   import Pin
+        from wire   import Wire
+        from frame_stats import PHASES
+        da = win.drawing_area
+        stats = da.frame_stats
+        enabled = stats.enabled
+        try:
+            win.blocks.append(Block(gs*5, gs*5, gs*4, gs*4, "T", "AND", gs, win))
+            win.pins.append(Pin(gs*12, gs*5, gs*3, gs*2, "P", "input_pin", gs, 1, win))
+            win.wires.append(Wire("t", [gs*5, gs*12], [gs*15, gs*12], "wire", gs, win, path=[(5, 12), (15, 12)]))
+            surface = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 400, 400)
+            stats.enabled = False
+            stats.clear()
+            da.on_draw(da, _cairo.Context(surface))
+            assert not stats.frames, "Disabled frame timing recorded a frame"
+            stats.enabled = True
+            for _ in range(30):
+                da.on_draw(da, _cairo.Context(surface))
+            assert len(stats.frames) == 30, f"{len(stats.frames)} of 30 frames recorded"
+            _, total, phases = stats.frames[-1]
+            assert set(phases) == set(PHASES), f"Phases timed: {sorted(phases)}"
+            assert abs(sum(phases.values()) - total) < 0.002, "Phase times do not add up to the frame"
+            assert 0 < stats.percentile(50) <= stats.percentile(95), "Bad percentiles"
+            assert stats.fps() > 0, "No FPS"
+            win.update_status_bar()
+            assert "FPS" in win.status_bar.get_text(), "Status bar shows no frame timing"
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, "frames.csv")
+                stats.write_csv(path)
+                with open(path) as f:
+                    rows = list(csv.reader(f))
+            assert rows[0][:3] == ["frame", "start_s", "total_ms"] and len(rows) == 31, "Bad CSV"
+            assert all(len(r) == 3 + len(PHASES) for r in rows), "Ragged CSV rows"
+        finally:
+            stats.enabled = enabled
+            stats.clear()
+            win.update_status_bar()
+    run_test("TC-74 Frame timing instrumentation", t74)
+
+    # TC-77: An oversized canvas_size preference is clamped and still draws a frame
+    reset(win)
+
+    def t77():
+        from drawing_area import DrawingArea
+        da = win.drawing_area
+        size, zoom, config_path = DrawingArea.CANVAS_SIZE, da.zoom, win._config_path
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, "config.json")
+                win._config_path = lambda: path
+                for wanted, expected in ((20000, 20000), (10, DrawingArea.MIN_CANVAS_SIZE),
+                                         (10 ** 9, DrawingArea.MAX_CANVAS_SIZE)):
+                    with open(path, "w") as f:
+                        json.dump({"canvas_size": wanted}, f)
+                    loaded = win._load_canvas_size_pref()
+                    assert loaded == expected, f"canvas_size {wanted} loaded as {loaded}"
+                DrawingArea.CANVAS_SIZE = loaded
+            da.zoom = 4.0
+            rebuild_grid(win)
+            surface = _cairo.ImageSurface(_cairo.FORMAT_ARGB32, 600, 600)
+            da.on_draw(da, _cairo.Context(surface))
+            px = pixels(surface)
+            assert px[gs * 8, gs * 8, :3].tolist() == [0, 255, 0], "No grid dot on the largest canvas"
+            assert (px[:60, 200:600, :3] < 100).all(axis=2).any(), "No column labels on the largest canvas"
+        finally:
+            win._config_path = config_path
+            DrawingArea.CANVAS_SIZE, da.zoom = size, zoom
+            da.set_size_request(int(size * zoom), int(size * zoom))
+            rebuild_grid(win)
+    run_test("TC-77 Oversized canvas_size preference", t77)
+
 
 # ---------------------------------------------------------------------------
 # Master runner
@@ -1285,6 +2451,7 @@ def run_all(win):
     tg08_export(win)
     tg09_routing(win)
     tg10_yosys(win)
+    tg11_rendering(win)
 
     passed  = sum(1 for _, s, _ in results if s == "PASS")
     skipped = sum(1 for _, s, _ in results if s == "SKIP")
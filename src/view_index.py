@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+view_index.py -- uniform-bucket index of canvas element bounding boxes
+
+on_draw only has to paint the blocks, pins and wires that overlap the
+exposed (clip) rectangle.  Every element reports a cached bbox(); sync()
+re-buckets the ones whose box changed since the last frame, a tuple compare
+for all the others (as OccupancyGrid.sync() does for footprints), and
+query() returns the elements listed in the buckets the clip rectangle
+covers, in drawing order.
+"""
+
+# Bucket side in canvas px
+BUCKET = 200
+# Boxes spanning more buckets than this are kept in one list and always tested
+MAX_SPAN = 64
+
+
+class BoxIndex:
+    def __init__(self, bucket=BUCKET):
+        self.bucket = bucket
+        self.buckets = {}   # (bx, by) -> {element}
+        self.large = set()  # elements whose box covers more than MAX_SPAN buckets
+        self._boxes = {}    # element -> (x0, y0, x1, y1) it is listed under
+        self._order = {}    # element -> position in the last sync()
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def _range(self, x0, y0, x1, y1):
+        b = self.bucket
+        return range(int(x0 // b), int(x1 // b) + 1), range(int(y0 // b), int(y1 // b) + 1)
+
+    def _place(self, elem, box):
+        xs, ys = self._range(*box)
+        if len(xs) * len(ys) > MAX_SPAN:
+            self.large.add(elem)
+        else:
+            for bx in xs:
+                for by in ys:
+                    self.buckets.setdefault((bx, by), set()).add(elem)
+        self._boxes[elem] = box
+
+    def remove(self, elem):
+        box = self._boxes.pop(elem, None)
+        if box is None:
+            return
+        if elem in self.large:
+            self.large.discard(elem)
+            return
+        xs, ys = self._range(*box)
+        for bx in xs:
+            for by in ys:
+                bucket = self.buckets[(bx, by)]
+                bucket.discard(elem)
+                if not bucket:
+                    del self.buckets[(bx, by)]
+
+    def get(self, elem):
+        """The box elem is listed under, or None."""
+        return self._boxes.get(elem)
+
+    def sync(self, elements, damage=None):
+        """
+        Match the index to elements (in drawing order): changed boxes are
+        re-bucketed and elements no longer present are dropped.  If damage
+        is a list, the old and new box of every change is appended to it.
+        Returns the number of elements re-bucketed or dropped.
+        """
+        order = {}
+        boxes = self._boxes
+        changed = 0
+        for elem in elements:
+            order[elem] = len(order)
+            box = elem.bbox()
+            old = boxes.get(elem)
+            if old != box:
+                self.remove(elem)
+                self._place(elem, box)
+                changed += 1
+                if damage is not None:
+                    damage.append(box)
+                    if old is not None:
+                        damage.append(old)
+        # Every element is in _boxes now, so equal sizes mean no stale ones
+        if len(boxes) != len(order):
+            for elem in [e for e in boxes if e not in order]:
+                if damage is not None:
+                    damage.append(boxes[elem])
+                self.remove(elem)
+                changed += 1
+        self._order = order
+        return changed
+
+    def query(self, x0, y0, x1, y1):
+        """Elements whose box overlaps the rectangle, in the order of the last sync()."""
+        xs, ys = self._range(x0, y0, x1, y1)
+        boxes = self._boxes
+        if len(xs) * len(ys) > len(boxes):
+            found = boxes                   # a rectangle this large: just test every box
+        else:
+            found = set(self.large)
+            buckets = self.buckets
+            for bx in xs:
+                for by in ys:
+                    bucket = buckets.get((bx, by))
+                    if bucket:
+                        found.update(bucket)
+        hits = []
+        for elem in found:
+            bx0, by0, bx1, by1 = boxes[elem]
+            if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0:
+                hits.append(elem)
+        hits.sort(key=self._order.__getitem__)
+        return hits
@@ -4,10 +4,28 @@ import math
 import numpy as np
 import random
 import uuid
-from astar import AStar
+import lod
+from astar import SearchStats
+from routing import (route_cells, route_net_batch, route_negotiated, manhattan_cells, path_corners, corner_cells,
+                     patch_endpoint)
 
 class Wire:
-    def __init__(self, text, start_point, end_point, wire_type, grid_size, parent_window):
+    # A* kernel used by calculate_path_astar: "classic" (greedy, fewest
+    # expansions on typical routes), "flat" (integer arrays, shortest paths)
+    # or "bends" (fewest corners, at roughly twice the search work of "flat")
+    ROUTING_KERNEL = "classic"
+    # A* node expansions one wire's route may spend before falling back to
+    # Manhattan, and the total for one route_all() over many wires.  Counted
+    # in expansions rather than seconds so a layout routes identically on
+    # every machine.
+    ROUTE_BUDGET = 250_000
+    INTERACTION_BUDGET = 5_000_000
+    # Wall-clock cap on a negotiated route_all(), which runs on the GTK thread;
+    # wires still unrouted when it passes take a Manhattan route
+    NEGOTIATION_SECONDS = 5.0
+
+    # path: precomputed grid-cell path (e.g. from a batch route); skips A* when given
+    def __init__(self, text, start_point, end_point, wire_type, grid_size, parent_window, path=None):
         self.id = f"wire_{str(uuid.uuid4().int)[:10]}"  # Generate a unique 10-digit ID
         self.text = text
         self.text_pos_x = round(random.randint(20,40))
@@ -18,30 +36,122 @@ class Wire:
         self.parent_window = parent_window
         self.wire_type = wire_type
         self.waypoint = None   # optional grid-coord [gx, gy] for manual rerouting
-        self.path = self.calculate_path()
+        self.grid_version = None  # occupancy-grid version the current path was routed on
+        self.junction = None   # grid-coord [gx, gy] where this branch taps its net's tree
+        self.route_pending = False  # background route in flight; draw a straight preview
+        self.corners = path_corners([])  # (n, 2) int32 end and bend cells of the route
+        self.route_stats = None  # astar.SearchStats of the search that produced the route
+        self._bbox = None  # (corners, endpoints, text, box) cached by bbox()
+        self._coarse = None  # (corners, tolerance, points) cached by coarse_points()
+        self._glyphs = None  # (label key, glyphs) cached by label_glyphs()
+        self.path = self.calculate_path() if path is None else path
         self.selected = False  # Attribute to track selection state
 
+    # Only bend points are stored; the per-cell route is rebuilt on access
+    @property
+    def path(self):
+        return corner_cells(self.corners)
+
+    @path.setter
+    def path(self, cells):
+        self.corners = path_corners(cells if cells is not None else [])
+        # Keep the canvas' segment index (wire_index) in step with the route;
+        # wires not on the canvas are listed when they join it
+        index = getattr(getattr(self.parent_window, "drawing_area", None), "wire_index", None)
+        if index is not None and self in index:
+            index.update(self)
+
+    def path_cell(self, i):
+        """The i-th cell of the route without expanding the whole path."""
+        lengths = np.abs(np.diff(self.corners, axis=0)).max(axis=1)
+        ends = np.cumsum(lengths)
+        seg = int(np.searchsorted(ends, i))
+        if i == 0 or seg >= len(lengths):
+            return tuple(self.corners[0 if i == 0 else -1].tolist())
+        a, b = self.corners[seg], self.corners[seg + 1]
+        k = lengths[seg] - (ends[seg] - i)
+        return tuple((a + np.sign(b - a) * k).tolist())
+
+    def path_length(self):
+        """Number of cells in the route."""
+        if len(self.corners) < 2:
+            return len(self.corners)
+        return int(np.abs(np.diff(self.corners, axis=0)).max(axis=1).sum()) + 1
+
     def set_selected(self, selected):
         self.selected = selected
 
-    def update_start_point(self, new_start_point):
+    # background=True hands A* to parent_window.route_worker (GUI handlers);
+    # a straight-line preview is drawn until the routed path is applied.
+    # A route that is still clear is only patched at the moved end.
+    def update_start_point(self, new_start_point, background=False):
         self.start_point = new_start_point
-        self.path = self.calculate_path()
+        self._reroute(background, moved="start")
 
-    def update_end_point(self, new_end_point):
+    def update_end_point(self, new_end_point, background=False):
         self.end_point = new_end_point
-        self.path = self.calculate_path()
+        self._reroute(background, moved="end")
 
     def update_waypoint(self, canvas_pt):
         """Snap canvas_pt to the grid and re-route through it with two Manhattan legs."""
         gs = self.grid_size
         self.waypoint = [round(canvas_pt[0] / gs), round(canvas_pt[1] / gs)]
+        self.junction = None
+        self._cancel_background_route()
         self.path = self._path_via_waypoint()
 
     def clear_waypoint(self):
         """Remove the manual waypoint and revert to A* routing."""
         self.waypoint = None
-        self.path = self.calculate_path()
+        self._reroute(False)
+
+    def _reroute(self, background, moved=None):
+        if moved is not None and self._patch_route(moved):
+            return
+        worker = getattr(self.parent_window, "route_worker", None) if background else None
+        if worker is None or self.waypoint or self.start_point is None or self.end_point is None:
+            self._cancel_background_route()
+            self.path = self.calculate_path()
+            return
+        self.junction = None
+        self.grid_version, grid = self.parent_window.drawing_area.routing_snapshot()
+        start, end = self.endpoint_cells()
+        self.route_pending = True
+        worker.submit(self, grid, start, end, self.ROUTING_KERNEL, self.ROUTE_BUDGET)
+
+    def _patch_route(self, moved):
+        """
+        Keep the stored route after the moved ("start"/"end") endpoint was
+        dragged, joined to it by a short Manhattan stub, when no cell of the
+        result is blocked now.  Returns False when a new search is needed.
+        """
+        if self.waypoint or self.route_pending or self.start_point is None or self.end_point is None:
+            return False
+        if len(self.corners) < 2 or (moved == "start" and self.junction is not None):
+            return False        # a branch's start is its tap on the net tree
+        start, end = self.endpoint_cells()
+        version, grid = self.parent_window.drawing_area.routing_snapshot()
+        at_start = moved == "start"
+        path = patch_endpoint(grid, self.path, start if at_start else end, at_start)
+        if path is None:
+            return False
+        self.path = path
+        self.grid_version = version
+        self.route_stats = SearchStats()
+        return True
+
+    def _cancel_background_route(self):
+        if self.route_pending:
+            worker = getattr(self.parent_window, "route_worker", None)
+            if worker is not None:
+                worker.cancel(self)
+            self.route_pending = False
+
+    def apply_route(self, path, stats=None):
+        """Install a path (and its SearchStats) delivered by the background route worker."""
+        self.path = path
+        self.route_stats = stats
+        self.route_pending = False
 
     def _path_via_waypoint(self):
         sc = (int(self.start_point[0] / self.grid_size), int(self.start_point[1] / self.grid_size))
@@ -55,6 +165,7 @@ class Wire:
         if self.start_point is None or self.end_point is None:
             print("Start or end point is None. Cannot calculate path.")
             return []
+        self.junction = None   # routed on its own, no longer a branch of a net tree
         if self.waypoint:
             return self._path_via_waypoint()
         self.path = self.calculate_path_astar()
@@ -89,71 +200,102 @@ class Wire:
         if self.start_point is None or self.end_point is None:
             print("Start or end point is None. Cannot calculate path.")
             return []
-        grid = self.parent_window.drawing_area.grid
-        sc0 = int(self.start_point[0] / self.grid_size)
-        sc1 = int(self.start_point[1] / self.grid_size)
-        ec0 = int(self.end_point[0] / self.grid_size)
-        ec1 = int(self.end_point[1] / self.grid_size)
-
-        # Clip A* to a padded bounding box so search is O(margin^2) not O(grid^2)
-        MARGIN = 25
-        d0, d1 = grid.shape
-        r0 = max(0, min(sc0, ec0) - MARGIN)
-        r1 = min(d0, max(sc0, ec0) + MARGIN + 1)
-        c0 = max(0, min(sc1, ec1) - MARGIN)
-        c1 = min(d1, max(sc1, ec1) + MARGIN + 1)
-        sub_grid = grid[r0:r1, c0:c1]
-
-        start_local = (sc0 - r0, sc1 - c0)
-        end_local   = (ec0 - r0, ec1 - c0)
-
-        astar = AStar(sub_grid)
-        came_from, _ = astar.astar(start_local, end_local)
-        path_local = astar.reconstruct_path(came_from, start_local, end_local)
-
-        if path_local:
-            return [(px + r0, py + c0) for px, py in path_local]
-
-        # bbox too tight or blocked — retry on full grid before Manhattan
-        astar_full = AStar(grid)
-        came_from_full, _ = astar_full.astar((sc0, sc1), (ec0, ec1))
-        path_full = astar_full.reconstruct_path(came_from_full, (sc0, sc1), (ec0, ec1))
-        if path_full:
-            return path_full
-
-        print(f"A* found no path ({sc0},{sc1})->({ec0},{ec1}); using Manhattan fallback")
-        return self._manhattan_path((sc0, sc1), (ec0, ec1))
+        # Route against one consistent occupancy snapshot for the whole search
+        drawing_area = self.parent_window.drawing_area
+        self.grid_version, grid = drawing_area.routing_snapshot()
+        start, end = self.endpoint_cells()
+        self.route_stats = SearchStats(self.ROUTE_BUDGET)
+        return route_cells(grid, start, end, self.ROUTING_KERNEL, drawing_area.routing_labels(),
+                           drawing_area.routing_hierarchy(), self.route_stats)
+
+    def endpoint_cells(self):
+        """Grid cells of the start and end points."""
+        return ((int(self.start_point[0] / self.grid_size), int(self.start_point[1] / self.grid_size)),
+                (int(self.end_point[0] / self.grid_size), int(self.end_point[1] / self.grid_size)))
 
     def _manhattan_path(self, start, end):
         """L-shaped Manhattan path: horizontal segment then vertical segment."""
-        x1, y1 = start
-        x2, y2 = end
-        path = []
-        # horizontal leg
-        step = 1 if x2 >= x1 else -1
-        for x in range(x1, x2 + step, step):
-            path.append((x, y1))
-        # vertical leg
-        step = 1 if y2 >= y1 else -1
-        for y in range(y1 + step, y2 + step, step):
-            path.append((x2, y))
-        return path
-    
+        return manhattan_cells(start, end)
 
-    def draw(self, cr):
+    @staticmethod
+    def route_all(wires, parent_window, progress=None, negotiated=False):
+        """
+        Re-route many wires together against one occupancy snapshot, then
+        assign every path in a single pass.  Wires sharing a start cell form
+        one net and are routed as a Steiner tree (routing.route_net_batch()):
+        each wire keeps only its branch from the tap cell (its junction) to
+        its end.  negotiated=True uses routing.route_negotiated() instead so
+        wires of different nets stop overlapping, within NEGOTIATION_SECONDS.
+        Waypoint wires keep their manual two-leg route.  Each net (each
+        search, when negotiated) may expand ROUTE_BUDGET nodes, less when
+        needed to keep one pass within INTERACTION_BUDGET; every wire's
+        route_stats is its net's record.
+        """
+        version, grid = parent_window.drawing_area.routing_snapshot()
+        auto = [w for w in wires if not w.waypoint and w.start_point is not None and w.end_point is not None]
+        for wire in wires:
+            wire._cancel_background_route()
+            wire.junction = None
+            if wire.start_point is None or wire.end_point is None:
+                wire.path = []
+            elif wire.waypoint:
+                wire.path = wire._path_via_waypoint()
+        if negotiated:
+            budget = min(Wire.ROUTE_BUDGET, Wire.INTERACTION_BUDGET // max(1, len(auto)))
+            paths, _ = route_negotiated(grid, [w.endpoint_cells() for w in auto], progress=progress,
+                                        time_budget=Wire.NEGOTIATION_SECONDS, max_expansions=budget)
+            for wire, path in zip(auto, paths):
+                wire.path = path
+                wire.grid_version = version
+            return
+
+        nets = {}   # start cell -> [(wire, end cell)]
+        for wire in auto:
+            start, end = wire.endpoint_cells()
+            nets.setdefault(start, []).append((wire, end))
+        drawing_area = parent_window.drawing_area
+        budget = min(Wire.ROUTE_BUDGET, Wire.INTERACTION_BUDGET // max(1, len(nets)))
+        stats = []
+        trees = route_net_batch(grid, [(s, [e for _, e in members]) for s, members in nets.items()],
+                                Wire.ROUTING_KERNEL, progress, labels=drawing_area.routing_labels(),
+                                graph=drawing_area.routing_hierarchy(), max_expansions=budget, stats=stats)
+        for (start, members), branches, net_stats in zip(nets.items(), trees, stats):
+            for (wire, _), (tap, path) in zip(members, branches):
+                wire.path = path
+                wire.junction = list(tap) if tap != start else None
+                wire.grid_version = version
+                wire.route_stats = net_stats
+
+    def draw(self, cr, detail=lod.FULL):
         color = (1.0, 0.45, 0.0) if self.selected else (0.0, 0.0, 1.0)
         cr.set_source_rgb(*color)
         cr.set_line_width(3 if self.selected else 2)
 
-        if self.path:
-            cr.move_to(self.path[0][0] * self.grid_size, self.path[0][1] * self.grid_size)
-            for x, y in self.path[1:]:
-                cr.line_to(x * self.grid_size, y * self.grid_size)
+        if self.route_pending:
+            # Straight-line preview until the background route arrives
+            cr.set_dash([6, 4])
+            cr.move_to(self.start_point[0], self.start_point[1])
+            cr.line_to(self.end_point[0], self.end_point[1])
             cr.stroke()
+            cr.set_dash([])
+            return
+
+        if len(self.corners):
+            gs = self.grid_size
+            x0, y0 = self.corners[0].tolist()
+            self.trace(cr, detail)
+            cr.stroke()
+            if detail >= lod.OUTLINE:
+                return      # dots, handles and the label are unreadable this far out
+
+            # Junction dot where this branch joins its net's tree
+            if self.junction:
+                cr.arc(self.junction[0] * self.grid_size, self.junction[1] * self.grid_size, 4, 0, 6.2832)
+                cr.fill()
 
             # Drag handle: small circle at path midpoint when selected
-            if self.selected and len(self.path) >= 2:
-                mid = self.path[len(self.path) // 2]
+            if self.selected and len(self.corners) >= 2:
+                mid = self.path_cell(self.path_length() // 2)
                 mx, my = mid[0] * self.grid_size, mid[1] * self.grid_size
                 cr.set_source_rgb(1.0, 0.45, 0.0)
                 cr.arc(mx, my, 5, 0, 6.2832)
@@ -169,31 +311,144 @@ class Wire:
 
             cr.set_source_rgb(*color)
             cr.set_font_size(8)
-            cr.move_to(self.path[0][0] * self.grid_size + self.text_pos_x, self.path[0][1] * self.grid_size + self.text_pos_y)
+            cr.move_to(x0 * gs + self.text_pos_x, y0 * gs + self.text_pos_y)
             cr.show_text(self.text)
 
+    def trace(self, cr, detail=lod.FULL):
+        """Add the route to cr's current path as a new sub-path (decimated at the COARSE tier)."""
+        if detail >= lod.COARSE:
+            points = self.coarse_points(lod.COARSE_TOLERANCE / cr.get_matrix().xx)
+            cr.move_to(*points[0])
+            for x, y in points[1:]:
+                cr.line_to(x, y)
+        else:
+            gs = self.grid_size
+            x0, y0 = self.corners[0].tolist()
+            cr.move_to(x0 * gs, y0 * gs)
+            for x, y in self.corners[1:].tolist():
+                cr.line_to(x * gs, y * gs)
+
+    def label_glyphs(self, cr):
+        """
+        Glyphs of the label at its place by the route's first corner, in
+        cr's current font.  Cached until the route, label or scale changes.
+        """
+        key = (self.corners, self.text, self.text_pos_x, self.text_pos_y, cr.get_matrix().xx)
+        cached = self._glyphs
+        if cached is not None and cached[0][0] is self.corners and cached[0][1:] == key[1:]:
+            return cached[1]
+        x0, y0 = self.corners[0].tolist()
+        glyphs = cr.get_scaled_font().text_to_glyphs(x0 * self.grid_size + self.text_pos_x,
+                                                     y0 * self.grid_size + self.text_pos_y,
+                                                     self.text, False)
+        self._glyphs = (key, glyphs)
+        return glyphs
+
+    @staticmethod
+    def draw_batch(cr, wires, detail=lod.FULL):
+        """
+        Draw wires (as draw() would, one by one) with a handful of cairo
+        calls: the unselected routes are one path stroked once, pending
+        previews another, junction dots one fill and labels one
+        show_glyphs() in a font set once.  Waypoint markers, then the
+        selected wires, are drawn on top.
+        """
+        plain = [w for w in wires if not w.selected]
+        routed = [w for w in plain if not w.route_pending and len(w.corners)]
+        pending = [w for w in plain if w.route_pending]
+        cr.save()
+        cr.set_source_rgb(0.0, 0.0, 1.0)
+        cr.set_line_width(2)
+        for wire in routed:
+            wire.trace(cr, detail)
+        cr.stroke()
+        if pending:
+            cr.set_dash([6, 4])
+            for wire in pending:
+                cr.move_to(wire.start_point[0], wire.start_point[1])
+                cr.line_to(wire.end_point[0], wire.end_point[1])
+            cr.stroke()
+            cr.set_dash([])
+        if detail < lod.OUTLINE:
+            for wire in routed:
+                if wire.junction:
+                    cr.new_sub_path()
+                    cr.arc(wire.junction[0] * wire.grid_size, wire.junction[1] * wire.grid_size, 4, 0, 6.2832)
+            cr.fill()
+            cr.set_font_size(8)
+            glyphs = []
+            for wire in routed:
+                glyphs += wire.label_glyphs(cr)
+            cr.show_glyphs(glyphs)
+            cr.set_source_rgb(1.0, 0.2, 0.0)
+            for wire in routed:
+                if wire.waypoint:
+                    cr.rectangle(wire.waypoint[0] * wire.grid_size - 4, wire.waypoint[1] * wire.grid_size - 4, 8, 8)
+            cr.fill()
+        cr.restore()
+        for wire in wires:
+            if wire.selected:
+                wire.draw(cr, detail)
+
+    def coarse_points(self, tolerance):
+        """
+        The route's corners in canvas px, decimated to tolerance px
+        (lod.decimate()).  Cached until the route or tolerance changes.
+        """
+        cached = self._coarse
+        if cached is not None and cached[0] is self.corners and cached[1] == tolerance:
+            return cached[2]
+        gs = self.grid_size
+        points = lod.decimate([(x * gs, y * gs) for x, y in self.corners.tolist()], tolerance)
+        self._coarse = (self.corners, tolerance, points)
+        return points
+
+    def bbox(self):
+        """
+        Canvas-px (x0, y0, x1, y1) that draw() can paint into: the route,
+        the straight preview between the endpoints, the dots and handles on
+        the route, and the label (about 6 px per character).  Cached until
+        the route, an endpoint or the label changes.
+        """
+        ends = (self.start_point[0], self.start_point[1], self.end_point[0], self.end_point[1])
+        cached = self._bbox
+        if cached is not None and cached[0] is self.corners and cached[1] == ends and cached[2] == self.text:
+            return cached[3]
+        xs, ys = [ends[0], ends[2]], [ends[1], ends[3]]
+        if len(self.corners):
+            gs = self.grid_size
+            lo, hi = self.corners.min(axis=0).tolist(), self.corners.max(axis=0).tolist()
+            xs += [lo[0] * gs, hi[0] * gs]
+            ys += [lo[1] * gs, hi[1] * gs]
+            x0, y0 = self.corners[0].tolist()
+            lx, ly = x0 * gs + self.text_pos_x, y0 * gs + self.text_pos_y
+            xs += [lx, lx + 6 * len(self.text)]
+            ys += [ly - 10, ly]
+        box = (min(xs) - 6, min(ys) - 6, max(xs) + 6, max(ys) + 6)
+        self._bbox = (self.corners, ends, self.text, box)
+        return box
+
     def contains_point(self, x, y, tolerance=20):
-        def point_on_line(px, py, x1, y1, x2, y2, tolerance):
-            dx = x2 - x1
-            dy = y2 - y1
-            length = (dx * dx + dy * dy) ** 0.5
-            if length == 0:
-                return False
-            u = ((px - x1) * dx + (py - y1) * dy) / (length * length)
-            if u < 0 or u > 1:
-                return False
-            xx = x1 + u * dx
-            yy = y1 + u * dy
-            distance = ((px - xx) ** 2 + (py - yy) ** 2) ** 0.5
-            return distance <= tolerance
-
-        if self.path:
-            for i in range(len(self.path) - 1):
-                x1, y1 = self.path[i]
-                x2, y2 = self.path[i + 1]
-                if point_on_line(x, y, x1 * self.grid_size, y1 * self.grid_size, x2 * self.grid_size, y2 * self.grid_size, tolerance):
-                    return True
-        return False
+        """
+        True if (x, y) lies within tolerance of a segment of the route,
+        measured perpendicular to the segment; checked on all corner-to-corner
+        segments at once.
+        """
+        if len(self.corners) < 2:
+            return False
+        pts = self.corners * float(self.grid_size)
+        a, b = pts[:-1], pts[1:]
+        d = b - a
+        length2 = (d * d).sum(axis=1)
+        live = length2 > 0
+        if not live.any():
+            return False
+        a, d, length2 = a[live], d[live], length2[live]
+        u = ((x - a[:, 0]) * d[:, 0] + (y - a[:, 1]) * d[:, 1]) / length2
+        on = (u >= 0) & (u <= 1)
+        px = a[:, 0] + u * d[:, 0] - x
+        py = a[:, 1] + u * d[:, 1] - y
+        return bool((on & (px * px + py * py <= tolerance * tolerance)).any())
 
     
     def to_dict(self):
@@ -204,9 +459,10 @@ class Wire:
             "end_point": self.end_point,
             "wire_type": self.wire_type,
             "grid_size": self.grid_size,
-            "path": self.path,
+            "path": self.corners.tolist(),   # bend points only; see corner_cells()
             "text": self.text,
             "waypoint": self.waypoint,
+            "junction": self.junction,
         }
 
     @staticmethod
@@ -217,13 +473,13 @@ class Wire:
             wire_dict["end_point"],
             wire_dict["wire_type"],
             wire_dict["grid_size"],
-            parent_window
+            parent_window,
+            path=wire_dict.get("path"),   # saved bend points (every cell in older files): no A* on load/undo/redo
         )
         wire.id = wire_dict["id"]
         wire.text = wire_dict["text"]
         wire.waypoint = wire_dict.get("waypoint")
+        wire.junction = wire_dict.get("junction")
         if wire.waypoint:
             wire.path = wire._path_via_waypoint()
-        else:
-            wire.path = wire_dict["path"]
         return wire
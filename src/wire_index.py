@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+wire_index.py -- uniform-bucket spatial index of wire segments
+
+The canvas is cut into BUCKET x BUCKET px squares and every corner-to-corner
+segment of a wire is listed in each square it passes within HIT_PAD px of.
+A click then tests only the segments of its own square, all at once, with
+the same perpendicular-distance rule as Wire.contains_point(), instead of
+every segment of every wire.  sync() matches the index to the canvas' wire
+list; wires on the canvas re-index themselves whenever their route changes.
+"""
+import numpy as np
+
+# Bucket side in canvas px
+BUCKET = 100
+# Hit tolerance in px: Wire.contains_point()'s default
+HIT_PAD = 20
+
+
+class SegmentIndex:
+    def __init__(self, bucket=BUCKET, pad=HIT_PAD):
+        self.bucket = bucket
+        self.pad = pad
+        self.buckets = {}   # (bx, by) -> {wire: [segment numbers]}
+        self._segs = {}     # wire -> (n, 4) float array of x0, y0, x1, y1 per segment
+        self._keys = {}     # wire -> bucket keys it is listed in
+        self._packed = {}   # (bx, by) -> (owners, (k, 4) segments), rebuilt after a change
+        self._order = {}    # wire -> position in the last sync(): the wires on the canvas
+        self.tested = 0     # segments candidates() has measured a point against
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, wire):
+        return wire in self._order
+
+    def update(self, wire):
+        """(Re)list wire's segments under the buckets its current route passes through."""
+        self.remove(wire)
+        pts = wire.corners * float(wire.grid_size)
+        if len(pts) < 2:
+            return
+        segs = np.hstack((pts[:-1], pts[1:]))
+        # Zero-length segments never hit (as in Wire.contains_point())
+        live = np.flatnonzero((segs[:, :2] != segs[:, 2:]).any(axis=1))
+        lo = np.floor((np.minimum(segs[:, :2], segs[:, 2:]) - self.pad) / self.bucket).astype(int)
+        hi = np.floor((np.maximum(segs[:, :2], segs[:, 2:]) + self.pad) / self.bucket).astype(int)
+        keys = set()
+        for i in live.tolist():
+            (x0, y0), (x1, y1) = lo[i].tolist(), hi[i].tolist()
+            # A segment's padded bbox covers every point within pad of it
+            for bx in range(x0, x1 + 1):
+                for by in range(y0, y1 + 1):
+                    self.buckets.setdefault((bx, by), {}).setdefault(wire, []).append(i)
+                    keys.add((bx, by))
+        for key in keys:
+            self._packed.pop(key, None)
+        self._segs[wire] = segs
+        self._keys[wire] = keys
+
+    def remove(self, wire):
+        for key in self._keys.pop(wire, ()):
+            bucket = self.buckets[key]
+            del bucket[wire]
+            if not bucket:
+                del self.buckets[key]
+            self._packed.pop(key, None)
+        self._segs.pop(wire, None)
+
+    def sync(self, wires):
+        """
+        Match the index to wires, the canvas' wire list: wires new to it are
+        listed, wires no longer in it dropped, and its order kept for hit().
+        """
+        known = self._order
+        order = {}
+        added = 0
+        for wire in wires:
+            order[wire] = len(order)
+            if wire not in known:
+                self.update(wire)
+                added += 1
+        # Every known wire still present was counted, so equal sizes mean no stale ones
+        if len(known) + added != len(order):
+            for wire in [w for w in known if w not in order]:
+                self.remove(wire)
+        self._order = order
+
+    def _bucket_arrays(self, key):
+        packed = self._packed.get(key)
+        if packed is None:
+            owners, rows = [], []
+            for wire, picks in self.buckets.get(key, {}).items():
+                owners.extend([wire] * len(picks))
+                rows.append(self._segs[wire][picks])
+            packed = self._packed[key] = (owners, np.vstack(rows) if rows else np.empty((0, 4)))
+        return packed
+
+    def candidates(self, x, y):
+        """Wires with a segment within pad px of (x, y), nearest first."""
+        owners, segs = self._bucket_arrays((int(x // self.bucket), int(y // self.bucket)))
+        if not owners:
+            return []
+        self.tested += len(owners)
+        ax, ay = segs[:, 0], segs[:, 1]
+        dx, dy = segs[:, 2] - ax, segs[:, 3] - ay
+        u = ((x - ax) * dx + (y - ay) * dy) / (dx * dx + dy * dy)
+        px, py = ax + u * dx - x, ay + u * dy - y
+        dist2 = px * px + py * py
+        near = np.flatnonzero((u >= 0) & (u <= 1) & (dist2 <= self.pad * self.pad))
+        near = near[np.argsort(dist2[near], kind="stable")]
+        return list(dict.fromkeys(owners[i] for i in near.tolist()))
+
+    def hit(self, x, y, wires):
+        """
+        The first wire in wires (the canvas' list) whose Wire.contains_point()
+        is true at (x, y), or None.
+        """
+        self.sync(wires)
+        found = self.candidates(x, y)
+        return min(found, key=self._order.__getitem__) if found else None
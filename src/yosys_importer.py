@@ -24,6 +24,11 @@ import json
 import math
 import random
 
+# Channel-routing import: grid cells left of the first (IO pin) column, and
+# spare tracks per channel on top of its estimated density
+CHANNEL_MARGIN = 3
+CHANNEL_SLACK = 4
+
 
 # ---------------------------------------------------------------------------
 # Type mappings
@@ -271,14 +276,132 @@ def _place_cells(cells, port_connections, grid_size):
     return positions, cell_w, cell_h
 
 
+def _net_endpoints(cells, blocks, pins, ports_raw):
+    """Build net -> connection-point map: bit -> [(block_or_pin_obj, point_xy, "in"|"out")]."""
+    net_endpoints = {}
+
+    def add_ep(bit, obj, pt, direction):
+        if bit in (0, 1):
+            return
+        net_endpoints.setdefault(bit, []).append((obj, pt, direction))
+
+    for cname, (btype, connections) in cells.items():
+        blk = blocks[cname]
+        for port, bits in connections.items():
+            info = PORT_MAP.get((btype, port))
+            if info is None:
+                continue
+            direction, idx = info
+            pts = blk.input_points if direction == "in" else blk.output_points
+            if idx < len(pts):
+                for bit in bits:
+                    add_ep(bit, blk, pts[idx], direction)
+
+    for pname, pin in pins.items():
+        pinfo = ports_raw[pname]
+        direction = pinfo.get("direction", "input")
+        pin_dir = "out" if direction == "input" else "in"  # outputs of input ports drive nets
+        bits = pinfo.get("bits", [])
+        for i, bit in enumerate(bits):
+            if i < len(pin.connection_points):
+                add_ep(bit, pin, pin.connection_points[i], pin_dir)
+    return net_endpoints
+
+
+def _connection_points(obj):
+    if hasattr(obj, "connection_points"):
+        return obj.connection_points
+    return obj.input_points + obj.output_points
+
+
+def _channel_columns(net_endpoints, column, grid_size):
+    """
+    Left-edge x (in grid cells) of every placement column, and the
+    (first, last) track columns of the channel right of each one, sized
+    for the nets crossing it.  column maps each block/pin to its column.
+    A net's extent in a channel is estimated from its pin rows; x does
+    not change rows, so this holds after the columns are spread out.
+    """
+    from routing_channel import left_edge
+    gs = grid_size
+    ncols = max(column.values()) + 1
+    # How far right of its column's left edge each column's pins reach
+    reach = [0] * ncols
+    for obj, j in column.items():
+        left = int(obj.x // gs)
+        right = max([int(obj.width // gs)] + [int(p[0] / gs) - left for p in _connection_points(obj)])
+        reach[j] = max(reach[j], right)
+
+    spans = [{} for _ in range(ncols)]  # channel -> {bit: [top row, bottom row]}
+    for bit, endpoints in net_endpoints.items():
+        outputs = [(obj, pt) for obj, pt, d in endpoints if d == "out"]
+        if not outputs:
+            continue
+        src_obj, src_pt = outputs[0]
+        js, ys = column[src_obj], int(src_pt[1] / gs)
+        for obj, pt, d in endpoints:
+            if d != "in":
+                continue
+            jd, yd = column[obj], int(pt[1] / gs)
+            span = spans[jd - 1 if jd > js else jd].setdefault(bit, [ys, ys])
+            span[0], span[1] = min(span[0], yd), max(span[1], yd)
+
+    col_x = [CHANNEL_MARGIN]
+    channels = []
+    for j in range(ncols):
+        _, need = left_edge([(a - 1, b + 1) for a, b in spans[j].values()])
+        lo = col_x[j] + reach[j] + 1
+        channels.append((lo, lo + need + CHANNEL_SLACK - 1))
+        col_x.append(lo + need + CHANNEL_SLACK + 1)
+    return col_x, channels
+
+
+def _route_in_channels(wires, objects, channels, grid_size):
+    """
+    Channel-route wires between the imported blocks and pins (objects);
+    wires sharing a start cell are one net.  Returns the wires the
+    channels could not carry.
+    """
+    from routing_channel import route_channels
+    gs = grid_size
+    rects, points = [], []
+    for obj in objects:
+        rects.append((int(obj.y // gs), int((obj.y + obj.height) // gs),
+                      int(obj.x // gs), int((obj.x + obj.width) // gs)))
+        points.extend((int(x / gs), int(y / gs)) for x, y in _connection_points(obj))
+    nets = {}   # start cell -> [(wire, end cell)]
+    for wire in wires:
+        start, end = wire.endpoint_cells()
+        nets.setdefault(start, []).append((wire, end))
+    routes = route_channels(rects, points, [(s, [e for _, e in members]) for s, members in nets.items()],
+                            channels)
+    unrouted = []
+    for (start, members), branches in zip(nets.items(), routes):
+        for (wire, _), branch in zip(members, branches):
+            if branch is None:
+                unrouted.append(wire)
+                continue
+            tap, corners = branch
+            wire.path = corners
+            wire.junction = list(tap) if tap != start else None
+    return unrouted
+
+
 # ---------------------------------------------------------------------------
 # Main import function
 # ---------------------------------------------------------------------------
 
-def import_yosys_json(path, parent_window):
+def import_yosys_json(path, parent_window, router="astar"):
     """
     Parse a Yosys JSON netlist and add blocks/pins/wires to parent_window.
 
+    With the default router="astar" every wire goes through Wire.route_all().
+    router="channel" instead widens the gaps between the placement columns
+    into routing channels and routes the wires through them
+    (routing_channel.route_channels()); the few the channels cannot carry
+    still go through Wire.route_all().  It changes the placement, so it is
+    only used when asked for.
+
     Returns (n_cells_added, n_wires_added, warnings_list).
     """
     from blocks import Block
@@ -348,35 +471,20 @@ def import_yosys_json(path, parent_window):
         new_pins[pname] = pin
         pin_y += gs * 6
 
-    # Build net -> connection-point map
-    # net_point: bit -> list of (block_or_pin_obj, point_xy, "in"|"out")
-    net_endpoints = {}
-
-    def add_ep(bit, obj, pt, direction):
-        if bit in (0, 1):
-            return
-        net_endpoints.setdefault(bit, []).append((obj, pt, direction))
-
-    for cname, (btype, connections) in cells.items():
-        blk = new_blocks[cname]
-        for port, bits in connections.items():
-            info = PORT_MAP.get((btype, port))
-            if info is None:
-                continue
-            direction, idx = info
-            pts = blk.input_points if direction == "in" else blk.output_points
-            if idx < len(pts):
-                for bit in bits:
-                    add_ep(bit, blk, pts[idx], direction)
-
-    for pname, pin in new_pins.items():
-        pinfo = ports_raw[pname]
-        direction = pinfo.get("direction", "input")
-        pin_dir = "out" if direction == "input" else "in"  # outputs of input ports drive nets
-        bits = pinfo.get("bits", [])
-        for i, bit in enumerate(bits):
-            if i < len(pin.connection_points):
-                add_ep(bit, pin, pin.connection_points[i], pin_dir)
+    if router == "channel":
+        # IO pins get a column of their own left of level 0, then every
+        # channel is widened to the tracks its nets need
+        xs = {x: j + 1 for j, x in enumerate(sorted({x for x, _ in positions.values()}))}
+        column = {pin: 0 for pin in new_pins.values()}
+        column.update((b, xs[positions[cname][0]]) for cname, b in new_blocks.items())
+        net_endpoints = _net_endpoints(cells, new_blocks, new_pins, ports_raw)
+        col_x, channels = _channel_columns(net_endpoints, column, gs)
+        for obj, j in column.items():
+            obj.x = col_x[j] * gs
+            obj.update_points()
+
+    # net_endpoints: bit -> list of (block_or_pin_obj, point_xy, "in"|"out")
+    net_endpoints = _net_endpoints(cells, new_blocks, new_pins, ports_raw)
 
     # Create wires
     new_wires = []
@@ -392,7 +500,8 @@ def import_yosys_json(path, parent_window):
         src_obj, src_pt = outputs[0]
         net_name = bit_to_name.get(bit, f"net_{bit}")
         for dst_obj, dst_pt in inputs:
-            w = Wire(net_name, list(src_pt), list(dst_pt), "wire", gs, parent_window)
+            # Routed together below in one batch
+            w = Wire(net_name, list(src_pt), list(dst_pt), "wire", gs, parent_window, path=[])
             w.text = net_name
             # Register wire in source block/pin
             if hasattr(src_obj, "output_points") and src_pt in src_obj.output_points:
@@ -423,11 +532,21 @@ def import_yosys_json(path, parent_window):
             new_wires.append(w)
         wired_nets.add(bit)
 
+    unrouted = new_wires
+    if router == "channel":
+        unrouted = _route_in_channels(new_wires, list(new_blocks.values()) + list(new_pins.values()),
+                                      channels, gs)
+
     # Commit to canvas
     parent_window.push_undo()
     parent_window.blocks.extend(new_blocks.values())
     parent_window.pins.extend(new_pins.values())
     parent_window.wires.extend(new_wires)
+    # Route the rest in one batch (process pool for large netlists) now the
+    # occupancy grid holds the imported blocks and pins; in channel mode
+    # only what the channels could not carry
+    if unrouted:
+        Wire.route_all(unrouted, parent_window, progress=getattr(parent_window, "routing_progress", None))
     parent_window.drawing_area.queue_draw()
     parent_window.update_json()
     parent_window.update_status_bar()